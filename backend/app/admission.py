@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+from app.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTED
+
+
+class Gate:
+    """A concurrency limit with a bounded FIFO queue of waiters.
+
+    Only touched from the event loop thread, so plain counters suffice;
+    waiters are futures of whichever loop is running, which keeps the gate
+    usable across test clients that each start their own loop.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting at most ``timeout`` seconds for one."""
+        if self.in_flight < self.limit and not self._waiters:
+            self._admit()
+            return True
+        if len(self._waiters) >= self.max_queue or timeout <= 0:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.labels(self.name).inc()
+        try:
+            # release() hands its slot straight to us
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except TimeoutError:
+            # release() may have handed us its slot as the timeout fired
+            return waiter.done() and not waiter.cancelled()
+        except asyncio.CancelledError:
+            # client went away just as a slot was handed over: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            ADMISSION_QUEUED.labels(self.name).dec()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.labels(self.name).dec()
+
+    def _admit(self) -> None:
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.labels(self.name).inc()
+
+
+class AdmissionMiddleware:
+    """Reject requests early with 503 instead of letting them pile up.
+
+    Every request passes the ``global`` gate, sized to the threadpool; routes
+    listed in ``ADMISSION_ROUTE_LIMITS`` first pass their own, smaller gate,
+    so e.g. slow argon2 logins cannot take every slot. A request that waits
+    longer than ``ADMISSION_QUEUE_TIMEOUT_SECONDS`` in total is shed.
+    """
+
+    def __init__(self, app: ASGIApp, router: Router) -> None:
+        self.app = app
+        self.router = router
+        self.gate = Gate(
+            "global", settings.ADMISSION_MAX_IN_FLIGHT, settings.ADMISSION_MAX_QUEUE
+        )
+        self.route_gates = {
+            path: Gate(path, limit, settings.ADMISSION_MAX_QUEUE)
+            for path, limit in settings.ADMISSION_ROUTE_LIMITS.items()
+        }
+
+    def route_gate(self, scope: Scope) -> Optional[Gate]:
+        # routing has not run yet, so match the limited routes ourselves
+        for route in self.router.routes:
+            gate = self.route_gates.get(getattr(route, "path", ""))
+            if gate is not None and route.matches(scope)[0] == Match.FULL:
+                return gate
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not settings.ADMISSION_ENABLED
+            or scope["path"] in settings.ADMISSION_EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        deadline = time.monotonic() + settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        held: list[Gate] = []
+        try:
+            # the narrow gate first: never hold a global slot while queued
+            for gate in (self.route_gate(scope), self.gate):
+                if gate is None:
+                    continue
+                if not await gate.acquire(deadline - time.monotonic()):
+                    ADMISSION_REJECTED.labels(gate.name).inc()
+                    response = JSONResponse(
+                        {"detail": "Server is busy, please retry later"},
+                        status_code=503,
+                        headers={
+                            "Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+                        },
+                    )
+                    await response(scope, receive, send)
+                    return
+                held.append(gate)
+
+            await self.app(scope, receive, send)
+        finally:
+            for gate in held:
+                gate.release()
@@ -0,0 +1,150 @@
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from itertools import batched
+from typing import Optional
+
+from sqlalchemy import Table, insert
+from sqlmodel import Session
+
+from app.config import settings
+from app.database import engine
+from app.metrics import AUDIT_EVENTS_DROPPED, AUDIT_EVENTS_WRITTEN
+from app.models.audit import AuditEvent, ProjectStatusEvent
+from app.models.project import Project, ProjectStatus
+
+STATUS_HISTORY: Table = ProjectStatusEvent.__table__  # type: ignore[attr-defined]
+AUDIT_LOG: Table = AuditEvent.__table__  # type: ignore[attr-defined]
+
+
+class AuditBuffer:
+    """Status changes and audit events on their way to the database.
+
+    Requests only append to an in-memory buffer; ``flush`` runs in the
+    background and writes them with one multi-row INSERT per batch. Events
+    are recorded after their transaction committed, stamped with the time
+    they happened, and lost if the process dies before the next flush.
+    A full buffer drops new events rather than slow requests down.
+    """
+
+    def __init__(self, max_size: int, batch_size: int) -> None:
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self._pending: deque[tuple[Table, dict]] = deque()
+        self._lock = threading.Lock()
+        # one flush at a time, also at shutdown while the last job still runs
+        self._flush_lock = threading.Lock()
+
+    def _add(self, table: Table, row: dict) -> None:
+        if not settings.AUDIT_ENABLED:
+            return
+        with self._lock:
+            if len(self._pending) < self.max_size:
+                self._pending.append((table, row))
+                return
+        AUDIT_EVENTS_DROPPED.labels(table.name).inc()
+
+    # ---------------------------------------------------------
+    # Record (request path, after commit)
+    # ---------------------------------------------------------
+    def project_status(
+        self,
+        project: Project,
+        from_status: Optional[ProjectStatus],
+        actor_id: Optional[int] = None,
+        at: Optional[datetime] = None,
+    ) -> None:
+        """Record the project's move from ``from_status`` to its status;
+        nothing if the status did not change."""
+        if project.status == from_status:
+            return
+        self._add(
+            STATUS_HISTORY,
+            {
+                "project_id": project.id,
+                "client_id": project.client_id,
+                "worker_id": project.worker_id,
+                "from_status": from_status,
+                "to_status": project.status,
+                "actor_id": actor_id,
+                "create_at": at or project.update_at,
+            },
+        )
+
+    def projects_created(
+        self, project_ids: list[int], client_id: Optional[int], at: datetime
+    ) -> None:
+        for project_id in project_ids:
+            self._add(
+                STATUS_HISTORY,
+                {
+                    "project_id": project_id,
+                    "client_id": client_id,
+                    "worker_id": None,
+                    "from_status": None,
+                    "to_status": ProjectStatus.OPEN,
+                    "actor_id": client_id,
+                    "create_at": at,
+                },
+            )
+
+    def auth(
+        self,
+        action: str,
+        username: str,
+        client: Optional[str],
+        user_id: Optional[int] = None,
+    ) -> None:
+        self._add(
+            AUDIT_LOG,
+            {
+                "action": action,
+                "user_id": user_id,
+                "username": username,
+                "client": client,
+                "create_at": datetime.now(timezone.utc),
+            },
+        )
+
+    # ---------------------------------------------------------
+    # Write (background job and shutdown)
+    # ---------------------------------------------------------
+    def flush(self) -> int:
+        """Write everything buffered so far and return the row count.
+
+        On a database error the events go back to the front of the buffer,
+        as far as it has room, and the error is raised for the job's log.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, deque()
+            if not pending:
+                return 0
+
+            rows: dict[Table, list[dict]] = defaultdict(list)
+            for table, row in pending:
+                rows[table].append(row)
+            try:
+                with Session(engine) as session:
+                    for table, table_rows in rows.items():
+                        for batch in batched(table_rows, self.batch_size):
+                            session.execute(insert(table).values(batch))
+                    session.commit()
+            except Exception:
+                self._requeue(pending)
+                raise
+
+        for table, table_rows in rows.items():
+            AUDIT_EVENTS_WRITTEN.labels(table.name).inc(len(table_rows))
+        return len(pending)
+
+    def _requeue(self, events: deque[tuple[Table, dict]]) -> None:
+        with self._lock:
+            room = self.max_size - len(self._pending)
+            kept = list(events)[:room] if room > 0 else []
+            self._pending.extendleft(reversed(kept))
+        for table, _ in list(events)[len(kept) :]:
+            AUDIT_EVENTS_DROPPED.labels(table.name).inc()
+
+
+audit_log = AuditBuffer(settings.AUDIT_BUFFER_SIZE, settings.AUDIT_BATCH_SIZE)
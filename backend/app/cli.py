@@ -0,0 +1,452 @@
+"""Command line entry point.
+
+    python -m app serve --workers 4 --port 8000
+    python -m app serve --reload          # development
+    python -m app calibrate-hasher --target-ms 250
+    python -m app gc-uploads --dry-run    # in the server's working directory
+
+``serve`` imports the app, prepares the schema and warms the password
+hasher once, then forks the worker processes, which share the listening
+socket. Signals sent to the master:
+
+    SIGTERM / SIGINT  graceful shutdown
+    SIGHUP            graceful reload: re-exec with fresh code, start new
+                      workers, then let the old ones finish their requests
+    SIGTTIN / SIGTTOU one worker more / less
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Any, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# set across a SIGHUP re-exec
+LISTEN_FD_ENV = "HANDSHAKE_LISTEN_FD"
+OLD_WORKERS_ENV = "HANDSHAKE_OLD_WORKERS"
+
+
+# ---------------------------------------------------------
+# Settings that must be decided before the app is imported
+# ---------------------------------------------------------
+def size_pool(workers: int) -> None:
+    """Split ``DB_MAX_CONNECTIONS`` evenly across worker processes."""
+    if settings.DB_MAX_CONNECTIONS > 0:
+        settings.DB_POOL_SIZE = max(1, settings.DB_MAX_CONNECTIONS // workers)
+        settings.DB_MAX_OVERFLOW = 0
+    logger.info(
+        "database pool per worker: %d (+%d overflow)",
+        settings.DB_POOL_SIZE,
+        settings.DB_MAX_OVERFLOW,
+    )
+
+
+def prepare_multiprocess_metrics(workers: int) -> None:
+    # prometheus_client reads this at import time
+    if workers > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(
+            prefix="handshake-metrics-"
+        )
+
+
+def event_loop_and_http() -> tuple[str, str]:
+    """uvloop and httptools when installed (they come with uvicorn[standard])."""
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return loop, http
+
+
+def preload() -> Any:
+    """Import and initialise everything workers can share copy-on-write."""
+    from app.database import engine, init_db, replica_engines
+    from app.main import app
+    from app.security import password_hasher
+
+    init_db()
+    password_hasher()
+    # connections must not be shared across fork
+    for pool_owner in (engine, *replica_engines):
+        pool_owner.dispose()
+    return app
+
+
+# ---------------------------------------------------------
+# Workers
+# ---------------------------------------------------------
+def run_worker(
+    sock: socket.socket, app: Optional[Any], args: argparse.Namespace
+) -> None:
+    import uvicorn
+
+    for sig in (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+        signal.signal(sig, signal.SIG_DFL)
+
+    if app is None:
+        # --no-preload: this worker pays for the imports; init_db runs in
+        # the lifespan and is a cheap check once the schema is current
+        from app.main import app
+
+    loop, http = event_loop_and_http()
+    config = uvicorn.Config(
+        app,
+        loop=loop,
+        http=http,
+        log_level=args.log_level,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Master:
+    """Pre-fork process manager: keeps ``workers`` children alive."""
+
+    def __init__(
+        self, sock: socket.socket, app: Optional[Any], args: argparse.Namespace
+    ) -> None:
+        self.sock = sock
+        self.app = app
+        self.args = args
+        self.target = args.workers
+        self.children: set[int] = set()
+        # told to stop, not yet exited
+        self.retiring: set[int] = set()
+        self.stopping = False
+        self.reloading = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # own process group: Ctrl-C reaches only the master, which
+            # then stops the workers exactly once
+            os.setpgid(0, 0)
+            code = 0
+            try:
+                run_worker(self.sock, self.app, self.args)
+            except BaseException:
+                logger.exception("worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children.add(pid)
+        logger.info("started worker %d", pid)
+
+    def reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.children:
+                self.children.discard(pid)
+                if not self.stopping and pid not in self.retiring:
+                    logger.warning("worker %d exited (%d)", pid, status)
+            self.retiring.discard(pid)
+
+    def signal_all(self, sig: int, pids: Optional[set[int]] = None) -> None:
+        for pid in pids if pids is not None else set(self.children):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def install_signals(self) -> None:
+        def stop(signum: int, frame: Any) -> None:
+            self.stopping = True
+
+        def reload(signum: int, frame: Any) -> None:
+            self.reloading = True
+
+        def more(signum: int, frame: Any) -> None:
+            self.target += 1
+
+        def fewer(signum: int, frame: Any) -> None:
+            self.target = max(1, self.target - 1)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGHUP, reload)
+        signal.signal(signal.SIGTTIN, more)
+        signal.signal(signal.SIGTTOU, fewer)
+
+    def run(self) -> None:
+        self.install_signals()
+
+        # after a reload, the previous generation drains once we are up
+        old = {
+            int(pid) for pid in os.environ.pop(OLD_WORKERS_ENV, "").split(",") if pid
+        }
+        while len(self.children) < self.target:
+            self.spawn()
+        if old:
+            self.signal_all(signal.SIGTERM, old)
+
+        while not self.stopping:
+            if self.reloading:
+                self.reexec()
+            self.reap()
+            serving = self.children - self.retiring
+            for _ in range(self.target - len(serving)):
+                self.spawn()
+            if len(serving) > self.target:
+                # a second SIGTERM would make uvicorn skip the graceful part
+                pid = max(serving)
+                self.retiring.add(pid)
+                self.signal_all(signal.SIGTERM, {pid})
+            time.sleep(0.2)
+
+        self.shutdown()
+
+    def reexec(self) -> None:
+        logger.info("reloading")
+        self.sock.set_inheritable(True)
+        os.environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        os.environ[OLD_WORKERS_ENV] = ",".join(map(str, self.children - self.retiring))
+        os.execv(sys.executable, [sys.executable, "-m", "app", *sys.argv[1:]])
+
+    def shutdown(self) -> None:
+        logger.info("shutting down %d workers", len(self.children))
+        self.signal_all(signal.SIGTERM, self.children - self.retiring)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        self.signal_all(signal.SIGKILL)
+        self.reap()
+
+
+def listen(host: str, port: int) -> socket.socket:
+    inherited = os.environ.pop(LISTEN_FD_ENV, None)
+    if inherited is not None:
+        return socket.socket(fileno=int(inherited))
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.create_server((host, port), family=family, backlog=2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+# ---------------------------------------------------------
+# Commands
+# ---------------------------------------------------------
+def serve(args: argparse.Namespace) -> None:
+    if args.reload:
+        import uvicorn
+
+        uvicorn.run("app.main:app", host=args.host, port=args.port, reload=True)
+        return
+
+    # read by the event broker, which cannot reach other workers
+    settings.WEB_WORKERS = args.workers
+    prepare_multiprocess_metrics(args.workers)
+    size_pool(args.workers)
+    sock = listen(args.host, args.port)
+
+    app = None
+    if args.preload:
+        start = time.perf_counter()
+        app = preload()
+        logger.info("preloaded app in %.2fs", time.perf_counter() - start)
+
+    logger.info(
+        "listening on %s:%d with %d workers", args.host, args.port, args.workers
+    )
+    Master(sock, app, args).run()
+
+
+# ---------------------------------------------------------
+# Password hasher calibration
+# ---------------------------------------------------------
+CALIBRATION_PASSWORD = "correct horse battery staple"
+
+
+def measure_verify(
+    time_cost: int, memory_kib: int, parallelism: int, concurrency: int, rounds: int
+) -> float:
+    """p95 seconds of one verify while ``concurrency`` of them run at once."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from pwdlib.hashers.argon2 import Argon2Hasher
+
+    hasher = Argon2Hasher(
+        time_cost=time_cost, memory_cost=memory_kib, parallelism=parallelism
+    )
+    hashed = hasher.hash(CALIBRATION_PASSWORD)
+
+    def verify(_: int) -> float:
+        start = time.perf_counter()
+        hasher.verify(CALIBRATION_PASSWORD, hashed)
+        return time.perf_counter() - start
+
+    # argon2 releases the GIL, so threads load the CPUs like real logins
+    with ThreadPoolExecutor(concurrency) as pool:
+        samples = sorted(pool.map(verify, range(concurrency * rounds)))
+    return samples[int(0.95 * (len(samples) - 1))]
+
+
+def calibrate_hasher(args: argparse.Namespace) -> None:
+    """Find the costliest argon2id parameters whose verify stays within
+    ``--target-ms`` (p95) under ``--concurrency`` simultaneous logins.
+
+    For each parallelism: the most memory the budget allows, halved until
+    one pass fits the target, then as many passes as still fit.
+    """
+    target = args.target_ms / 1000
+    max_memory = args.max_memory_mib * 1024 // args.concurrency
+    min_memory = args.min_memory_mib * 1024
+
+    def measure(time_cost: int, memory: int, parallelism: int) -> float:
+        latency = measure_verify(
+            time_cost, memory, parallelism, args.concurrency, args.rounds
+        )
+        print(
+            f"  parallelism={parallelism} memory={memory // 1024}MiB "
+            f"time_cost={time_cost}: p95 {latency * 1000:.0f} ms"
+        )
+        return latency
+
+    best: Optional[tuple[int, int, int, int, float]] = None
+    for parallelism in args.parallelism:
+        memory = max(max_memory, min_memory)
+        latency = measure(1, memory, parallelism)
+        while latency > target and memory // 2 >= min_memory:
+            memory //= 2
+            latency = measure(1, memory, parallelism)
+        if latency > target:
+            continue
+
+        # cost is linear in the passes: estimate, then back off until it fits
+        time_cost = max(1, int(target / latency))
+        while time_cost > 1:
+            latency = measure(time_cost, memory, parallelism)
+            if latency <= target:
+                break
+            time_cost -= 1
+
+        # more work per hash is better; fewer lanes break ties
+        candidate = (time_cost * memory, -parallelism, time_cost, memory, latency)
+        if best is None or candidate[:2] > best[:2]:
+            best = candidate
+
+    if best is None:
+        print(
+            f"no parameters fit {args.target_ms:.0f} ms with at least "
+            f"{args.min_memory_mib} MiB; raise --target-ms or lower --concurrency"
+        )
+        raise SystemExit(1)
+
+    _, parallelism, time_cost, memory, latency = best
+    print(f"\nchosen (p95 {latency * 1000:.0f} ms), put these in .env:")
+    print(f"PASSWORD_HASH_TIME_COST={time_cost}")
+    print(f"PASSWORD_HASH_MEMORY_KIB={memory}")
+    print(f"PASSWORD_HASH_PARALLELISM={-parallelism}")
+
+
+# ---------------------------------------------------------
+# Upload garbage collection
+# ---------------------------------------------------------
+def gc_uploads(args: argparse.Namespace) -> None:
+    from app.database import init_db
+    from app.uploads import collect_garbage
+
+    init_db()
+    report = collect_garbage(args.grace_seconds, args.batch_size, args.dry_run)
+    action = "would remove" if args.dry_run else "removed"
+    print(
+        f"scanned {report.scanned} files, {action} {report.removed} "
+        f"({report.removed_bytes} bytes)"
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run the API server")
+    serve_parser.add_argument("--host", default=settings.WEB_HOST)
+    serve_parser.add_argument("--port", type=int, default=settings.WEB_PORT)
+    serve_parser.add_argument(
+        "--workers", type=int, default=settings.WEB_WORKERS or os.cpu_count() or 1
+    )
+    serve_parser.add_argument(
+        "--no-preload",
+        dest="preload",
+        action="store_false",
+        help="import the app in each worker instead of once before fork",
+    )
+    serve_parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=settings.WEB_GRACEFUL_TIMEOUT_SECONDS,
+    )
+    serve_parser.add_argument("--forwarded-allow-ips", default="127.0.0.1")
+    serve_parser.add_argument("--log-level", default="info")
+    serve_parser.add_argument(
+        "--reload", action="store_true", help="single process, restart on changes"
+    )
+    serve_parser.set_defaults(handler=serve)
+
+    calibrate_parser = commands.add_parser(
+        "calibrate-hasher", help="pick argon2 cost parameters for this host"
+    )
+    calibrate_parser.add_argument(
+        "--target-ms", type=float, default=250.0, help="p95 verify latency"
+    )
+    calibrate_parser.add_argument(
+        "--concurrency",
+        type=int,
+        # what one worker's login gate lets through; times workers per host
+        default=settings.ADMISSION_ROUTE_LIMITS.get("/auth/login/json", 8),
+        help="verifies running at once",
+    )
+    calibrate_parser.add_argument(
+        "--max-memory-mib",
+        type=int,
+        default=1024,
+        help="memory all concurrent verifies may use together",
+    )
+    calibrate_parser.add_argument(
+        "--min-memory-mib",
+        type=int,
+        default=19,
+        help="never go below this per hash (OWASP minimum)",
+    )
+    calibrate_parser.add_argument(
+        "--parallelism", type=int, nargs="+", default=[1, 2, 4]
+    )
+    calibrate_parser.add_argument(
+        "--rounds", type=int, default=3, help="verifies per concurrent thread"
+    )
+    calibrate_parser.set_defaults(handler=calibrate_hasher)
+
+    gc_parser = commands.add_parser(
+        "gc-uploads", help="remove uploaded files no deliverable points to"
+    )
+    gc_parser.add_argument(
+        "--grace-seconds", type=float, default=settings.UPLOAD_GC_GRACE_SECONDS
+    )
+    gc_parser.add_argument(
+        "--batch-size", type=int, default=settings.UPLOAD_GC_BATCH_SIZE
+    )
+    gc_parser.add_argument(
+        "--dry-run", action="store_true", help="only report what would go"
+    )
+    gc_parser.set_defaults(handler=gc_uploads)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=getattr(args, "log_level", "info").upper(),
+        format="%(asctime)s %(name)s %(message)s",
+    )
+    args.handler(args)
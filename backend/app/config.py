@@ -1,5 +1,7 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, model_validator
 
 
 class Settings(BaseSettings):
@@ -10,19 +12,181 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5432
     POSTGRES_DB: str = "handshake"
 
-    @property
-    def DATABASE_URL(self) -> str:
-        return (
-            f"postgresql://{self.POSTGRES_USER}:"
-            f"{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:"
-            f"{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
-        )
+    # 直接指定完整連線字串（例如 benchmark）；留空則由上面的設定組成
+    DATABASE_URL: str = ""
+    # used only when DATABASE_URL is empty
+    DATABASE_BACKEND: Literal["postgresql", "sqlite"] = "postgresql"
+
+    @model_validator(mode="after")
+    def _compose_database_url(self) -> "Settings":
+        if not self.DATABASE_URL and self.DATABASE_BACKEND == "sqlite":
+            self.DATABASE_URL = f"sqlite:///{self.SQLITE_PATH}"
+        elif not self.DATABASE_URL:
+            self.DATABASE_URL = (
+                f"postgresql://{self.POSTGRES_USER}:"
+                f"{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:"
+                f"{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+            )
+        return self
+
+    # === SQLite (single node / tests) ===
+    SQLITE_PATH: str = "handshake.db"
+    # NORMAL can lose the last commits on power loss, never corrupts in WAL
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL"] = "NORMAL"
+    SQLITE_CACHE_SIZE_MB: int = 64  # page cache per connection
+    SQLITE_MMAP_SIZE_MB: int = 256
+    SQLITE_BUSY_TIMEOUT_SECONDS: float = 5.0  # how long a writer waits for the lock
+
+    # === Read replicas ===
+    DATABASE_REPLICA_URLS: list[str] = []
+    # after a write, the same user keeps reading from the primary this long
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    # "no recent write" is remembered this long per process before asking
+    # the primary again; a write made through another process can go
+    # unseen for up to this long
+    READ_YOUR_WRITES_NEGATIVE_CACHE_SECONDS: float = 1.0
+    READ_YOUR_WRITES_PRUNE_INTERVAL_SECONDS: float = 300.0
+
+    # === Connection pool (per process) ===
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # `python -m app serve` 會把這個上限平均分給各 worker（0 = 不分配）
+    DB_MAX_CONNECTIONS: int = 0
+
+    # === Server (python -m app serve) ===
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 8000
+    WEB_WORKERS: int = 0  # 0 = one per CPU
+    WEB_GRACEFUL_TIMEOUT_SECONDS: float = 30.0
+    # jobs that touch shared state run in one worker at a time: whichever
+    # holds a PostgreSQL advisory lock, or on SQLite this file ("" = next
+    # to the database)
+    JOBS_LOCK_FILE: str = ""
+
+    # === Query logging ===
+    SQL_ECHO: bool = False  # log every statement (debug only)
+    SLOW_QUERY_MS: float = 200.0
+    N_PLUS_ONE_THRESHOLD: int = 5  # same statement more often -> suspect
+    QUERY_BUDGETS_ENFORCE: bool = False  # raise on per-route budget overrun
+
+    # === Admission control ===
+    THREADPOOL_SIZE: int = 40  # AnyIO threads running sync routes
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 40  # keep in line with THREADPOOL_SIZE
+    ADMISSION_MAX_QUEUE: int = 200  # per gate; beyond this, reject at once
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    # route template -> concurrent requests (argon2 and uploads are costly)
+    ADMISSION_ROUTE_LIMITS: dict[str, int] = {
+        "/auth/login": 8,
+        "/auth/login/json": 8,
+        "/auth/register": 4,
+        "/deliverables/projects/{project_id}/upload": 8,
+        "/export/{entity}": 4,
+    }
+    # long-lived or operational endpoints that must not be shed
+    ADMISSION_EXEMPT_PATHS: list[str] = ["/metrics", "/events/stream"]
+
+    # === Login throttling (checked before any password hashing) ===
+    LOGIN_THROTTLE_ENABLED: bool = True
+    # "database" shares the limits between worker processes
+    LOGIN_THROTTLE_BACKEND: Literal["memory", "database"] = "memory"
+    LOGIN_THROTTLE_MAX_KEYS: int = 100_000  # memory backend; oldest evicted
+    LOGIN_THROTTLE_PRUNE_INTERVAL_SECONDS: float = 60.0
+    LOGIN_USER_RATE_PER_MINUTE: float = 10.0  # token bucket per username
+    LOGIN_USER_BURST: int = 5
+    LOGIN_CLIENT_RATE_PER_MINUTE: float = 60.0  # token bucket per client address
+    LOGIN_CLIENT_BURST: int = 30
+    # this many failures within the window lock the username / address out
+    LOGIN_FAILURE_WINDOW_SECONDS: float = 900.0
+    LOGIN_USER_MAX_FAILURES: int = 10
+    LOGIN_CLIENT_MAX_FAILURES: int = 100
+    LOGIN_LOCKOUT_SECONDS: float = 300.0
+    # unknown usernames skip the database this long (per process)
+    LOGIN_UNKNOWN_USER_TTL_SECONDS: float = 30.0
+    LOGIN_UNKNOWN_USER_CACHE_SIZE: int = 10_000
+
+    # === Uploads ===
+    UPLOAD_PROJECT_QUOTA_MB: int = 0  # 0 = unlimited
+    UPLOAD_WORKER_QUOTA_MB: int = 0
+    UPLOAD_GC_ENABLED: bool = True
+    UPLOAD_GC_INTERVAL_SECONDS: float = 3600.0
+    # younger files may belong to an upload that has not committed yet
+    UPLOAD_GC_GRACE_SECONDS: float = 3600.0
+    UPLOAD_GC_BATCH_SIZE: int = 500  # directory entries looked up per query
+
+    # === Idempotency-Key (safe retries of POST requests) ===
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: float = 86400.0  # stored responses are replayed this long
+    # an original that has not finished by then is presumed dead
+    IDEMPOTENCY_LOCK_SECONDS: float = 300.0
+    # a duplicate waits this long for the original, then gets 409
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_MAX_RESPONSE_BYTES: int = 65536  # larger ones keep only the status
+    IDEMPOTENCY_PRUNE_INTERVAL_SECONDS: float = 600.0
+
+    # === Bulk writes ===
+    BULK_MAX_ITEMS: int = 1000  # per /projects/bulk or /quotes/bulk request
+
+    # === Archive (finished projects leave the hot tables) ===
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_AFTER_DAYS: float = 30.0  # since the project was completed / rejected
+    ARCHIVE_INTERVAL_SECONDS: float = 3600.0
+    ARCHIVE_BATCH_SIZE: int = 500  # projects per transaction
+
+    # === Export ===
+    EXPORT_BATCH_SIZE: int = 1000  # rows fetched and sent per chunk
+
+    # === Profiling ===
+    PROFILING_ENABLED: bool = False
+    # requests sending this value in X-Profile-Token are profiled; empty = off
+    PROFILING_ADMIN_TOKEN: str = ""
+    PROFILING_INTERVAL_MS: float = 1.0
+    PROFILING_SAMPLE_RATE: float = 0.0  # fraction of traffic profiled continuously
+    PROFILING_OUTPUT_DIR: str = "profiles"
+    PROFILING_REPORT_INTERVAL_SECONDS: float = 300.0
+
+    # === Status history and audit log ===
+    AUDIT_ENABLED: bool = True
+    # events waiting to be written; more are dropped (and counted)
+    AUDIT_BUFFER_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 500  # rows per INSERT
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+
+    # === Password hashing (argon2id) ===
+    # argon2-cffi's defaults; tune with `python -m app calibrate-hasher`.
+    # Stored hashes with other parameters are rehashed on the next login.
+    PASSWORD_HASH_TIME_COST: int = 3
+    PASSWORD_HASH_MEMORY_KIB: int = 65536
+    PASSWORD_HASH_PARALLELISM: int = 4
 
     # === JWT settings ===
     JWT_SECRET_KEY: str = Field(default="secret", description="JWT signing key")
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    # === Event stream (SSE) ===
+    # "auto" uses LISTEN/NOTIFY on PostgreSQL and an in-process broker otherwise
+    EVENTS_BACKEND: str = "auto"
+    EVENTS_BUFFER_SIZE: int = 10000  # recent events kept for Last-Event-ID
+    EVENTS_QUEUE_SIZE: int = 100  # per-subscriber backlog before it is dropped
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    EVENTS_RETRY_MS: int = 3000
+    EVENTS_RECONNECT_SECONDS: float = 2.0
+
+    # === Change feed ===
+    CHANGES_MAX_PAGE_SIZE: int = 5000
+    # hold back entries this young so late commits are not skipped
+    CHANGES_SETTLE_SECONDS: float = 2.0
+    CHANGES_COMPACT_INTERVAL_SECONDS: float = 300.0
+
+    # === Project recommendations ===
+    RECOMMEND_HISTORY_SIZE: int = 50  # recent quoted projects used as the query
+    RECOMMEND_QUERY_TERMS: int = 32
+    RECOMMEND_CHAMPION_SIZE: int = 1000  # postings scanned per query term
+    RECOMMEND_SYNC_INTERVAL_SECONDS: float = 5.0
+    RECOMMEND_REBUILD_INTERVAL_SECONDS: float = 3600.0
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,233 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Collection, Sequence, TypeVar
+
+from sqlalchemy import (
+    ColumnElement,
+    DateTime,
+    Table,
+    and_,
+    delete,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+    union_all,
+)
+from sqlalchemy.orm import noload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session, SQLModel
+
+from app.models.archive import ARCHIVES
+from app.models.deliverable import Deliverable
+from app.models.project import Project, ProjectStatus
+from app.models.quote import ProjectQuoteStats, Quote
+from app.models.upload import ProjectUploadUsage
+from app.models.worker_profile import ProjectAssignment
+from app.querylog import allow_queries
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=SQLModel)
+
+# a filter written once for both the hot table and its archive
+Where = Callable[[Table], ColumnElement[bool]]
+
+FINISHED = (ProjectStatus.COMPLETED, ProjectStatus.REJECTED)
+
+QUOTE_STATS = ("quote_count", "min_amount", "avg_amount", "min_days")
+
+# relations of quotes and deliverables that list endpoints can ?expand=
+EXPANDABLE = ("worker", "project")
+
+
+# ---------------------------------------------------------
+# Read
+# ---------------------------------------------------------
+def load_archived(session: Session, model: type[M], where: Where) -> list[M]:
+    """Archived rows of ``model`` as detached instances.
+
+    They are not in the session, so they are never flushed back into the
+    hot table; archived data is read-only. Projects come with their
+    ``quote_stats``, like hot ones.
+    """
+    hot: Table = model.__table__  # type: ignore[attr-defined]
+    archive = ARCHIVES[hot.name]
+    stmt = select(*(archive.c[column.name] for column in hot.c)).where(where(archive))
+    if model is not Project:
+        return [model(**row) for row in session.execute(stmt).mappings()]
+
+    # the stats row was dropped with the project: recount it from the
+    # archived quotes, in the same query
+    quotes = ARCHIVES["quotes"]
+    stats = (
+        select(
+            quotes.c.project_id,
+            func.count().label("quote_count"),
+            func.min(quotes.c.amount).label("min_amount"),
+            func.avg(quotes.c.amount).label("avg_amount"),
+            func.min(quotes.c.days).label("min_days"),
+        )
+        .where(quotes.c.project_id.in_(select(archive.c.id).where(where(archive))))
+        .group_by(quotes.c.project_id)
+        .subquery()
+    )
+    stmt = stmt.add_columns(*stats.c).outerjoin(
+        stats, stats.c.project_id == archive.c.id
+    )
+    projects = []
+    for row in session.execute(stmt).mappings():
+        project = Project(**{column.name: row[column.name] for column in hot.c})
+        quote_stats = None
+        if row["quote_count"]:
+            quote_stats = ProjectQuoteStats(
+                project_id=project.id,
+                **{name: row[name] for name in QUOTE_STATS},
+            )
+        set_committed_value(project, "quote_stats", quote_stats)
+        projects.append(project)
+    return projects  # type: ignore[return-value]
+
+
+def select_with_archived(
+    model: type[M],
+    where: Where,
+    *order_by: str,
+    limit=None,
+    expand: Collection[str] = (),
+):
+    """ORM select of ``model`` rows matching ``where`` in the hot table and
+    in its archive, as one ``UNION ALL`` query.
+
+    Each relation named in ``expand`` costs one more query for all rows
+    together; the others are never loaded, not even lazily. Projects that
+    were archived are not found that way, see ``attach_archived_projects``.
+    """
+    hot: Table = model.__table__  # type: ignore[attr-defined]
+    archive = ARCHIVES[hot.name]
+    union = union_all(
+        select(*hot.c).where(where(hot)),
+        select(*(archive.c[column.name] for column in hot.c)).where(where(archive)),
+    )
+    if order_by:
+        union = union.order_by(*(union.selected_columns[name] for name in order_by))
+    if limit is not None:
+        union = union.limit(limit)
+    options = [
+        (selectinload if name in expand else noload)(getattr(model, name))
+        for name in EXPANDABLE
+    ]
+    return select(model).from_statement(union).options(*options)
+
+
+def attach_archived_projects(session: Session, rows: Sequence[SQLModel]) -> None:
+    """Set the ``project`` of rows whose project is in the archive, which
+    an expanded ``select_with_archived`` left as None; one query for all."""
+    missing = {
+        row.project_id  # type: ignore[attr-defined]
+        for row in rows
+        if row.project is None and row.project_id is not None  # type: ignore
+    }
+    if not missing:
+        return
+    allow_queries(1, "archived projects")
+    projects = {
+        project.id: project
+        for project in load_archived(session, Project, lambda t: t.c.id.in_(missing))
+    }
+    for row in rows:
+        project = projects.get(row.project_id)  # type: ignore[attr-defined]
+        if project is not None:
+            set_committed_value(row, "project", project)
+
+
+# ---------------------------------------------------------
+# Move finished projects out of the hot tables
+# ---------------------------------------------------------
+def archive_finished_projects(
+    session: Session, older_than: timedelta, batch_size: int
+) -> int:
+    """Move up to ``batch_size`` projects finished before ``older_than``
+    ago, with their quotes and deliverables, into the archive tables.
+
+    One transaction per batch. The projects are copied first, which
+    also locks them, so a project that changes meanwhile is either moved
+    whole or left alone.
+    """
+    now = datetime.now(timezone.utc)
+    projects: Table = Project.__table__  # type: ignore[attr-defined]
+    finished = and_(
+        projects.c.status.in_(FINISHED),
+        projects.c.update_at < now - older_than,
+    )
+    clashing = _clashes_with_archive(projects)
+
+    candidates = (
+        select(projects.c.id)
+        .where(finished, ~clashing)
+        .order_by(projects.c.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    project_ids = list(
+        session.scalars(
+            _copy(projects, projects.c.id.in_(candidates), now).returning(
+                ARCHIVES["projects"].c.id
+            )
+        )
+    )
+    if not project_ids:
+        session.rollback()
+        stuck = session.scalars(
+            select(projects.c.id).where(finished, clashing).limit(20)
+        ).all()
+        if stuck:
+            logger.error(
+                "not archiving projects %s: an id of theirs, or of their quotes "
+                "or deliverables, is already taken in the archive",
+                stuck,
+            )
+        return 0
+
+    for model in (Quote, Deliverable):
+        table: Table = model.__table__  # type: ignore[attr-defined]
+        session.execute(_copy(table, table.c.project_id.in_(project_ids), now))
+
+    # children first, the foreign keys point at projects
+    for model in (
+        Deliverable,
+        Quote,
+        ProjectQuoteStats,
+        ProjectAssignment,
+        ProjectUploadUsage,
+    ):
+        session.execute(
+            delete(model).where(model.project_id.in_(project_ids))  # type: ignore
+        )
+    session.execute(delete(Project).where(Project.id.in_(project_ids)))  # type: ignore
+    session.commit()
+    return len(project_ids)
+
+
+def _clashes_with_archive(projects: Table) -> ColumnElement[bool]:
+    """The project, one of its quotes or one of its deliverables has an id
+    that a reused id already put in the archive; copying it would fail the
+    whole batch, every time."""
+    conditions = [projects.c.id.in_(select(ARCHIVES["projects"].c.id))]
+    for model in (Quote, Deliverable):
+        table: Table = model.__table__  # type: ignore[attr-defined]
+        conditions.append(
+            exists().where(
+                table.c.project_id == projects.c.id,
+                table.c.id.in_(select(ARCHIVES[table.name].c.id)),
+            )
+        )
+    return or_(*conditions)
+
+
+def _copy(hot: Table, where: ColumnElement[bool], now: datetime):
+    archive = ARCHIVES[hot.name]
+    columns = [column.name for column in hot.c]
+    rows = select(*hot.c, literal(now, DateTime(timezone=True))).where(where)
+    return archive.insert().from_select([*columns, "archived_at"], rows)
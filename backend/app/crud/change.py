@@ -0,0 +1,322 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional, Sequence
+
+from sqlalchemy import Table, delete, exists, func, insert, or_, true, update
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, SQLModel, select
+
+from app.crud.archive import load_archived
+from app.database import register_backfill
+from app.models.archive import ARCHIVES
+from app.models.change import Change, ChangeOp
+from app.models.deliverable import Deliverable
+from app.models.project import Project, ProjectStatus
+from app.models.quote import Quote
+from app.models.user import User
+
+ENTITY_MODELS: dict[str, type[SQLModel]] = {
+    "projects": Project,
+    "quotes": Quote,
+    "deliverables": Deliverable,
+    "users": User,
+}
+
+
+# ---------------------------------------------------------
+# Write (called by the other crud modules before commit)
+# ---------------------------------------------------------
+def record_change(
+    session: Session,
+    entity: str,
+    obj: SQLModel,
+    op: ChangeOp = ChangeOp.UPSERT,
+) -> None:
+    """Append a change log entry for ``obj`` in the caller's transaction,
+    so the entry and the row are committed (or rolled back) together."""
+    if obj.id is None:  # type: ignore[attr-defined]
+        # new row: flush to get its id
+        session.flush()
+
+    record_change_id(session, entity, obj.id, op)  # type: ignore[attr-defined]
+
+
+def record_change_id(
+    session: Session,
+    entity: str,
+    entity_id: int,
+    op: ChangeOp = ChangeOp.UPSERT,
+) -> None:
+    """Same as ``record_change`` for a row that is not loaded."""
+    audience = _audiences(session, entity, [entity_id]).get(entity_id, {})
+    session.add(Change(entity=entity, entity_id=entity_id, op=op, **audience))
+
+
+def record_change_ids(
+    session: Session,
+    entity: str,
+    entity_ids: Iterable[int],
+    op: ChangeOp = ChangeOp.UPSERT,
+) -> None:
+    """``record_change_id`` for a batch, as one executemany INSERT."""
+    now = datetime.now(timezone.utc)
+    entity_ids = list(entity_ids)
+    audiences = _audiences(session, entity, entity_ids) if entity_ids else {}
+    rows = [
+        {
+            "entity": entity,
+            "entity_id": i,
+            "op": op,
+            "create_at": now,
+            **_NO_AUDIENCE,
+            **audiences.get(i, {}),
+        }
+        for i in entity_ids
+    ]
+    if rows:
+        session.execute(insert(Change), rows)
+
+
+_NO_AUDIENCE: dict[str, Any] = {
+    "public": False,
+    "owner_id": None,
+    "worker_id": None,
+    "former_worker_id": None,
+    "public_since": None,
+}
+
+
+def _audiences(
+    session: Session, entity: str, entity_ids: list[int]
+) -> dict[int, dict[str, Any]]:
+    """The audience columns of a new change for each row, from its state
+    in the caller's transaction; rows that are gone keep their last one."""
+    audiences: dict[int, dict[str, Any]] = {}
+    if entity == "users":
+        return {i: {"owner_id": i} for i in entity_ids}
+
+    previous = {}
+    if entity == "projects":
+        previous = _latest_changes(session, entity, entity_ids)
+        # at most this change's own id, which is not known yet
+        next_id = (session.exec(select(func.max(Change.id))).one() or 0) + 1
+        rows = select(
+            Project.id, Project.client_id, Project.worker_id, Project.status
+        ).where(
+            Project.id.in_(entity_ids)  # type: ignore[union-attr]
+        )
+        for project_id, client_id, worker_id, status in session.exec(rows):
+            last = previous.get(project_id)
+            former = last.former_worker_id if last else None
+            if last and last.worker_id not in (None, worker_id):
+                former = last.worker_id
+            public = status == ProjectStatus.OPEN
+            since = last.public_since if last else None
+            if public and since is None:
+                since = next_id
+            audiences[project_id] = {
+                "public": public,
+                "owner_id": client_id,
+                "worker_id": worker_id,
+                "former_worker_id": former,
+                "public_since": since,
+            }
+    else:
+        model = ENTITY_MODELS[entity]
+        for row_id, worker_id, client_id in session.exec(
+            select(model.id, model.worker_id, Project.client_id)  # type: ignore
+            .join(Project, Project.id == model.project_id, isouter=True)  # type: ignore
+            .where(model.id.in_(entity_ids))  # type: ignore[attr-defined]
+        ):
+            audiences[row_id] = {"owner_id": client_id, "worker_id": worker_id}
+
+    missing = [i for i in entity_ids if i not in audiences]
+    if missing:
+        if entity != "projects":
+            previous = _latest_changes(session, entity, missing)
+        for i in missing:
+            last = previous.get(i)
+            if last is not None:
+                audiences[i] = {name: getattr(last, name) for name in _NO_AUDIENCE}
+    return audiences
+
+
+def _latest_changes(
+    session: Session, entity: str, entity_ids: list[int]
+) -> dict[int, Change]:
+    latest = (
+        select(func.max(Change.id))
+        .where(Change.entity == entity, Change.entity_id.in_(entity_ids))  # type: ignore
+        .group_by(Change.entity_id)  # type: ignore[arg-type]
+    )
+    changes = session.exec(select(Change).where(Change.id.in_(latest)))  # type: ignore
+    return {change.entity_id: change for change in changes}
+
+
+# ---------------------------------------------------------
+# Read
+# ---------------------------------------------------------
+def list_changes_since(
+    session: Session,
+    since: int,
+    limit: int,
+    settle_seconds: float,
+    viewer_id: Optional[int] = None,
+) -> Sequence[Change]:
+    """Changes after ``since`` in cursor order; with ``viewer_id``, only
+    those about rows that user can see, or may still hold from before.
+
+    Entries younger than ``settle_seconds`` are held back: ids are handed
+    out at insert time, so a slower transaction can still commit a smaller
+    id than one we already returned.
+    """
+    settled = datetime.now(timezone.utc) - timedelta(seconds=settle_seconds)
+    stmt = (
+        select(Change)
+        .where(Change.id > since, Change.create_at <= settled)  # type: ignore
+        .order_by(Change.id)  # type: ignore
+        .limit(limit)
+    )
+    if viewer_id is not None:
+        stmt = stmt.where(
+            or_(
+                Change.public == true(),
+                Change.owner_id == viewer_id,
+                Change.worker_id == viewer_id,
+                Change.former_worker_id == viewer_id,
+                Change.public_since <= since,  # type: ignore[operator]
+            )
+        )
+    return session.exec(stmt).all()
+
+
+def last_settled_change_id(session: Session, settle_seconds: float) -> int:
+    """The cursor after every settled change; walks back over the few
+    that are still settling."""
+    settled = datetime.now(timezone.utc) - timedelta(seconds=settle_seconds)
+    stmt = (
+        select(Change.id)
+        .where(Change.create_at <= settled)  # type: ignore
+        .order_by(Change.id.desc())  # type: ignore[union-attr]
+        .limit(1)
+    )
+    return session.exec(stmt).first() or 0
+
+
+def could_have_seen(change: Change, viewer_id: int, since: int) -> bool:
+    """Whether a client synced up to ``since`` may hold the row: it needs
+    a tombstone once the row is gone or hidden from it."""
+    involved = (change.owner_id, change.worker_id, change.former_worker_id)
+    return viewer_id in involved or (
+        change.public_since is not None and change.public_since <= since
+    )
+
+
+def load_changed_rows(
+    session: Session, changes: Sequence[Change]
+) -> tuple[dict[str, dict[int, SQLModel]], set[tuple[str, int]]]:
+    """Resolve a page of changes into current rows and deleted keys.
+
+    Only the last entry per row counts, and each entity type costs one
+    ``IN`` query regardless of the page size.
+    """
+    latest: dict[tuple[str, int], ChangeOp] = {}
+    for change in changes:
+        latest[(change.entity, change.entity_id)] = change.op
+
+    wanted: dict[str, set[int]] = defaultdict(set)
+    deleted: set[tuple[str, int]] = set()
+    for (entity, entity_id), op in latest.items():
+        if op == ChangeOp.DELETE:
+            deleted.add((entity, entity_id))
+        else:
+            wanted[entity].add(entity_id)
+
+    rows: dict[str, dict[int, SQLModel]] = {}
+    for entity, ids in wanted.items():
+        model = ENTITY_MODELS[entity]
+        stmt = select(model).where(model.id.in_(ids))  # type: ignore
+        rows[entity] = {row.id: row for row in session.exec(stmt)}  # type: ignore
+
+        # moved to the archive: still there, just no longer hot
+        missing = ids - rows[entity].keys()
+        if missing and entity != "users":
+            for row in load_archived(session, model, lambda t: t.c.id.in_(missing)):
+                rows[entity][row.id] = row  # type: ignore[attr-defined]
+
+        # rows that disappeared without a delete entry
+        deleted.update((entity, i) for i in ids - rows[entity].keys())
+
+    return rows, deleted
+
+
+# ---------------------------------------------------------
+# Compaction (keep only the latest entry per row)
+# ---------------------------------------------------------
+def compact_changes(session: Session, settle_seconds: float) -> int:
+    """Delete entries superseded by a newer one for the same row.
+
+    A client syncing from any cursor, including 0, still sees the latest
+    state of every row, so compaction never breaks the feed.
+    """
+    newer = aliased(Change)
+    settled = datetime.now(timezone.utc) - timedelta(seconds=settle_seconds)
+
+    stmt = delete(Change).where(
+        Change.create_at <= settled,  # type: ignore
+        exists().where(
+            newer.entity == Change.entity,
+            newer.entity_id == Change.entity_id,
+            newer.id > Change.id,  # type: ignore
+        ),
+    )
+    result = session.exec(stmt)  # type: ignore
+    session.commit()
+    return result.rowcount
+
+
+# ---------------------------------------------------------
+# Backfill
+# ---------------------------------------------------------
+@register_backfill("changes.owner_id")
+def backfill_change_audiences(session: Session) -> None:
+    """Fill the audience of entries logged before it was recorded, from the
+    rows as they are now. Any open or formerly open project counts as
+    public from the start, as the feed used to treat it."""
+
+    def current(column: str, hot: Table, key: Any) -> Any:
+        archive = ARCHIVES[hot.name]
+        return func.coalesce(
+            select(hot.c[column]).where(hot.c.id == key).scalar_subquery(),
+            select(archive.c[column]).where(archive.c.id == key).scalar_subquery(),
+        )
+
+    projects: Table = Project.__table__  # type: ignore[attr-defined]
+    session.execute(
+        update(Change)
+        .where(Change.entity == "projects")  # type: ignore[arg-type]
+        .values(
+            public=current("status", projects, Change.entity_id)
+            == ProjectStatus.OPEN.name,
+            owner_id=current("client_id", projects, Change.entity_id),
+            worker_id=current("worker_id", projects, Change.entity_id),
+            public_since=0,
+        )
+    )
+    for model in (Quote, Deliverable):
+        table: Table = model.__table__  # type: ignore[attr-defined]
+        project_id = current("project_id", table, Change.entity_id)
+        session.execute(
+            update(Change)
+            .where(Change.entity == table.name)  # type: ignore[arg-type]
+            .values(
+                owner_id=current("client_id", projects, project_id),
+                worker_id=current("worker_id", table, Change.entity_id),
+            )
+        )
+    session.execute(
+        update(Change)
+        .where(Change.entity == "users")  # type: ignore[arg-type]
+        .values(owner_id=Change.entity_id)
+    )
+    session.commit()
@@ -1,8 +1,16 @@
-from typing import Sequence
+from typing import Collection, Optional, Sequence
 
-from sqlmodel import Session, select
+from sqlmodel import Session
 
+from app.crud.archive import (
+    attach_archived_projects,
+    load_archived,
+    select_with_archived,
+)
+from app.crud.change import record_change
+from app.crud.upload import record_upload
 from app.models.deliverable import Deliverable
+from app.querylog import allow_queries
 from app.schemas.deliverable import DeliverableCreate
 
 
@@ -11,7 +19,10 @@ def create_deliverable(
     project_id: int | None,
     worker_id: int | None,
     data: DeliverableCreate,
+    file_size: Optional[int] = None,
 ) -> Deliverable:
+    """``file_size`` is given for uploaded files and counts towards the
+    project's and the worker's upload usage."""
     deliverable = Deliverable(
         project_id=project_id,
         worker_id=worker_id,
@@ -20,6 +31,9 @@ def create_deliverable(
     )
 
     session.add(deliverable)
+    record_change(session, "deliverables", deliverable)
+    if file_size is not None:
+        record_upload(session, project_id, worker_id, file_size)  # type: ignore
     session.commit()
     session.refresh(deliverable)
 
@@ -27,7 +41,24 @@ def create_deliverable(
 
 
 def list_deliverables_by_project(
-    session: Session, project_id: int
+    session: Session, project_id: int, expand: Collection[str] = ()
 ) -> Sequence[Deliverable]:
-    stmt = select(Deliverable).where(Deliverable.project_id == project_id)
-    return session.exec(stmt).all()
+    stmt = select_with_archived(
+        Deliverable, lambda t: t.c.project_id == project_id, expand=expand
+    )
+    deliverables = session.scalars(stmt).all()
+    if "project" in expand:
+        attach_archived_projects(session, deliverables)
+    return deliverables
+
+
+def get_deliverable(session: Session, deliverable_id: int) -> Optional[Deliverable]:
+    """The deliverable, from the archive if its project was archived."""
+    deliverable = session.get(Deliverable, deliverable_id)
+    if deliverable is None:
+        allow_queries(1, "archived deliverable")
+        archived = load_archived(
+            session, Deliverable, lambda t: t.c.id == deliverable_id
+        )
+        deliverable = archived[0] if archived else None
+    return deliverable
@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import Select, Table, or_, select
+from sqlmodel import Session
+
+from app.models.archive import ARCHIVES
+from app.models.deliverable import Deliverable
+from app.models.project import Project, ProjectStatus
+from app.models.quote import Quote
+
+EXPORT_TABLES: dict[str, Table] = {
+    "projects": Project.__table__,  # type: ignore[attr-defined]
+    "quotes": Quote.__table__,  # type: ignore[attr-defined]
+    "deliverables": Deliverable.__table__,  # type: ignore[attr-defined]
+}
+
+
+def export_statements(
+    entity: str,
+    user_id: int,
+    status: Optional[ProjectStatus] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> list[Select]:
+    """Rows of ``entity`` the user may see: the hot table oldest first,
+    then the archive oldest first.
+
+    Projects the user owns or works on; quotes and deliverables the user
+    made or that belong to the user's projects. ``status`` filters on the
+    project's status, the dates on ``create_at``.
+    """
+    hot = EXPORT_TABLES[entity]
+    projects = Project.__table__  # type: ignore[attr-defined]
+    return [
+        _export_statement(hot, hot, projects, user_id, status, since, until),
+        # archived rows only ever point at archived projects
+        _export_statement(
+            hot,
+            ARCHIVES[hot.name],
+            ARCHIVES[projects.name],
+            user_id,
+            status,
+            since,
+            until,
+        ),
+    ]
+
+
+def _export_statement(
+    hot: Table,
+    table: Table,
+    projects: Table,
+    user_id: int,
+    status: Optional[ProjectStatus],
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> Select:
+    stmt = select(*(table.c[column.name] for column in hot.c)).order_by(table.c.id)
+
+    if table is projects:
+        stmt = stmt.where(
+            or_(projects.c.client_id == user_id, projects.c.worker_id == user_id)
+        )
+        if status is not None:
+            stmt = stmt.where(projects.c.status == status)
+    else:
+        owned = select(projects.c.id).where(projects.c.client_id == user_id)
+        stmt = stmt.where(
+            or_(table.c.worker_id == user_id, table.c.project_id.in_(owned))
+        )
+        if status is not None:
+            stmt = stmt.where(
+                table.c.project_id.in_(
+                    select(projects.c.id).where(projects.c.status == status)
+                )
+            )
+
+    if since is not None:
+        stmt = stmt.where(table.c.create_at >= since)
+    if until is not None:
+        stmt = stmt.where(table.c.create_at < until)
+    return stmt
+
+
+def iter_export_rows(
+    session: Session, statements: list[Select], batch_size: int
+) -> Iterator[list[dict]]:
+    """Yield the results, one after the other, in batches of plain rows.
+
+    ``yield_per`` streams from a server-side cursor on Postgres (SQLite
+    steps its cursor lazily anyway), so memory does not grow with the
+    size of the export.
+    """
+    for stmt in statements:
+        result = session.execute(stmt.execution_options(yield_per=batch_size))
+        for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
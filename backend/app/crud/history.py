@@ -0,0 +1,98 @@
+import math
+from datetime import datetime
+from typing import Optional, Sequence
+
+from sqlalchemy import case, func
+from sqlmodel import Session, select
+
+from app.models.audit import ProjectStatusEvent
+from app.models.project import ProjectStatus
+from app.schemas.history import DurationStats, ProjectDurations
+
+
+# ---------------------------------------------------------
+# Timeline of one project
+# ---------------------------------------------------------
+def list_project_history(
+    session: Session, project_id: int
+) -> Sequence[ProjectStatusEvent]:
+    stmt = (
+        select(ProjectStatusEvent)
+        .where(ProjectStatusEvent.project_id == project_id)
+        .order_by(ProjectStatusEvent.create_at, ProjectStatusEvent.id)  # type: ignore
+    )
+    return session.exec(stmt).all()
+
+
+# ---------------------------------------------------------
+# Durations over many projects
+# ---------------------------------------------------------
+def _first(status: ProjectStatus):
+    event = ProjectStatusEvent
+    return func.min(case((event.to_status == status, event.create_at)))
+
+
+def _summary(seconds: list[float]) -> DurationStats:
+    if not seconds:
+        return DurationStats()
+    seconds.sort()
+
+    def percentile(p: float) -> float:
+        # nearest rank
+        return seconds[max(0, math.ceil(p * len(seconds)) - 1)]
+
+    return DurationStats(
+        count=len(seconds),
+        mean_seconds=sum(seconds) / len(seconds),
+        p50_seconds=percentile(0.5),
+        p90_seconds=percentile(0.9),
+    )
+
+
+def project_durations(
+    session: Session,
+    client_id: Optional[int] = None,
+    worker_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+) -> ProjectDurations:
+    """Time to assign and time to complete over the projects of a client
+    or of a worker, optionally only those created since ``since``.
+
+    One grouped query: a row per project with the first time it reached
+    each status. Projects created before the history was recorded have
+    no creation event and count for time to complete only.
+    """
+    event = ProjectStatusEvent
+    opened = _first(ProjectStatus.OPEN)
+    stmt = select(
+        event.project_id,
+        opened,
+        _first(ProjectStatus.IN_PROGRESS),
+        _first(ProjectStatus.COMPLETED),
+    ).group_by(event.project_id)
+    if client_id is not None:
+        stmt = stmt.where(event.client_id == client_id)
+    if worker_id is not None:
+        # a project's events before its assignment carry no worker
+        assigned_to_worker = select(event.project_id).where(
+            event.worker_id == worker_id
+        )
+        stmt = stmt.where(event.project_id.in_(assigned_to_worker))  # type: ignore
+    if since is not None:
+        stmt = stmt.having(opened >= since)
+
+    projects = 0
+    to_assign: list[float] = []
+    to_complete: list[float] = []
+    for _, open_at, assign_at, complete_at in session.exec(stmt):
+        projects += 1
+        if open_at is not None and assign_at is not None:
+            to_assign.append((assign_at - open_at).total_seconds())
+        if assign_at is not None and complete_at is not None:
+            to_complete.append((complete_at - assign_at).total_seconds())
+
+    return ProjectDurations(
+        projects=projects,
+        time_to_assign=_summary(to_assign),
+        time_to_complete=_summary(to_complete),
+    )
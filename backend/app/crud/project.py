@@ -1,9 +1,17 @@
 from datetime import datetime, timezone
 from typing import Optional, Sequence
 
+from sqlalchemy import Table, union_all
 from sqlmodel import Session, select
 
+from app.audit import audit_log
+from app.crud.archive import load_archived
+from app.crud.change import record_change, record_change_ids
+from app.crud.worker_profile import apply_project_transition
+from app.database import insert_returning_ids
+from app.models.archive import ARCHIVES
 from app.models.project import Project, ProjectStatus
+from app.querylog import allow_queries
 from app.schemas.project import ProjectCreate, ProjectUpdate
 
 
@@ -19,16 +27,65 @@ def create_project(
         client_id=client_id,
     )
     session.add(project)
+    record_change(session, "projects", project)
     session.commit()
     session.refresh(project)
+    audit_log.project_status(project, None, client_id, at=project.create_at)
     return project
 
 
+def create_projects(
+    session: Session, client_id: int | None, items: Sequence[ProjectCreate]
+) -> list[int]:
+    """Insert many projects in one transaction and return their ids, in
+    the order of ``items``.
+
+    One multi-row ``INSERT ... RETURNING`` per page of rows instead of an
+    INSERT, flush and refresh per project.
+    """
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "title": item.title,
+            "description": item.description,
+            "client_id": client_id,
+            "worker_id": None,
+            "status": ProjectStatus.OPEN,
+            "create_at": now,
+            "update_at": now,
+        }
+        for item in items
+    ]
+    ids = insert_returning_ids(session, Project, rows)
+
+    record_change_ids(session, "projects", ids)
+    session.commit()
+    audit_log.projects_created(ids, client_id, now)
+    return ids
+
+
 # ---------------------------------------------------------
 # Read
 # ---------------------------------------------------------
-def get_project(session: Session, project_id: int | None) -> Optional[Project]:
-    return session.get(Project, project_id)
+def get_project(
+    session: Session, project_id: int | None, include_archived: bool = False
+) -> Optional[Project]:
+    """The project, also looked up in the archive if ``include_archived``;
+    routes that modify the project leave it off."""
+    project = session.get(Project, project_id)
+    if project is None and include_archived:
+        allow_queries(1, "archived project")
+        archived = load_archived(session, Project, lambda t: t.c.id == project_id)
+        project = archived[0] if archived else None
+    return project
+
+
+def get_projects(session: Session, project_ids: set[int]) -> dict[int, Project]:
+    """Projects by id, in one query; missing ids are left out."""
+    if not project_ids:
+        return {}
+    stmt = select(Project).where(Project.id.in_(project_ids))  # type: ignore
+    return {project.id: project for project in session.exec(stmt)}  # type: ignore
 
 
 def list_open_projects(session: Session) -> Sequence[Project]:
@@ -37,24 +94,94 @@ def list_open_projects(session: Session) -> Sequence[Project]:
     return session.exec(stmt).all()
 
 
+def list_recent_open_projects(session: Session, limit: int) -> Sequence[Project]:
+    stmt = (
+        select(Project)
+        .where(Project.status == ProjectStatus.OPEN)
+        .order_by(Project.id.desc())  # type: ignore[union-attr]
+        .limit(limit)
+    )
+    return session.exec(stmt).all()
+
+
+def list_open_projects_by_ids(
+    session: Session, project_ids: Sequence[int]
+) -> list[Project]:
+    """Open projects among ``project_ids``, in the given order."""
+    if not project_ids:
+        return []
+    stmt = select(Project).where(
+        Project.id.in_(project_ids),  # type: ignore[union-attr]
+        Project.status == ProjectStatus.OPEN,
+    )
+    found = {project.id: project for project in session.exec(stmt)}
+    return [found[i] for i in project_ids if i in found]
+
+
+def list_project_texts(session: Session, project_ids: set[int]) -> list[str]:
+    """Title and description of each project, for term extraction."""
+    if not project_ids:
+        return []
+    stmt = select(Project.id, Project.title, Project.description).where(
+        Project.id.in_(project_ids)  # type: ignore[union-attr]
+    )
+    texts = {
+        i: f"{title} {description}" for i, title, description in session.exec(stmt)
+    }
+
+    missing = project_ids - texts.keys()
+    if missing:
+        for project in load_archived(session, Project, lambda t: t.c.id.in_(missing)):
+            texts[project.id] = f"{project.title} {project.description}"  # type: ignore
+    return list(texts.values())
+
+
 def list_projects_by_client(
     session: Session, client_id: int | None
 ) -> Sequence[Project]:
     stmt = select(Project).where(Project.client_id == client_id)
-    return session.exec(stmt).all()
+    archived = load_archived(session, Project, lambda t: t.c.client_id == client_id)
+    return [*session.exec(stmt), *archived]
 
 
 def list_projects_by_worker(
     session: Session, worker_id: int | None
 ) -> Sequence[Project]:
     stmt = select(Project).where(Project.worker_id == worker_id)
-    return session.exec(stmt).all()
+    archived = load_archived(session, Project, lambda t: t.c.worker_id == worker_id)
+    return [*session.exec(stmt), *archived]
+
+
+def list_recent_worker_project_ids(
+    session: Session, worker_id: int | None, limit: int
+) -> list[int]:
+    """The worker's ``limit`` most recently updated projects, archived
+    ones included."""
+    projects: Table = Project.__table__  # type: ignore[attr-defined]
+    latest = [
+        select(table.c.id, table.c.update_at)
+        .where(table.c.worker_id == worker_id)
+        .order_by(table.c.update_at.desc())
+        .limit(limit)
+        .subquery()
+        for table in (projects, ARCHIVES["projects"])
+    ]
+    union = union_all(*(select(*table.c) for table in latest)).subquery()
+    stmt = select(union.c.id).order_by(union.c.update_at.desc()).limit(limit)
+    return list(session.exec(stmt))
 
 
 # ---------------------------------------------------------
 # Update project (title, description, status, worker)
 # ---------------------------------------------------------
-def update_project(session: Session, project: Project, data: ProjectUpdate) -> Project:
+def update_project(
+    session: Session,
+    project: Project,
+    data: ProjectUpdate,
+    actor_id: int | None = None,
+) -> Project:
+    old_status, old_worker_id = project.status, project.worker_id
+
     if data.title is not None:
         project.title = data.title
 
@@ -70,8 +197,11 @@ def update_project(session: Session, project: Project, data: ProjectUpdate) -> P
     project.update_at = datetime.now(timezone.utc)
 
     session.add(project)
+    record_change(session, "projects", project)
+    apply_project_transition(session, project, old_status, old_worker_id)
     session.commit()
     session.refresh(project)
+    audit_log.project_status(project, old_status, actor_id)
 
     return project
 
@@ -79,14 +209,24 @@ def update_project(session: Session, project: Project, data: ProjectUpdate) -> P
 # ---------------------------------------------------------
 # Assign worker (接案人承接專案)
 # ---------------------------------------------------------
-def assign_worker(session: Session, project: Project, worker_id: int | None) -> Project:
+def assign_worker(
+    session: Session,
+    project: Project,
+    worker_id: int | None,
+    actor_id: int | None = None,
+) -> Project:
+    old_status, old_worker_id = project.status, project.worker_id
+
     project.worker_id = worker_id
     project.status = ProjectStatus.IN_PROGRESS
     project.update_at = datetime.now(timezone.utc)
 
     session.add(project)
+    record_change(session, "projects", project)
+    apply_project_transition(session, project, old_status, old_worker_id)
     session.commit()
     session.refresh(project)
+    audit_log.project_status(project, old_status, actor_id)
 
     return project
 
@@ -94,19 +234,31 @@ def assign_worker(session: Session, project: Project, worker_id: int | None) ->
 # ---------------------------------------------------------
 # Mark completed or rejected (委託人結案)
 # ---------------------------------------------------------
-def complete_project(session: Session, project: Project) -> Project:
+def complete_project(
+    session: Session, project: Project, actor_id: int | None = None
+) -> Project:
+    old_status, old_worker_id = project.status, project.worker_id
     project.status = ProjectStatus.COMPLETED
     project.update_at = datetime.now(timezone.utc)
     session.add(project)
+    record_change(session, "projects", project)
+    apply_project_transition(session, project, old_status, old_worker_id)
     session.commit()
     session.refresh(project)
+    audit_log.project_status(project, old_status, actor_id)
     return project
 
 
-def reject_project(session: Session, project: Project) -> Project:
+def reject_project(
+    session: Session, project: Project, actor_id: int | None = None
+) -> Project:
+    old_status, old_worker_id = project.status, project.worker_id
     project.status = ProjectStatus.REJECTED
     project.update_at = datetime.now(timezone.utc)
     session.add(project)
+    record_change(session, "projects", project)
+    apply_project_transition(session, project, old_status, old_worker_id)
     session.commit()
     session.refresh(project)
+    audit_log.project_status(project, old_status, actor_id)
     return project
@@ -1,9 +1,15 @@
-from typing import Optional, Sequence
+from datetime import datetime, timezone
+from typing import Collection, Optional, Sequence
 
-from sqlmodel import Session, select
+from sqlalchemy import case, func
+from sqlmodel import Session, delete, select
 
-from app.models.quote import Quote
-from app.schemas.quote import QuoteCreate
+from app.crud.archive import attach_archived_projects, select_with_archived
+from app.crud.change import record_change, record_change_id, record_change_ids
+from app.crud.worker_profile import record_quote, record_quotes
+from app.database import dialect_insert, insert_returning_ids, register_backfill
+from app.models.quote import ProjectQuoteStats, Quote
+from app.schemas.quote import QuoteBulkItem, QuoteCreate
 
 
 # ---------------------------------------------------------
@@ -23,12 +29,53 @@ def create_quote(
     )
 
     session.add(quote)
+    record_change(session, "quotes", quote)
+    if project_id is not None:
+        _add_to_quote_stats(session, [(project_id, data.amount, data.days)])
+        # the project's quote_stats changed too
+        record_change_id(session, "projects", project_id)
+    if worker_id is not None:
+        record_quote(session, worker_id, data.days)
     session.commit()
     session.refresh(quote)
 
     return quote
 
 
+def create_quotes(
+    session: Session, worker_id: int | None, items: Sequence[QuoteBulkItem]
+) -> list[int]:
+    """Insert many quotes by one worker in one transaction and return
+    their ids, in the order of ``items``.
+
+    The caller checks the projects. Stats, the worker profile and the
+    change log are updated once per batch, not once per quote.
+    """
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "project_id": item.project_id,
+            "worker_id": worker_id,
+            "amount": item.amount,
+            "days": item.days,
+            "create_at": now,
+            "update_at": now,
+        }
+        for item in items
+    ]
+    ids = insert_returning_ids(session, Quote, rows)
+
+    _add_to_quote_stats(
+        session, [(item.project_id, item.amount, item.days) for item in items]
+    )
+    if worker_id is not None:
+        record_quotes(session, worker_id, [item.days for item in items])
+    record_change_ids(session, "quotes", ids)
+    record_change_ids(session, "projects", sorted({i.project_id for i in items}))
+    session.commit()
+    return ids
+
+
 # ---------------------------------------------------------
 # Read
 # ---------------------------------------------------------
@@ -36,11 +83,158 @@ def get_quote(session: Session, quote_id: int) -> Optional[Quote]:
     return session.get(Quote, quote_id)
 
 
-def list_quotes_by_project(session: Session, project_id: int) -> Sequence[Quote]:
-    statement = select(Quote).where(Quote.project_id == project_id)
-    return session.exec(statement).all()
+def list_quotes_by_project(
+    session: Session, project_id: int, expand: Collection[str] = ()
+) -> Sequence[Quote]:
+    statement = select_with_archived(
+        Quote, lambda t: t.c.project_id == project_id, expand=expand
+    )
+    return _load(session, statement, expand)
+
+
+def list_quotes_by_worker(
+    session: Session, worker_id: int, expand: Collection[str] = ()
+) -> Sequence[Quote]:
+    statement = select_with_archived(
+        Quote, lambda t: t.c.worker_id == worker_id, expand=expand
+    )
+    return _load(session, statement, expand)
+
 
+def list_quoted_project_ids(
+    session: Session, worker_id: int, limit: int | None = None
+) -> list[int]:
+    """Projects the worker quoted on, most recent quote first."""
+    statement = (
+        select(Quote.project_id)
+        .where(Quote.worker_id == worker_id)
+        .order_by(Quote.id.desc())  # type: ignore[union-attr]
+        .limit(limit)
+    )
+    return [i for i in session.exec(statement) if i is not None]
 
-def list_quotes_by_worker(session: Session, worker_id: int) -> Sequence[Quote]:
-    statement = select(Quote).where(Quote.worker_id == worker_id)
-    return session.exec(statement).all()
+
+def list_quoted_among(
+    session: Session, worker_id: int, project_ids: Collection[int]
+) -> set[int]:
+    """Which of ``project_ids`` the worker quoted on (hot table only)."""
+    if not project_ids:
+        return set()
+    statement = select(Quote.project_id).where(
+        Quote.worker_id == worker_id,
+        Quote.project_id.in_(project_ids),  # type: ignore[union-attr]
+    )
+    return {i for i in session.exec(statement) if i is not None}
+
+
+def list_top_quotes(
+    session: Session, project_id: int, by: str, k: int, expand: Collection[str] = ()
+) -> Sequence[Quote]:
+    """The ``k`` cheapest (``by="amount"``) or fastest (``by="days"``)
+    quotes, read straight off the (project_id, amount/days) index."""
+    if by == "days":
+        order = ("days", "amount", "id")
+    else:
+        order = ("amount", "days", "id")
+
+    statement = select_with_archived(
+        Quote, lambda t: t.c.project_id == project_id, *order, limit=k, expand=expand
+    )
+    return _load(session, statement, expand)
+
+
+def _load(session: Session, statement, expand: Collection[str]) -> Sequence[Quote]:
+    quotes = session.scalars(statement).all()
+    if "project" in expand:
+        attach_archived_projects(session, quotes)
+    return quotes
+
+
+def get_quote_stats(
+    session: Session, project_id: int
+) -> Optional[ProjectQuoteStats]:
+    return session.get(ProjectQuoteStats, project_id)
+
+
+# ---------------------------------------------------------
+# Quote statistics (incremental)
+# ---------------------------------------------------------
+def _add_to_quote_stats(
+    session: Session, quotes: Sequence[tuple[int, float, int]]
+) -> None:
+    """Fold ``(project_id, amount, days)`` quotes into their projects'
+    aggregates with a single atomic upsert, so concurrent quotes never
+    lose an update."""
+    per_project: dict[int, list[tuple[float, int]]] = {}
+    for project_id, amount, days in quotes:
+        per_project.setdefault(project_id, []).append((amount, days))
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "project_id": project_id,
+            "quote_count": len(batch),
+            "min_amount": min(amount for amount, _ in batch),
+            "avg_amount": sum(amount for amount, _ in batch) / len(batch),
+            "min_days": min(days for _, days in batch),
+            "update_at": now,
+        }
+        # a fixed order keeps concurrent batches from deadlocking
+        for project_id, batch in sorted(per_project.items())
+    ]
+
+    insert = dialect_insert(session)
+    table = ProjectQuoteStats.__table__  # type: ignore[attr-defined]
+    stmt = insert(table).values(rows)
+    new = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.project_id],
+        set_={
+            "quote_count": table.c.quote_count + new.quote_count,
+            "min_amount": case(
+                (new.min_amount < table.c.min_amount, new.min_amount),
+                else_=table.c.min_amount,
+            ),
+            # running mean, weighted by the counts before and in this batch
+            "avg_amount": table.c.avg_amount
+            + (new.avg_amount - table.c.avg_amount)
+            * new.quote_count
+            / (table.c.quote_count + new.quote_count),
+            "min_days": case(
+                (new.min_days < table.c.min_days, new.min_days),
+                else_=table.c.min_days,
+            ),
+            "update_at": new.update_at,
+        },
+    )
+    session.execute(stmt)
+
+
+@register_backfill("project_quote_stats")
+def rebuild_quote_stats(session: Session) -> None:
+    """Recompute every project's aggregates from the quotes table."""
+    session.execute(delete(ProjectQuoteStats))
+
+    rows = session.exec(
+        select(
+            Quote.project_id,
+            func.count(),
+            func.min(Quote.amount),
+            func.avg(Quote.amount),
+            func.min(Quote.days),
+        )
+        .where(Quote.project_id.is_not(None))  # type: ignore[union-attr]
+        .group_by(Quote.project_id)
+    ).all()
+
+    session.add_all(
+        ProjectQuoteStats(
+            project_id=project_id,
+            quote_count=count,
+            min_amount=min_amount,
+            avg_amount=avg_amount,
+            min_days=min_days,
+        )
+        for project_id, count, min_amount, avg_amount, min_days in rows
+    )
+    session.commit()
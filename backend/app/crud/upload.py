@@ -0,0 +1,116 @@
+import os
+from datetime import datetime, timezone
+from typing import Iterable
+
+from sqlalchemy import union_all
+from sqlmodel import Session, SQLModel, delete, select
+
+from app.database import dialect_insert, register_backfill
+from app.models.archive import deliverables_archive
+from app.models.deliverable import Deliverable
+from app.models.upload import ProjectUploadUsage, WorkerUploadUsage
+
+
+# ---------------------------------------------------------
+# Read
+# ---------------------------------------------------------
+def get_upload_usage(
+    session: Session, project_id: int, worker_id: int
+) -> tuple[int, int]:
+    """Bytes uploaded so far to the project and by the worker."""
+    project = session.get(ProjectUploadUsage, project_id)
+    worker = session.get(WorkerUploadUsage, worker_id)
+    return (project.bytes if project else 0, worker.bytes if worker else 0)
+
+
+def referenced_files(session: Session, paths: Iterable[str]) -> set[str]:
+    """Those of ``paths`` that a deliverable, hot or archived, points to."""
+    paths = list(paths)
+    if not paths:
+        return set()
+    stmt = union_all(
+        select(Deliverable.file_url).where(
+            Deliverable.file_url.in_(paths)  # type: ignore[attr-defined]
+        ),
+        select(deliverables_archive.c.file_url).where(
+            deliverables_archive.c.file_url.in_(paths)
+        ),
+    )
+    return set(session.scalars(stmt))
+
+
+# ---------------------------------------------------------
+# Incremental updates (in the caller's transaction)
+# ---------------------------------------------------------
+def _bump(
+    session: Session, model: type[SQLModel], key: str, value: int, size: int
+) -> None:
+    insert = dialect_insert(session)
+    table = model.__table__  # type: ignore[attr-defined]
+
+    stmt = insert(table).values(
+        {key: value, "files": 1, "bytes": size, "update_at": datetime.now(timezone.utc)}
+    )
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[table.c[key]],
+            set_={
+                "files": table.c.files + 1,
+                "bytes": table.c.bytes + stmt.excluded.bytes,
+                "update_at": stmt.excluded.update_at,
+            },
+        )
+    )
+
+
+def record_upload(session: Session, project_id: int, worker_id: int, size: int) -> None:
+    _bump(session, ProjectUploadUsage, "project_id", project_id, size)
+    _bump(session, WorkerUploadUsage, "worker_id", worker_id, size)
+
+
+# ---------------------------------------------------------
+# Backfill
+# ---------------------------------------------------------
+def _sum_file_sizes(session: Session, stmt) -> dict[int, tuple[int, int]]:
+    """owner id -> (files, bytes) of the ``(owner id, file_url)`` rows whose
+    file exists on disk; other file_urls are links, not uploads."""
+    usage: dict[int, tuple[int, int]] = {}
+    for owner_id, file_url in session.execute(stmt):
+        if owner_id is None or not os.path.isfile(file_url):
+            continue
+        files, size = usage.get(owner_id, (0, 0))
+        usage[owner_id] = (files + 1, size + os.path.getsize(file_url))
+    return usage
+
+
+@register_backfill("project_upload_usage")
+def rebuild_project_upload_usage(session: Session) -> None:
+    """Measure the files of every project on disk."""
+    session.execute(delete(ProjectUploadUsage))
+    # archived projects take no uploads, and have no row to point to
+    usage = _sum_file_sizes(
+        session, select(Deliverable.project_id, Deliverable.file_url)
+    )
+    session.add_all(
+        ProjectUploadUsage(project_id=project_id, files=files, bytes=size)
+        for project_id, (files, size) in usage.items()
+    )
+    session.commit()
+
+
+@register_backfill("worker_upload_usage")
+def rebuild_worker_upload_usage(session: Session) -> None:
+    """Measure the files of every worker on disk, archived ones included."""
+    session.execute(delete(WorkerUploadUsage))
+    usage = _sum_file_sizes(
+        session,
+        union_all(
+            select(Deliverable.worker_id, Deliverable.file_url),
+            select(deliverables_archive.c.worker_id, deliverables_archive.c.file_url),
+        ),
+    )
+    session.add_all(
+        WorkerUploadUsage(worker_id=worker_id, files=files, bytes=size)
+        for worker_id, (files, size) in usage.items()
+    )
+    session.commit()
@@ -3,9 +3,11 @@ from typing import Optional, Sequence
 from sqlmodel import Session, select
 from datetime import datetime, timezone
 
+from app.crud.change import record_change
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.security import hash_password, verify_password
+from app.security import hash_password, password_needs_rehash, verify_password
+from app.throttle import unknown_usernames
 
 
 # ---------------------------------------------------------
@@ -35,8 +37,10 @@ def create_user(session: Session, data: UserCreate) -> User:
     )
 
     session.add(user)
+    record_change(session, "users", user)
     session.commit()
     session.refresh(user)
+    unknown_usernames.discard(user.username)
 
     return user
 
@@ -59,8 +63,10 @@ def update_user(session: Session, user: User, data: UserUpdate) -> User:
     user.update_at = datetime.now(timezone.utc)
 
     session.add(user)
+    record_change(session, "users", user)
     session.commit()
     session.refresh(user)
+    unknown_usernames.discard(user.username)
 
     return user
 
@@ -71,13 +77,24 @@ def update_user(session: Session, user: User, data: UserUpdate) -> User:
 
 
 def authenticate_user(session: Session, username: str, password: str) -> Optional[User]:
+    if username in unknown_usernames:
+        return None
+
     user = get_user_by_username(session, username)
     if not user:
+        unknown_usernames.add(username)
         return None
 
     if not verify_password(password, user.password):
         return None
 
+    # 參數調整過的舊雜湊，趁有明文時換成新參數；不算使用者資料變更
+    if password_needs_rehash(user.password):
+        user.password = hash_password(password)
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+
     return user
 
 
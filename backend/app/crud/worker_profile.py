@@ -0,0 +1,215 @@
+from datetime import datetime, timezone
+from typing import Optional, Sequence
+
+from sqlalchemy import func, union
+from sqlmodel import Session, delete, select, update
+
+from app.database import dialect_insert, register_backfill
+from app.models.archive import quotes_archive
+from app.models.project import Project, ProjectStatus
+from app.models.quote import Quote
+from app.models.worker_profile import ProjectAssignment, WorkerProfile
+
+
+# ---------------------------------------------------------
+# Read
+# ---------------------------------------------------------
+def get_worker_profile(session: Session, worker_id: int) -> Optional[WorkerProfile]:
+    return session.get(WorkerProfile, worker_id)
+
+
+def list_profiles_of_quoters(
+    session: Session, project_id: int
+) -> Sequence[WorkerProfile]:
+    """Profiles of every worker who quoted on the project, in one query."""
+    quoters = union(
+        select(Quote.worker_id).where(Quote.project_id == project_id),
+        select(quotes_archive.c.worker_id).where(
+            quotes_archive.c.project_id == project_id
+        ),
+    )
+    stmt = select(WorkerProfile).where(
+        WorkerProfile.worker_id.in_(quoters)  # type: ignore[attr-defined]
+    )
+    return session.exec(stmt).all()
+
+
+# ---------------------------------------------------------
+# Incremental updates (in the caller's transaction)
+# ---------------------------------------------------------
+def _bump(session: Session, worker_id: int, **deltas: float) -> None:
+    """Atomically add ``deltas`` to the worker's counters."""
+    insert = dialect_insert(session)
+    table = WorkerProfile.__table__  # type: ignore[attr-defined]
+
+    stmt = insert(table).values(
+        worker_id=worker_id, update_at=datetime.now(timezone.utc), **deltas
+    )
+    set_ = {name: table.c[name] + stmt.excluded[name] for name in deltas}
+    set_["update_at"] = stmt.excluded.update_at
+
+    session.execute(
+        stmt.on_conflict_do_update(index_elements=[table.c.worker_id], set_=set_)
+    )
+
+
+def record_quote(session: Session, worker_id: int, days: int) -> None:
+    _bump(session, worker_id, quote_count=1, quoted_days_sum=days)
+
+
+def record_quotes(session: Session, worker_id: int, days: Sequence[int]) -> None:
+    """``record_quote`` for a batch of quotes by one worker."""
+    if days:
+        _bump(session, worker_id, quote_count=len(days), quoted_days_sum=sum(days))
+
+
+def apply_project_transition(
+    session: Session,
+    project: Project,
+    old_status: ProjectStatus,
+    old_worker_id: int | None,
+) -> None:
+    """Update worker profiles for a change of a project's status/worker.
+
+    Called by every crud function that writes ``status`` or ``worker_id``,
+    before it commits.
+    """
+    status, worker_id = project.status, project.worker_id
+    was_active = old_status == ProjectStatus.IN_PROGRESS and old_worker_id
+    still_active = (
+        status == ProjectStatus.IN_PROGRESS and worker_id == old_worker_id
+    )
+
+    if was_active and not still_active:
+        _bump(session, old_worker_id, active_count=-1)  # type: ignore[arg-type]
+
+    if worker_id is None:
+        return
+
+    if status == ProjectStatus.IN_PROGRESS and not still_active:
+        _bump(session, worker_id, active_count=1)
+        _start_assignment(session, project.id, worker_id)  # type: ignore[arg-type]
+
+    elif status == ProjectStatus.COMPLETED and old_status != status:
+        deltas: dict[str, float] = {"completed_count": 1}
+
+        assignment = session.get(ProjectAssignment, project.id)
+        if assignment and assignment.worker_id == worker_id:
+            assigned_at = assignment.assigned_at
+            if assigned_at.tzinfo is None:
+                assigned_at = assigned_at.replace(tzinfo=timezone.utc)
+            elapsed = datetime.now(timezone.utc) - assigned_at
+
+            deltas["timed_count"] = 1
+            deltas["completion_days_sum"] = elapsed.total_seconds() / 86400
+            if assignment.quoted_days is not None:
+                deltas["quoted_timed_count"] = 1
+                deltas["completion_quoted_days_sum"] = assignment.quoted_days
+
+        _bump(session, worker_id, **deltas)
+
+    elif status == ProjectStatus.REJECTED and old_status != status:
+        _bump(session, worker_id, rejected_count=1)
+
+
+def _start_assignment(session: Session, project_id: int, worker_id: int) -> None:
+    quoted_days = session.exec(
+        select(Quote.days)
+        .where(Quote.project_id == project_id, Quote.worker_id == worker_id)
+        .order_by(Quote.id.desc())  # type: ignore[union-attr]
+        .limit(1)
+    ).first()
+
+    assignment = session.get(ProjectAssignment, project_id) or ProjectAssignment(
+        project_id=project_id, worker_id=worker_id
+    )
+    assignment.worker_id = worker_id
+    assignment.assigned_at = datetime.now(timezone.utc)
+    assignment.quoted_days = quoted_days
+    session.add(assignment)
+
+
+# ---------------------------------------------------------
+# Backfill
+# ---------------------------------------------------------
+@register_backfill("worker_profiles")
+def rebuild_worker_profiles(session: Session) -> None:
+    """Recompute profiles from quotes and projects.
+
+    Assignment times were not recorded before profiles existed, so running
+    projects use their last update as the start and historic completions
+    carry no timing.
+    """
+    session.execute(delete(ProjectAssignment))
+    session.execute(delete(WorkerProfile))
+
+    profiles: dict[int, WorkerProfile] = {}
+
+    def profile(worker_id: int) -> WorkerProfile:
+        return profiles.setdefault(worker_id, WorkerProfile(worker_id=worker_id))
+
+    for worker_id, count, days in session.exec(
+        select(Quote.worker_id, func.count(), func.sum(Quote.days))
+        .where(Quote.worker_id.is_not(None))  # type: ignore[union-attr]
+        .group_by(Quote.worker_id)
+    ):
+        profile(worker_id).quote_count = count
+        profile(worker_id).quoted_days_sum = days or 0
+
+    counters = {
+        ProjectStatus.IN_PROGRESS: "active_count",
+        ProjectStatus.COMPLETED: "completed_count",
+        ProjectStatus.REJECTED: "rejected_count",
+    }
+    for worker_id, status, count in session.exec(
+        select(Project.worker_id, Project.status, func.count())
+        .where(Project.worker_id.is_not(None))  # type: ignore[union-attr]
+        .group_by(Project.worker_id, Project.status)
+    ):
+        if status in counters:
+            setattr(profile(worker_id), counters[status], count)
+
+    for project_id, worker_id, update_at in session.exec(
+        select(Project.id, Project.worker_id, Project.update_at).where(
+            Project.status == ProjectStatus.IN_PROGRESS,
+            Project.worker_id.is_not(None),  # type: ignore[union-attr]
+        )
+    ):
+        session.add(
+            ProjectAssignment(
+                project_id=project_id, worker_id=worker_id, assigned_at=update_at
+            )
+        )
+
+    session.add_all(profiles.values())
+    session.commit()
+
+
+@register_backfill("worker_profiles.quoted_timed_count")
+def backfill_quoted_timed_count(session: Session) -> None:
+    """Profiles from before the counter averaged the quoted days over every
+    timed completion. Recount both from the assignments of completed
+    projects; those already archived drop out of the average."""
+    session.execute(
+        update(WorkerProfile).values(quoted_timed_count=0, completion_quoted_days_sum=0)
+    )
+    for worker_id, count, days in session.exec(
+        select(
+            ProjectAssignment.worker_id,
+            func.count(),
+            func.sum(ProjectAssignment.quoted_days),
+        )
+        .join(Project, Project.id == ProjectAssignment.project_id)  # type: ignore
+        .where(
+            Project.status == ProjectStatus.COMPLETED,
+            Project.worker_id == ProjectAssignment.worker_id,
+            ProjectAssignment.quoted_days.is_not(None),  # type: ignore[union-attr]
+        )
+        .group_by(ProjectAssignment.worker_id)
+    ):
+        session.execute(
+            update(WorkerProfile)
+            .where(WorkerProfile.worker_id == worker_id)  # type: ignore[arg-type]
+            .values(quoted_timed_count=count, completion_quoted_days_sum=days)
+        )
+    session.commit()
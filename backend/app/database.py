@@ -1,22 +1,188 @@
+import hashlib
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    String,
+    Table,
+    delete,
+    insert,
+    inspect,
+    select,
+)
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy import Engine
 from sqlmodel import SQLModel, create_engine, Session
-from typing import Generator
+from starlette.requests import Request
+from typing import Callable, Generator
 
 from app.config import settings
+from app.models.archive import ARCHIVES
+from app.replicas import choose_engine
+from app.sqlite import add_autoincrement, create_sqlite_engine, is_sqlite
+
+
+def _create_engine(url: str) -> Engine:
+    if is_sqlite(url):
+        return create_sqlite_engine(url)
+    return create_engine(
+        url,
+        # 只在除錯時開啟；慢查詢與 N+1 請看 app/querylog.py
+        echo=settings.SQL_ECHO,
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+    )
+
 
 # 建立 SQLModel engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=True,
-    pool_pre_ping=True,
+engine = _create_engine(settings.DATABASE_URL)
+
+# 唯讀副本（可選）；哪些路由可以讀副本請看 app/replicas.py
+replica_engines = [_create_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+
+# fingerprint of the schema init_db last brought the database up to
+schema_version = Table(
+    "schema_version",
+    SQLModel.metadata,
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
 )
 
+# table name, or "table.column", -> function that fills it once created
+_backfills: dict[str, Callable[[Session], None]] = {}
+
 
-def get_session() -> Generator[Session, None, None]:
-    """FastAPI dependency that yields a SQLModel session."""
-    with Session(engine) as session:
+def get_session(request: Request) -> Generator[Session, None, None]:
+    """FastAPI dependency that yields a SQLModel session.
+
+    Routes marked ``@read_only`` get a replica session when replicas are
+    configured, unless the client wrote to the primary moments ago.
+    """
+    with Session(choose_engine(request, engine, replica_engines)) as session:
         yield session
 
 
+def dialect_insert(session: Session):
+    """The dialect-specific ``insert`` construct, which has
+    ``on_conflict_do_update`` for atomic upserts."""
+    if session.get_bind().dialect.name == "postgresql":
+        return pg_insert
+    return sqlite_insert
+
+
+def insert_returning_ids(
+    session: Session, model: type[SQLModel], rows: list[dict]
+) -> list[int]:
+    """Insert ``rows`` with multi-row ``INSERT ... RETURNING id`` and return
+    the new ids in the order of ``rows``."""
+    column = model.id  # type: ignore[attr-defined]
+    if session.get_bind().dialect.name == "postgresql":
+        stmt = insert(model).returning(column, sort_by_parameter_order=True)
+        return list(session.scalars(stmt, rows))
+
+    # asked to keep the order, SQLAlchemy sends SQLite one INSERT per row;
+    # SQLite hands out rowids in VALUES order, so sorting is enough
+    return sorted(session.scalars(insert(model).returning(column), rows))
+
+
+def register_backfill(
+    table_name: str,
+) -> Callable[[Callable[[Session], None]], Callable[[Session], None]]:
+    """Run the decorated function when ``init_db`` creates ``table_name``
+    on a database that already has data. A ``"table.column"`` name runs
+    when the column is added to the existing table instead."""
+
+    def decorator(fn: Callable[[Session], None]) -> Callable[[Session], None]:
+        _backfills[table_name] = fn
+        return fn
+
+    return decorator
+
+
+def schema_fingerprint() -> str:
+    """Hash of the DDL for every table and index the models declare."""
+    digest = hashlib.sha256()
+    for table in SQLModel.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(engine)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            digest.update(str(CreateIndex(index).compile(engine)).encode())
+    return digest.hexdigest()[:32]
+
+
+def schema_is_current(fingerprint: str) -> bool:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_version.name):
+            return False
+        stored = conn.execute(select(schema_version.c.version)).scalar()
+    return stored == fingerprint
+
+
+def add_columns(existing: set[str]) -> set[str]:
+    """Add the columns models declare but their existing tables lack, and
+    return them as ``"table.column"``. A NOT NULL column needs a server
+    default for the rows already there."""
+    inspector = inspect(engine)
+    added: set[str] = set()
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    raise RuntimeError(
+                        f"{table.name}.{column.name} is NOT NULL without a server "
+                        "default; it cannot be added to existing rows"
+                    )
+                spec = CreateColumn(column).compile(engine)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {spec}")
+                added.add(f"{table.name}.{column.name}")
+    return added
+
+
 def init_db() -> None:
-    """Initialize database tables."""
+    """Initialize database tables.
+
+    Skipped when the database already has the current schema, so starting
+    another worker costs one query instead of full reflection.
+    """
+    fingerprint = schema_fingerprint()
+    if schema_is_current(fingerprint):
+        return
+
+    existing = set(inspect(engine).get_table_names())
+    if existing and engine.dialect.name == "sqlite":
+        add_autoincrement(
+            engine,
+            [t for t in SQLModel.metadata.sorted_tables if t.name in existing],
+            {k: t for k, t in ARCHIVES.items() if t.name in existing},
+        )
     SQLModel.metadata.create_all(engine)
+
+    # create_all skips tables that exist, including their new columns and
+    # indexes
+    added = add_columns(existing)
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name in existing:
+            for index in table.indexes:
+                index.create(engine, checkfirst=True)
+
+    if existing:
+        for name, backfill in _backfills.items():
+            if name in added if "." in name else name not in existing:
+                with Session(engine) as session:
+                    backfill(session)
+
+    with engine.begin() as conn:
+        conn.execute(delete(schema_version))
+        conn.execute(
+            schema_version.insert().values(
+                version=fingerprint, applied_at=datetime.now(timezone.utc)
+            )
+        )
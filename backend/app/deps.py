@@ -1,9 +1,11 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from sqlmodel import Session
 
 from app.security import oauth2_scheme, decode_access_token
 from app.database import get_session
 from app.crud.user import get_user_by_username
+from app.crud.archive import EXPANDABLE
+from app.querylog import allow_queries
 
 
 async def get_current_user(
@@ -35,3 +37,20 @@ async def get_current_user(
         )
 
     return user
+
+
+def get_expand(
+    expand: str = Query("", description="comma-separated: worker, project"),
+) -> frozenset[str]:
+    """The relations a list endpoint should embed in each row."""
+    names = frozenset(name.strip() for name in expand.split(",") if name.strip())
+    unknown = names.difference(EXPANDABLE)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Cannot expand {', '.join(sorted(unknown))}; "
+            f"choose from {', '.join(EXPANDABLE)}",
+        )
+    # one query per relation, for all rows together
+    allow_queries(len(names), "expand")
+    return names
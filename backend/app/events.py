@@ -0,0 +1,293 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterable, Iterator, Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel and the sequence that gives events a global id
+CHANNEL = "handshake_events"
+EVENT_SEQUENCE = "handshake_event_seq"
+
+
+@dataclass
+class Event:
+    id: int
+    user_id: int
+    type: str
+    data: dict[str, Any]
+
+    def encode(self) -> str:
+        """Format the event as a Server-Sent Events message."""
+        data = json.dumps(self.data)
+        return f"id: {self.id}\nevent: {self.type}\ndata: {data}\n\n"
+
+
+# ---------------------------------------------------------
+# In-process broker (SQLite / tests / single process)
+# ---------------------------------------------------------
+class LocalBroker:
+    """Fan out events to per-user subscriber queues inside one process.
+
+    All bookkeeping happens on the event loop thread; publishers running in
+    the threadpool hand events over with ``call_soon_threadsafe``.
+
+    Ids are microsecond timestamps, kept increasing, so a client resuming
+    with Last-Event-ID after a restart does not match an unrelated event.
+    Other processes never see these events: with several workers, streams
+    only get what their own worker published.
+    """
+
+    def __init__(self, buffer_size: int, queue_size: int) -> None:
+        self._subscribers: dict[int, set[asyncio.Queue[Optional[Event]]]] = {}
+        # recent events, kept for Last-Event-ID resume
+        self._history: deque[Event] = deque(maxlen=buffer_size)
+        self._queue_size = queue_size
+        self._last_id = 0
+        self._id_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if type(self) is LocalBroker and settings.WEB_WORKERS > 1:
+            logger.warning(
+                "in-process event broker with %d workers: streams miss events "
+                "published by other workers; use PostgreSQL for EVENTS_BACKEND",
+                settings.WEB_WORKERS,
+            )
+
+    def stop(self) -> None:
+        self._loop = None
+
+    def publish(self, user_id: int | None, type: str, data: dict[str, Any]) -> None:
+        """Send an event to every stream opened by ``user_id``."""
+        if user_id is None:
+            return
+        self._dispatch_threadsafe(Event(self._next_id(), user_id, type, data))
+
+    def publish_many(
+        self, events: Iterable[tuple[int | None, str, dict[str, Any]]]
+    ) -> None:
+        """``publish`` each ``(user_id, type, data)``."""
+        for user_id, type, data in events:
+            self.publish(user_id, type, data)
+
+    def _next_id(self) -> int:
+        with self._id_lock:
+            self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+            return self._last_id
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def subscribe(
+        self,
+        user_id: int,
+        last_event_id: int | None = None,
+        heartbeat: float | None = None,
+    ) -> AsyncIterator[Optional[Event]]:
+        """Yield events for ``user_id``; yields ``None`` as a heartbeat.
+
+        Registration and history replay run without awaiting in between, so
+        no event can slip through the gap or be delivered twice.
+        """
+        queue: asyncio.Queue[Optional[Event]] = asyncio.Queue(self._queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        try:
+            backlog = (
+                list(self._replay(user_id, last_event_id))
+                if last_event_id is not None
+                else []
+            )
+            for event in backlog:
+                yield event
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+
+                if event is None:
+                    # queue overflowed: end the stream, the client resumes
+                    # with Last-Event-ID from the history buffer
+                    return
+                yield event
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def _replay(self, user_id: int, last_event_id: int) -> Iterator[Event]:
+        history = list(self._history)
+        # Events are buffered in delivery order, which may differ from id
+        # order across processes, so resume from the position of the last
+        # seen event when we still have it.
+        for index, event in enumerate(history):
+            if event.id == last_event_id:
+                pending = history[index + 1 :]
+                break
+        else:
+            pending = [event for event in history if event.id > last_event_id]
+
+        return (event for event in pending if event.user_id == user_id)
+
+    def _dispatch_threadsafe(self, event: Event) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            # no running app (scripts, CLI): nobody can be listening
+            return
+        loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: Event) -> None:
+        self._history.append(event)
+
+        for queue in list(self._subscribers.get(event.user_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # slow consumer: drop what it has and tell it to reconnect
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self._subscribers[event.user_id].discard(queue)
+
+
+# ---------------------------------------------------------
+# Postgres LISTEN/NOTIFY broker (multi-process)
+# ---------------------------------------------------------
+class PostgresBroker(LocalBroker):
+    """Publish with NOTIFY; one LISTEN connection per process feeds the
+    in-process fan-out.
+
+    Routes publish after their write committed, and the NOTIFY goes out in
+    a transaction of its own: if the process dies (or the database is
+    unreachable) in between, the write stays and its event is lost.
+    Events are a hint to refetch, not a log; clients that reconnect
+    should reload what they show instead of relying on Last-Event-ID.
+    """
+
+    def __init__(self, buffer_size: int, queue_size: int) -> None:
+        super().__init__(buffer_size, queue_size)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        super().start()
+
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {EVENT_SEQUENCE}"))
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._listen, name="events-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        super().stop()
+
+    def publish(self, user_id: int | None, type: str, data: dict[str, Any]) -> None:
+        self.publish_many([(user_id, type, data)])
+
+    def publish_many(
+        self, events: Iterable[tuple[int | None, str, dict[str, Any]]]
+    ) -> None:
+        params = [
+            {
+                "channel": CHANNEL,
+                "user_id": user_id,
+                "type": type,
+                "data": json.dumps(data),
+            }
+            for user_id, type, data in events
+            if user_id is not None
+        ]
+        if not params:
+            return
+
+        # delivered on commit to the listener of every process; one
+        # transaction for the whole batch, separate from the write's (see
+        # the class docstring)
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "SELECT pg_notify(:channel, json_build_object("
+                    f"'id', nextval('{EVENT_SEQUENCE}'), "
+                    "'user_id', CAST(:user_id AS integer), "
+                    "'type', CAST(:type AS text), "
+                    "'data', CAST(:data AS json))::text)"
+                ),
+                params,
+            )
+
+    def _listen(self) -> None:
+        import psycopg2
+
+        dsn = engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+
+        while not self._stop.is_set():
+            try:
+                conn = psycopg2.connect(dsn)
+            except Exception:
+                logger.exception("events listener could not connect, retrying")
+                self._stop.wait(settings.EVENTS_RECONNECT_SECONDS)
+                continue
+
+            try:
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._receive(conn.notifies.pop(0).payload)
+            except Exception:
+                # whatever went wrong, this thread is the process' only
+                # listener: start over on a new connection
+                logger.exception("events listener failed, reconnecting")
+                self._stop.wait(settings.EVENTS_RECONNECT_SECONDS)
+            finally:
+                conn.close()
+
+    def _receive(self, payload: str) -> None:
+        """Dispatch one notification; a bad one is logged and skipped."""
+        try:
+            self._dispatch_threadsafe(Event(**json.loads(payload)))
+        except Exception:
+            logger.exception("events listener skipped a notification: %.200s", payload)
+
+
+def _create_broker() -> LocalBroker:
+    backend = settings.EVENTS_BACKEND
+    if backend == "auto":
+        backend = "postgres" if engine.dialect.name == "postgresql" else "local"
+
+    if backend == "postgres":
+        return PostgresBroker(settings.EVENTS_BUFFER_SIZE, settings.EVENTS_QUEUE_SIZE)
+    return LocalBroker(settings.EVENTS_BUFFER_SIZE, settings.EVENTS_QUEUE_SIZE)
+
+
+broker = _create_broker()
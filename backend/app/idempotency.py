@@ -0,0 +1,403 @@
+import asyncio
+import hashlib
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import (
+    JSON,
+    Column,
+    Float,
+    Integer,
+    LargeBinary,
+    String,
+    Table,
+    delete,
+    select,
+)
+from sqlmodel import Session, SQLModel
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.database import dialect_insert, engine
+from app.metrics import IDEMPOTENCY_REQUESTS
+from app.replicas import note_write
+from app.security import token_subject
+
+# one row per (user, Idempotency-Key); status is NULL while the original runs
+idempotency_keys = Table(
+    "idempotency_keys",
+    SQLModel.metadata,
+    Column("key", String, primary_key=True),
+    Column("fingerprint", String, nullable=False),
+    Column("status", Integer, nullable=True),
+    Column("headers", JSON, nullable=True),
+    Column("body", LargeBinary, nullable=True),
+    Column("expires_at", Float, nullable=False, index=True),
+)
+
+# how often a duplicate looks for an original running in another process
+POLL_SECONDS = 0.2
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status: Optional[int]
+    headers: Optional[list[list[str]]]
+    body: Optional[bytes]
+
+
+# ---------------------------------------------------------
+# Store (sync, run in the threadpool)
+# ---------------------------------------------------------
+def _claim(key: str, fingerprint: str) -> Optional[StoredResponse]:
+    """Take ``key`` for a new request; if it is taken, what is stored."""
+    table = idempotency_keys
+    now = time.time()
+    with Session(engine) as session:
+        # an expired key, or an original that died, is free again
+        session.execute(
+            delete(table).where(table.c.key == key, table.c.expires_at <= now)
+        )
+        insert = dialect_insert(session)
+        claimed = session.execute(
+            insert(table)
+            .values(
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=now + settings.IDEMPOTENCY_LOCK_SECONDS,
+            )
+            .on_conflict_do_nothing()
+        ).rowcount  # type: ignore[attr-defined]
+        session.commit()
+        if claimed:
+            return None
+
+        row = session.execute(
+            select(
+                table.c.fingerprint, table.c.status, table.c.headers, table.c.body
+            ).where(table.c.key == key)
+        ).first()
+    # gone meanwhile: the original failed, try to claim it again
+    return (
+        StoredResponse(*row) if row else StoredResponse(fingerprint, None, None, None)
+    )
+
+
+def _complete(
+    key: str,
+    status: int,
+    headers: Optional[list[list[str]]],
+    body: Optional[bytes],
+    fingerprint: Optional[str] = None,
+) -> None:
+    """Store the response; without ``body`` only the status is kept, and
+    ``fingerprint`` replaces the one claimed (uploads)."""
+    table = idempotency_keys
+    values = {
+        "status": status,
+        "headers": headers,
+        "body": body,
+        "expires_at": time.time() + settings.IDEMPOTENCY_TTL_SECONDS,
+    }
+    if fingerprint is not None:
+        values["fingerprint"] = fingerprint
+    with Session(engine) as session:
+        session.execute(table.update().where(table.c.key == key).values(**values))
+        session.commit()
+
+
+def _release(key: str) -> None:
+    table = idempotency_keys
+    with Session(engine) as session:
+        session.execute(delete(table).where(table.c.key == key))
+        session.commit()
+
+
+def prune_idempotency_keys() -> int:
+    table = idempotency_keys
+    with Session(engine) as session:
+        result = session.execute(delete(table).where(table.c.expires_at <= time.time()))
+        session.commit()
+    return result.rowcount  # type: ignore[attr-defined]
+
+
+# ---------------------------------------------------------
+# ASGI middleware
+# ---------------------------------------------------------
+def _json(status: int, detail: str, headers: Optional[dict[str, str]] = None):
+    return JSONResponse({"detail": detail}, status_code=status, headers=headers)
+
+
+def _fingerprint(scope: Scope, digest: str) -> str:
+    return f"POST {scope['path']} sha256={digest}"
+
+
+_BOUNDARY = re.compile(r'boundary="?([^";]+)"?')
+
+
+class _UploadHash:
+    """sha256 of a multipart body, fed chunk by chunk, without its boundary:
+    clients pick a new one for every retry of the same upload."""
+
+    def __init__(self, content_type: str) -> None:
+        match = _BOUNDARY.search(content_type)
+        self.boundary = match.group(1).encode("latin-1") if match else b""
+        self.digest = hashlib.sha256()
+        # the end of the data so far, which may hold part of a boundary
+        self.tail = b""
+
+    def update(self, chunk: bytes) -> None:
+        data = self.tail + chunk
+        if self.boundary:
+            data = data.replace(self.boundary, b"")
+        keep = max(len(self.boundary) - 1, 0)
+        split = max(len(data) - keep, 0)
+        self.digest.update(data[:split])
+        self.tail = data[split:]
+
+    def hexdigest(self) -> str:
+        self.digest.update(self.tail)
+        self.tail = b""
+        return self.digest.hexdigest()
+
+
+async def _hash_upload(receive: Receive, content_type: str) -> Optional[str]:
+    """Hash of an upload, read and thrown away as it arrives."""
+    digest = _UploadHash(content_type)
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return None
+        digest.update(message.get("body", b""))
+        if not message.get("more_body", False):
+            return digest.hexdigest()
+
+
+class _HashingReceive:
+    """``receive`` that hashes an upload while the app reads it."""
+
+    def __init__(self, receive: Receive, content_type: str) -> None:
+        self.receive = receive
+        self.digest = _UploadHash(content_type)
+        self.complete = False
+
+    async def __call__(self) -> Message:
+        message = await self.receive()
+        if message["type"] == "http.request":
+            self.digest.update(message.get("body", b""))
+            self.complete = not message.get("more_body", False)
+        return message
+
+
+async def _read_body(receive: Receive) -> Optional[bytes]:
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return None
+        body.extend(message.get("body", b""))
+        if not message.get("more_body", False):
+            return bytes(body)
+
+
+def _replay_body(body: bytes, receive: Receive) -> Receive:
+    """``receive`` for the app, starting with the body already read."""
+    pending = True
+
+    async def replay() -> Message:
+        nonlocal pending
+        if pending:
+            pending = False
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+class IdempotencyMiddleware:
+    """Run an authenticated POST with an ``Idempotency-Key`` header at most
+    once per user and key, and replay its response to retries.
+
+    The fingerprint includes a hash of the body, so a key reused with
+    another body gets 422 instead of the first request's response. Uploads
+    are not buffered for that: the original is hashed while the app reads
+    it, and a retry of a finished upload is hashed as it arrives and
+    thrown away, never written. A duplicate that arrives while the
+    original still runs waits for it, up to ``IDEMPOTENCY_WAIT_SECONDS``,
+    then gets 409. Responses with a 5xx status are not stored, so the next
+    retry runs the request again; a response too large to store keeps
+    only its status, and retries get 409.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        # originals running in this process, so local duplicates need not poll
+        self._running: dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not settings.IDEMPOTENCY_ENABLED
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        user = token_subject(headers.get("authorization"))
+        if idempotency_key is None or user is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(idempotency_key) <= 255:
+            response = _json(400, "Idempotency-Key must be 1 to 255 characters")
+            await response(scope, receive, send)
+            return
+
+        key = f"{user}:{idempotency_key}"
+        content_type = headers.get("content-type", "")
+        upload = content_type.startswith("multipart/")
+        if upload:
+            # the file's hash is stored when the original has read it
+            fingerprint = f"POST {scope['path']} multipart"
+        else:
+            body = await _read_body(receive)
+            if body is None:
+                return  # the client went away
+            fingerprint = _fingerprint(scope, hashlib.sha256(body).hexdigest())
+            receive = _replay_body(body, receive)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while (stored := await run_in_threadpool(_claim, key, fingerprint)) is not None:
+            if upload and stored.status is not None:
+                # compare with the original's file; this one is not kept
+                digest = await _hash_upload(receive, content_type)
+                if digest is None:
+                    return
+                fingerprint = _fingerprint(scope, digest)
+            if stored.fingerprint != fingerprint:
+                IDEMPOTENCY_REQUESTS.labels("mismatch").inc()
+                response = _json(422, "Idempotency-Key was used for another request")
+                await response(scope, receive, send)
+                return
+            if stored.status is not None:
+                IDEMPOTENCY_REQUESTS.labels("replayed").inc()
+                await self.replay(stored, scope, receive, send)
+                return
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                IDEMPOTENCY_REQUESTS.labels("conflict").inc()
+                response = _json(
+                    409,
+                    "A request with this Idempotency-Key is still running",
+                    {"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+                )
+                await response(scope, receive, send)
+                return
+            running = self._running.get(key)
+            try:
+                if running is not None:
+                    await asyncio.wait_for(running.wait(), remaining)
+                else:
+                    await asyncio.sleep(min(remaining, POLL_SECONDS))
+            except TimeoutError:
+                pass
+
+        IDEMPOTENCY_REQUESTS.labels("executed").inc()
+        self._running[key] = done = asyncio.Event()
+        try:
+            await self.run_and_store(
+                key, scope, receive, send, content_type if upload else None
+            )
+        finally:
+            del self._running[key]
+            done.set()
+
+    async def run_and_store(
+        self,
+        key: str,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        upload_type: Optional[str] = None,
+    ) -> None:
+        status = 500
+        headers: list[list[str]] = []
+        body = bytearray()
+        hashing = _HashingReceive(receive, upload_type) if upload_type else None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers.extend(
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in message.get("headers", [])
+                    if name.lower() != b"set-cookie"
+                )
+            elif message["type"] == "http.response.body":
+                if len(body) <= settings.IDEMPOTENCY_MAX_RESPONSE_BYTES:
+                    body.extend(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, hashing or receive, send_wrapper)
+        except BaseException:
+            await run_in_threadpool(_release, key)
+            raise
+
+        fingerprint = None
+        if hashing is not None:
+            if not hashing.complete:
+                # answered before the file was read: nothing to compare
+                # a retry with, and nothing was written
+                await run_in_threadpool(_release, key)
+                return
+            fingerprint = _fingerprint(scope, hashing.digest.hexdigest())
+
+        if status >= 500:
+            await run_in_threadpool(_release, key)
+        elif len(body) <= settings.IDEMPOTENCY_MAX_RESPONSE_BYTES:
+            await run_in_threadpool(
+                _complete, key, status, headers, bytes(body), fingerprint
+            )
+        else:
+            # too large to replay, but it must not run a second time
+            await run_in_threadpool(_complete, key, status, None, None, fingerprint)
+
+    async def replay(
+        self, stored: StoredResponse, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if stored.status is not None and stored.status < 400:
+            # the original's read-your-writes window may have run out
+            note_write()
+        if stored.body is None:
+            response = _json(
+                409,
+                f"The request with this Idempotency-Key already ran and returned "
+                f"{stored.status}; its response was too large to replay",
+                {"Idempotent-Replayed": "true"},
+            )
+            await response(scope, receive, send)
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": stored.status,
+                "headers": [
+                    *(
+                        (name.encode("latin-1"), value.encode("latin-1"))
+                        for name, value in stored.headers or []
+                    ),
+                    (b"idempotent-replayed", b"true"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": stored.body or b""})
+
@@ -1,17 +1,124 @@
 from contextlib import asynccontextmanager
+
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database import init_db
-from app.routers import auth, project, quote, deliverable
+from app.admission import AdmissionMiddleware
+from app.database import engine, init_db
+from app.config import settings
+from app.events import broker
+from app.idempotency import IdempotencyMiddleware
+from app.metrics import MetricsMiddleware, mark_process_dead, metrics_endpoint
+from app.profiling import ProfilingMiddleware, profile_endpoint
+from app.recommend import recommender
+from app.replicas import CLAIM_HEADER, ReadYourWritesMiddleware
+from app.routers import (
+    auth,
+    project,
+    quote,
+    deliverable,
+    event,
+    change,
+    worker,
+    export,
+)
+from app.tasks import (
+    archive_projects,
+    collect_upload_garbage,
+    compact_change_log,
+    flush_audit_log,
+    prune_idempotency,
+    prune_login_throttle,
+    prune_read_your_writes,
+    run_periodically,
+    stop_all,
+    write_profile_report,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    limiter = to_thread.current_default_thread_limiter()
+    limiter.total_tokens = settings.THREADPOOL_SIZE
     init_db()
+    broker.start()
+    run_periodically(
+        "compact-change-log",
+        settings.CHANGES_COMPACT_INTERVAL_SECONDS,
+        compact_change_log,
+        exclusive=True,
+    )
+    # 推薦索引在背景建立，不拖慢啟動
+    run_periodically(
+        "rebuild-recommend-index",
+        settings.RECOMMEND_REBUILD_INTERVAL_SECONDS,
+        recommender.rebuild,
+        run_first=True,
+    )
+    run_periodically(
+        "sync-recommend-index",
+        settings.RECOMMEND_SYNC_INTERVAL_SECONDS,
+        recommender.sync,
+    )
+    if settings.AUDIT_ENABLED:
+        run_periodically(
+            "flush-audit-log",
+            settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+            flush_audit_log,
+        )
+    if settings.DATABASE_REPLICA_URLS:
+        run_periodically(
+            "prune-read-your-writes",
+            settings.READ_YOUR_WRITES_PRUNE_INTERVAL_SECONDS,
+            prune_read_your_writes,
+            exclusive=True,
+        )
+    if settings.LOGIN_THROTTLE_ENABLED:
+        run_periodically(
+            "prune-login-throttle",
+            settings.LOGIN_THROTTLE_PRUNE_INTERVAL_SECONDS,
+            prune_login_throttle,
+            # the in-memory store is per process
+            exclusive=settings.LOGIN_THROTTLE_BACKEND == "database",
+        )
+    if settings.IDEMPOTENCY_ENABLED:
+        run_periodically(
+            "prune-idempotency-keys",
+            settings.IDEMPOTENCY_PRUNE_INTERVAL_SECONDS,
+            prune_idempotency,
+            exclusive=True,
+        )
+    if settings.UPLOAD_GC_ENABLED:
+        run_periodically(
+            "collect-upload-garbage",
+            settings.UPLOAD_GC_INTERVAL_SECONDS,
+            collect_upload_garbage,
+            exclusive=True,
+        )
+    if settings.ARCHIVE_ENABLED:
+        run_periodically(
+            "archive-projects",
+            settings.ARCHIVE_INTERVAL_SECONDS,
+            archive_projects,
+            exclusive=True,
+        )
+    if settings.PROFILING_ENABLED and settings.PROFILING_SAMPLE_RATE > 0:
+        run_periodically(
+            "write-profile-report",
+            settings.PROFILING_REPORT_INTERVAL_SECONDS,
+            write_profile_report,
+        )
     yield
     # Shutdown（如需釋放資源可寫在這裡）
+    await stop_all()
+    # 把還在緩衝區的狀態歷史與稽核事件寫完
+    flush_audit_log()
+    if settings.PROFILING_ENABLED:
+        write_profile_report()
+    broker.stop()
+    mark_process_dead()
 
 
 app = FastAPI(
@@ -21,6 +128,17 @@ app = FastAPI(
 )
 
 
+# ---- Admission control（滿載時回 503）----
+# 加在 CORS 之前（內層），被拒絕的回應才會帶 CORS 標頭
+app.add_middleware(AdmissionMiddleware, router=app.router)
+
+# ---- Idempotency-Key ----
+# 在 admission 之外：重送的請求直接回放，不佔名額、不排隊
+app.add_middleware(IdempotencyMiddleware)
+
+# ---- Read-your-writes for replica routing ----
+app.add_middleware(ReadYourWritesMiddleware, primary=engine)
+
 # ---- CORS ----
 app.add_middleware(
     CORSMiddleware,
@@ -28,14 +146,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[CLAIM_HEADER],
 )
 
+# ---- Profiling（預設關閉）----
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+    app.add_route(
+        "/debug/profiles/{name}", profile_endpoint, include_in_schema=False
+    )
+
+# ---- Metrics ----
+app.add_middleware(MetricsMiddleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 
 # ---- Routers ----
 app.include_router(auth.router)
 app.include_router(project.router)
 app.include_router(quote.router)
 app.include_router(deliverable.router)
+app.include_router(event.router)
+app.include_router(change.router)
+app.include_router(worker.router)
+app.include_router(export.router)
 
 
 # ---- Optional Health Check ----
@@ -0,0 +1,210 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.querylog import finish_trace, start_trace
+
+# With several worker processes, set PROMETHEUS_MULTIPROC_DIR to an empty
+# directory shared by all of them; every process then writes its samples
+# there and /metrics aggregates them.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+# ---------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template and status.",
+    ["method", "route", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries run while serving one request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries while serving one request.",
+    ["method", "route"],
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Time spent in argon2 hashing.",
+    ["operation"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_open_connections",
+    "Connections currently open by the pool.",
+    multiprocess_mode="livesum",
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight_requests",
+    "Requests admitted and being served, per admission gate.",
+    ["gate"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued_requests",
+    "Requests waiting for an admission slot, per gate.",
+    ["gate"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_requests",
+    "Requests shed with 503 because a gate stayed full.",
+    ["gate"],
+)
+DB_SESSIONS = Counter(
+    "db_request_sessions",
+    "Request sessions by the database they were routed to.",
+    ["role"],
+)
+SQLITE_WRITE_WAIT_SECONDS = Histogram(
+    "sqlite_write_lock_wait_seconds",
+    "Time a SQLite transaction waited for this process's writer lock.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOGIN_THROTTLED = Counter(
+    "login_throttled_requests",
+    "Login attempts refused with 429 before hashing, by reason.",
+    ["reason"],
+)
+IDEMPOTENCY_REQUESTS = Counter(
+    "idempotency_requests",
+    "POST requests with an Idempotency-Key, by outcome.",
+    ["outcome"],
+)
+AUDIT_EVENTS_WRITTEN = Counter(
+    "audit_events_written",
+    "Status history and audit log rows written, by table.",
+    ["table"],
+)
+AUDIT_EVENTS_DROPPED = Counter(
+    "audit_events_dropped",
+    "Status history and audit log rows lost to a full buffer, by table.",
+    ["table"],
+)
+UPLOAD_BYTES = Counter("upload_bytes", "Bytes received in uploaded files.")
+DOWNLOAD_BYTES = Counter("download_bytes", "Bytes sent as file downloads.")
+UPLOAD_GC_REMOVED_FILES = Counter(
+    "upload_gc_removed_files", "Orphaned uploaded files removed."
+)
+UPLOAD_GC_REMOVED_BYTES = Counter(
+    "upload_gc_removed_bytes", "Bytes freed by removing orphaned uploads."
+)
+
+
+# ---------------------------------------------------------
+# Connection pool
+# ---------------------------------------------------------
+# on the Pool class, so read replicas are counted as well
+@event.listens_for(Pool, "connect")
+def _connect(dbapi_connection, connection_record):
+    DB_POOL_CONNECTIONS.inc()
+
+
+@event.listens_for(Pool, "close")
+def _close(dbapi_connection, connection_record):
+    DB_POOL_CONNECTIONS.dec()
+
+
+@event.listens_for(Pool, "checkout")
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKED_OUT.inc()
+
+
+@event.listens_for(Pool, "checkin")
+def _checkin(dbapi_connection, connection_record):
+    DB_POOL_CHECKED_OUT.dec()
+
+
+@contextmanager
+def time_password_hash(operation: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PASSWORD_HASH_SECONDS.labels(operation).observe(time.perf_counter() - start)
+
+
+# ---------------------------------------------------------
+# ASGI middleware and /metrics endpoint
+# ---------------------------------------------------------
+def route_template(scope: Scope) -> str:
+    """The matched route's path template, e.g. ``/quotes/projects/{project_id}``.
+
+    Unmatched paths share one label so scanners cannot blow up cardinality.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = start_trace(scope)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope)
+            REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(
+                time.perf_counter() - start
+            )
+            REQUEST_DB_QUERIES.labels(scope["method"], route).observe(trace.queries)
+            REQUEST_DB_SECONDS.labels(scope["method"], route).observe(trace.db_seconds)
+            finish_trace(trace)
+
+
+def metrics_endpoint(request: Request) -> Response:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead() -> None:
+    """Drop this process' live gauges from the shared multiprocess dir."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, DateTime, Table
+from sqlmodel import SQLModel
+
+from app.models.deliverable import Deliverable
+from app.models.project import Project
+from app.models.quote import Quote
+
+
+def _archive_of(model: type[SQLModel], *indexed: str) -> Table:
+    """Same columns as the model's table plus ``archived_at``, without
+    foreign keys: archived rows outlive the hot rows they pointed to."""
+    hot: Table = model.__table__  # type: ignore[attr-defined]
+    return Table(
+        f"{hot.name}_archive",
+        SQLModel.metadata,
+        *(
+            Column(
+                column.name,
+                column.type,
+                primary_key=column.primary_key,
+                autoincrement=False,
+                nullable=column.nullable,
+                index=column.name in indexed,
+            )
+            for column in hot.c
+        ),
+        Column("archived_at", DateTime(timezone=True), nullable=False),
+    )
+
+
+# 已結案的專案與其報價、交付物，由背景工作從熱資料表搬過來
+projects_archive = _archive_of(Project, "client_id", "worker_id")
+quotes_archive = _archive_of(Quote, "project_id", "worker_id")
+deliverables_archive = _archive_of(Deliverable, "project_id", "worker_id")
+
+# hot table name -> its archive
+ARCHIVES: dict[str, Table] = {
+    "projects": projects_archive,
+    "quotes": quotes_archive,
+    "deliverables": deliverables_archive,
+}
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlmodel import SQLModel, Field, Index
+
+from app.models.project import ProjectStatus
+
+
+class ProjectStatusEvent(SQLModel, table=True):
+    """Append-only history of project status changes.
+
+    No foreign keys: the history outlives the project's move to the
+    archive tables.
+    """
+
+    __tablename__: str = "project_status_history"  # type: ignore
+    __table_args__ = (
+        Index("ix_project_status_history_project", "project_id", "create_at"),
+        Index("ix_project_status_history_client", "client_id", "project_id"),
+        Index("ix_project_status_history_worker", "worker_id", "project_id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    project_id: int
+    # the project's client and worker after the change
+    client_id: Optional[int] = None
+    worker_id: Optional[int] = None
+    # None for the project's creation
+    from_status: Optional[ProjectStatus] = None
+    to_status: ProjectStatus
+    # who made the change, when known
+    actor_id: Optional[int] = None
+    create_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class AuditEvent(SQLModel, table=True):
+    """Append-only log of security relevant actions, e.g. logins."""
+
+    __tablename__: str = "audit_log"  # type: ignore
+    __table_args__ = (
+        Index("ix_audit_log_action", "action", "create_at"),
+        Index("ix_audit_log_username", "username", "create_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # auth.register / auth.login / auth.login_failed / auth.login_throttled
+    action: str
+    user_id: Optional[int] = None
+    # as given, also when no such user exists
+    username: Optional[str] = None
+    client: Optional[str] = None  # address of the request
+    create_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import false
+from sqlmodel import SQLModel, Field, Index
+
+
+class ChangeOp(str, Enum):
+    UPSERT = "upsert"
+    DELETE = "delete"
+
+
+class Change(SQLModel, table=True):
+    """Append-only change log; ``id`` is the sync cursor."""
+
+    __tablename__: str = "changes"  # type: ignore
+    __table_args__ = (Index("ix_changes_entity_key", "entity", "entity_id", "id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # projects / quotes / deliverables / users
+    entity: str
+    entity_id: int
+    op: ChangeOp = Field(default=ChangeOp.UPSERT)
+    create_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    # Who can see the row after this change, so the feed filters in SQL:
+    # everyone while ``public`` (open projects), else its owner (project
+    # client, or the user itself) and its worker.
+    public: bool = Field(default=False, sa_column_kwargs={"server_default": false()})
+    owner_id: Optional[int] = None
+    worker_id: Optional[int] = None
+    # Who may still hold the row and needs a tombstone: a worker taken off
+    # it, and clients whose cursor is at least ``public_since`` (the row
+    # was public from then on). Both carry over to later changes, so
+    # compaction keeps them.
+    former_worker_id: Optional[int] = None
+    public_since: Optional[int] = None
@@ -10,6 +10,8 @@ if TYPE_CHECKING:
 
 class Deliverable(SQLModel, table=True):
     __tablename__: str = "deliverables"  # type: ignore
+    # never reuse the id of an archived deliverable on SQLite
+    __table_args__ = {"sqlite_autoincrement": True}
     id: Optional[int] = Field(default=None, primary_key=True)
 
     project_id: Optional[int] = Field(foreign_key="projects.id")
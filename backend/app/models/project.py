@@ -1,11 +1,14 @@
 from datetime import datetime, timezone
 from enum import Enum
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Index, Relationship
 
 from app.models.user import User
 
+if TYPE_CHECKING:
+    from app.models.quote import ProjectQuoteStats
+
 
 class ProjectStatus(str, Enum):
     OPEN = "open"  # 委託人建立，尚未有人承接
@@ -16,6 +19,12 @@ class ProjectStatus(str, Enum):
 
 class Project(SQLModel, table=True):
     __tablename__: str = "projects"  #  type: ignore
+    # SQLite 預設會重用最大的 id；封存後的專案仍保有它的 id
+    __table_args__ = (
+        # 接案人最近承接的專案（推薦用）
+        Index("ix_projects_worker_update_at", "worker_id", "update_at"),
+        {"sqlite_autoincrement": True},
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     description: str
@@ -28,3 +37,8 @@ class Project(SQLModel, table=True):
     # 建立 / 更新時間
     create_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     update_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    # 報價統計，與專案一起 JOIN 載入
+    quote_stats: Optional["ProjectQuoteStats"] = Relationship(
+        sa_relationship_kwargs={"lazy": "joined", "uselist": False}
+    )
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import Optional, TYPE_CHECKING
 
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Index, Relationship
 
 if TYPE_CHECKING:
     from app.models.project import Project
@@ -10,6 +10,15 @@ if TYPE_CHECKING:
 
 class Quote(SQLModel, table=True):
     __tablename__: str = "quotes"  # type: ignore
+    # top-k lookups per project
+    __table_args__ = (
+        Index("ix_quotes_project_amount", "project_id", "amount"),
+        Index("ix_quotes_project_days", "project_id", "days"),
+        # a worker's latest quotes, for recommendations
+        Index("ix_quotes_worker_id", "worker_id", "id"),
+        # never reuse the id of an archived quote on SQLite
+        {"sqlite_autoincrement": True},
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
 
     project_id: Optional[int] = Field(foreign_key="projects.id")
@@ -28,3 +37,17 @@ class Quote(SQLModel, table=True):
     worker: Optional["User"] = Relationship(
         sa_relationship_kwargs={"foreign_keys": "[Quote.worker_id]"}
     )
+
+
+class ProjectQuoteStats(SQLModel, table=True):
+    """Per-project quote aggregates, updated by ``create_quote``."""
+
+    __tablename__: str = "project_quote_stats"  # type: ignore
+    project_id: int = Field(foreign_key="projects.id", primary_key=True)
+
+    quote_count: int = 0
+    min_amount: Optional[float] = None
+    avg_amount: Optional[float] = None
+    min_days: Optional[int] = None
+
+    update_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
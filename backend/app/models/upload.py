@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+
+from sqlmodel import SQLModel, Field
+
+
+class ProjectUploadUsage(SQLModel, table=True):
+    """Uploaded files of a project, updated with each upload."""
+
+    __tablename__: str = "project_upload_usage"  # type: ignore
+    project_id: int = Field(foreign_key="projects.id", primary_key=True)
+
+    files: int = 0
+    bytes: int = 0
+
+    update_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class WorkerUploadUsage(SQLModel, table=True):
+    """Uploaded files of a worker, over all their projects."""
+
+    __tablename__: str = "worker_upload_usage"  # type: ignore
+    worker_id: int = Field(foreign_key="users.id", primary_key=True)
+
+    files: int = 0
+    bytes: int = 0
+
+    update_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
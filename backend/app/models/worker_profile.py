@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlmodel import SQLModel, Field
+
+
+class WorkerProfile(SQLModel, table=True):
+    """Per-worker track record, updated incrementally by the quote and
+    project status crud functions."""
+
+    __tablename__: str = "worker_profiles"  # type: ignore
+    worker_id: int = Field(foreign_key="users.id", primary_key=True)
+
+    quote_count: int = 0
+    quoted_days_sum: int = 0
+
+    active_count: int = 0
+    completed_count: int = 0
+    rejected_count: int = 0
+
+    # completed projects whose assignment time is known
+    timed_count: int = 0
+    completion_days_sum: float = 0.0
+    # ... and of those, the ones whose quote is known too
+    quoted_timed_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    completion_quoted_days_sum: int = 0
+
+    update_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    @property
+    def avg_quoted_days(self) -> Optional[float]:
+        if not self.quote_count:
+            return None
+        return self.quoted_days_sum / self.quote_count
+
+    @property
+    def avg_completion_days(self) -> Optional[float]:
+        """Average actual days from assignment to completion."""
+        if not self.timed_count:
+            return None
+        return self.completion_days_sum / self.timed_count
+
+    @property
+    def avg_completion_quoted_days(self) -> Optional[float]:
+        """Average days quoted on the completed projects that have both."""
+        if not self.quoted_timed_count:
+            return None
+        return self.completion_quoted_days_sum / self.quoted_timed_count
+
+
+class ProjectAssignment(SQLModel, table=True):
+    """When the current worker took a project, and what they quoted."""
+
+    __tablename__: str = "project_assignments"  # type: ignore
+    project_id: int = Field(foreign_key="projects.id", primary_key=True)
+    worker_id: int = Field(foreign_key="users.id")
+
+    assigned_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    quoted_days: Optional[int] = None
@@ -0,0 +1,361 @@
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from types import CodeType, FrameType
+from typing import Any, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.metrics import route_template
+
+try:
+    from anyio._backends._asyncio import WorkerThread
+
+    _WORKER_RUN: Optional[CodeType] = WorkerThread.run.__code__
+except ImportError:  # pragma: no cover - other anyio backends / versions
+    _WORKER_RUN = None
+
+logger = logging.getLogger(__name__)
+
+# (qualified name, file, first line) of one stack frame
+FrameKey = tuple[str, str, int]
+Stack = tuple[FrameKey, ...]
+
+BREAKDOWN = ("auth", "crud", "serialize", "other")
+_DEPS_FILE = os.path.join("app", "deps.py")
+_CRUD_DIR = os.path.join("app", "crud", "")
+_SERIALIZERS = {"serialize_response", "jsonable_encoder", "JSONResponse.render"}
+
+
+# ---------------------------------------------------------
+# Sampling
+# ---------------------------------------------------------
+class RequestProfile:
+    """Stack samples taken while one request was being served."""
+
+    def __init__(self, scope: Scope, anchor: FrameType) -> None:
+        self.scope = scope
+        # the middleware frame: samples on the event loop thread only count
+        # while this request's coroutine is the one running
+        self.anchor = anchor
+        self.started = time.perf_counter()
+        self.wall = 0.0
+        self._stacks: Counter[Stack] = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def label(self) -> str:
+        return f"{self.scope['method']} {route_template(self.scope)}"
+
+    @property
+    def stacks(self) -> Counter[Stack]:
+        """Seconds per distinct stack (a copy; the sampler may still write)."""
+        with self._lock:
+            return self._stacks.copy()
+
+    def record(self, stack: Stack, seconds: float) -> None:
+        with self._lock:
+            self._stacks[stack] += seconds
+
+    def breakdown(self) -> dict[str, float]:
+        """Milliseconds per ``BREAKDOWN`` category and wall-clock total."""
+        result = dict.fromkeys(BREAKDOWN, 0.0)
+        for stack, seconds in self.stacks.items():
+            result[_category(stack)] += seconds * 1000
+        # still running: time so far
+        wall = self.wall or time.perf_counter() - self.started
+        result["wall"] = wall * 1000
+        return result
+
+
+def _category(stack: Stack) -> str:
+    """The outermost match wins, so crud calls made by ``get_current_user``
+    count as auth."""
+    for qualname, file, _ in stack:
+        if qualname == "get_current_user" and file.endswith(_DEPS_FILE):
+            return "auth"
+        if _CRUD_DIR in file:
+            return "crud"
+        if qualname in _SERIALIZERS:
+            return "serialize"
+    return "other"
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "request_profile", default=None
+)
+
+
+def _frame_key(code: CodeType) -> FrameKey:
+    return (code.co_qualname, code.co_filename, code.co_firstlineno)
+
+
+def _owner(
+    frame: FrameType, active: list[RequestProfile]
+) -> Optional[tuple[RequestProfile, list[FrameKey]]]:
+    """The profile a thread's stack belongs to, with the stack above the
+    point where the request's code starts (leaf first)."""
+    keys = []
+    while frame is not None:
+        for profile in active:
+            if frame is profile.anchor:
+                return profile, keys
+        if frame.f_code is _WORKER_RUN:
+            # threadpool: the job's context carries the request's profile
+            context = frame.f_locals.get("context")
+            profile = context.get(_current) if context is not None else None
+            return (profile, keys) if profile in active else None
+        keys.append(_frame_key(frame.f_code))
+        frame = frame.f_back  # type: ignore[assignment]
+    return None
+
+
+class Sampler:
+    """Background thread that samples every thread while at least one
+    request is being profiled, attributing stacks to their request."""
+
+    def __init__(self) -> None:
+        self._active: list[RequestProfile] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="profiler", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active.remove(profile)
+        profile.wall = time.perf_counter() - profile.started
+
+    def _run(self) -> None:
+        interval = settings.PROFILING_INTERVAL_MS / 1000
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while True:
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                self._wake.clear()
+                self._wake.wait()
+                last = time.perf_counter()
+                continue
+
+            time.sleep(interval)
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                owned = _owner(frame, active)
+                if owned is not None:
+                    profile, keys = owned
+                    profile.record(tuple(reversed(keys)), elapsed)
+
+
+sampler = Sampler()
+
+
+# ---------------------------------------------------------
+# Output: speedscope documents and folded stacks
+# ---------------------------------------------------------
+def to_speedscope(name: str, stacks: Counter[Stack]) -> dict[str, Any]:
+    """A speedscope "sampled" profile (https://www.speedscope.app)."""
+    index: dict[FrameKey, int] = {}
+    samples = []
+    weights = []
+    for stack, seconds in stacks.most_common():
+        samples.append([index.setdefault(key, len(index)) for key in stack])
+        weights.append(round(seconds * 1000, 3))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "handshake-backend",
+        "shared": {
+            "frames": [
+                {"name": qualname, "file": file, "line": line}
+                for qualname, file, line in index
+            ]
+        },
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+    }
+
+
+def to_folded(stacks: Counter[Stack]) -> str:
+    """Brendan Gregg's folded format (flamegraph.pl, inferno), in µs."""
+    lines = []
+    for stack, seconds in stacks.most_common():
+        frames = ";".join(f"{q} ({os.path.basename(f)}:{l})" for q, f, l in stack)
+        lines.append(f"{frames} {round(seconds * 1e6)}")
+    return "\n".join(lines) + "\n"
+
+
+def _write(directory: str, filename: str, content: str) -> str:
+    path = os.path.join(settings.PROFILING_OUTPUT_DIR, directory)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, filename), "w") as f:
+        f.write(content)
+    return filename
+
+
+# ---------------------------------------------------------
+# Continuous profiling aggregate
+# ---------------------------------------------------------
+class Aggregate:
+    """Samples from the randomly profiled fraction of traffic."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.stacks: Counter[Stack] = Counter()
+        self.requests: Counter[str] = Counter()
+        self.breakdown: dict[str, Counter[str]] = defaultdict(Counter)
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self.stacks.update(profile.stacks)
+            self.requests[profile.label] += 1
+            self.breakdown[profile.label].update(profile.breakdown())
+
+    def flush(self) -> None:
+        """Write the report gathered since the last flush, then start over."""
+        with self._lock:
+            stacks, requests, breakdown = self.stacks, self.requests, self.breakdown
+            self._reset()
+        if not requests:
+            return
+
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        summary = {
+            label: {
+                "requests": count,
+                # mean milliseconds per request
+                **{
+                    key: round(total / count, 3)
+                    for key, total in breakdown[label].items()
+                },
+            }
+            for label, count in requests.most_common()
+        }
+        _write("continuous", f"{stamp}.folded", to_folded(stacks))
+        _write("continuous", f"{stamp}.json", json.dumps(summary, indent=2))
+        logger.info("profile report %s covers %d requests", stamp, requests.total())
+
+
+aggregate = Aggregate()
+
+
+# ---------------------------------------------------------
+# ASGI middleware and profile download
+# ---------------------------------------------------------
+def _authorized(token: Optional[str]) -> bool:
+    expected = settings.PROFILING_ADMIN_TOKEN
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+def server_timing(profile: RequestProfile) -> bytes:
+    """``Server-Timing`` header value, shown by browser dev tools."""
+    return ", ".join(
+        f"{key};dur={value:.1f}" for key, value in profile.breakdown().items()
+    ).encode()
+
+
+class ProfilingMiddleware:
+    """Profile a request on demand (``X-Profile-Token`` header) or a random
+    ``PROFILING_SAMPLE_RATE`` fraction of traffic.
+
+    On-demand profiles are stored as speedscope JSON; the response carries
+    ``X-Profile`` with the file name and a ``Server-Timing`` breakdown.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = Request(scope).headers.get("x-profile-token")
+        on_demand = _authorized(token)
+        if not on_demand and random.random() >= settings.PROFILING_SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope, sys._getframe())
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        filename = f"{stamp}-{os.getpid()}-{id(profile):x}.speedscope.json"
+
+        async def send_wrapper(message: Message) -> None:
+            if on_demand and message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"x-profile", filename.encode()),
+                        (b"server-timing", server_timing(profile)),
+                    ],
+                }
+            await send(message)
+
+        reset = _current.set(profile)
+        sampler.add(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.remove(profile)
+            _current.reset(reset)
+
+        if on_demand:
+            document = to_speedscope(profile.label, profile.stacks)
+            document["breakdown_ms"] = profile.breakdown()
+            await run_in_threadpool(
+                _write, "requests", filename, json.dumps(document)
+            )
+        else:
+            aggregate.add(profile)
+
+
+def profile_endpoint(request: Request) -> Response:
+    """Download a stored on-demand profile (same token as for recording)."""
+    if not _authorized(request.headers.get("x-profile-token")):
+        return JSONResponse({"detail": "Not authorized"}, status_code=403)
+
+    filename = os.path.basename(request.path_params["name"])
+    path = os.path.join(settings.PROFILING_OUTPUT_DIR, "requests", filename)
+    if not os.path.exists(path):
+        return JSONResponse({"detail": "Profile not found"}, status_code=404)
+    return FileResponse(path, media_type="application/json")
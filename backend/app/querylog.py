@@ -0,0 +1,208 @@
+import logging
+import re
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Optional
+
+from sqlalchemy import Engine, event
+from starlette.types import Scope
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-route query budgets, keyed by endpoint function name, for the plain
+# shape: hot tables, nothing expanded. Each ?expand= relation and each
+# read that had to fall back to the archive allows one more, see
+# ``allow_queries``. With QUERY_BUDGETS_ENFORCE on (tests) the query over
+# budget raises, so the request fails; otherwise the overrun is logged
+# once the request ends.
+QUERY_BUDGETS: dict[str, int] = {
+    "list_deliverables_route": 3,
+    "list_project_quotes_route": 3,
+    "list_top_project_quotes_route": 3,
+    "list_open_projects_route": 2,
+    # hot table + archive
+    "list_client_projects_route": 3,
+    "list_worker_projects_route": 3,
+    "list_my_quotes_route": 2,
+    "get_worker_profile_route": 2,
+    "list_quoter_profiles_route": 3,
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class QueryTrace:
+    """Queries run while serving one request."""
+
+    scope: Optional[Scope] = None
+    queries: int = 0
+    # extra queries this request's shape allows, on top of the budget
+    allowance: int = 0
+    db_seconds: float = 0.0
+    shapes: Counter[str] = field(default_factory=Counter)
+    # statement shape -> crud function seen when it became an N+1 suspect
+    suspects: dict[str, str] = field(default_factory=dict)
+    token: Optional[Token["Optional[QueryTrace]"]] = field(default=None, repr=False)
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route") if self.scope else None
+        return getattr(route, "path", None) or "-"
+
+    @property
+    def endpoint(self) -> Optional[str]:
+        route = self.scope.get("route") if self.scope else None
+        endpoint = getattr(route, "endpoint", None)
+        return getattr(endpoint, "__name__", None)
+
+
+# A mutable object rather than plain counters: sync routes run in the
+# threadpool with a copy of the context, and must update the same trace.
+_trace: ContextVar[Optional[QueryTrace]] = ContextVar("query_trace", default=None)
+
+
+def start_trace(scope: Optional[Scope] = None) -> QueryTrace:
+    trace = QueryTrace(scope=scope)
+    trace.token = _trace.set(trace)
+    return trace
+
+
+def finish_trace(trace: QueryTrace) -> None:
+    """Report N+1 suspects and check the route's query budget."""
+    if trace.token is not None:
+        _trace.reset(trace.token)
+
+    for shape, origin in trace.suspects.items():
+        logger.warning(
+            "N+1 suspect: %d x [%s] in %s via %s",
+            trace.shapes[shape],
+            shape,
+            trace.route,
+            origin,
+        )
+
+    budget = query_budget(trace)
+    if budget is not None and trace.queries > budget:
+        logger.warning(
+            "%s ran %d queries, budget is %d", trace.endpoint, trace.queries, budget
+        )
+
+
+def allow_queries(count: int, reason: str) -> None:
+    """Raise the current request's budget by ``count`` queries that its
+    shape needs (an expanded relation, an archive fallback)."""
+    trace = _trace.get()
+    if trace is not None and count > 0:
+        trace.allowance += count
+        logger.debug("%s: +%d queries for %s", trace.endpoint, count, reason)
+
+
+def query_budget(trace: QueryTrace) -> Optional[int]:
+    budget = QUERY_BUDGETS.get(trace.endpoint or "")
+    if budget is None:
+        return None
+    budget += trace.allowance
+    if settings.DATABASE_REPLICA_URLS:
+        # picking a replica may look the user up in recent_writers first
+        budget += 1
+    return budget
+
+
+def check_budget(trace: QueryTrace) -> None:
+    """Raise before the query that would exceed the route's budget, while
+    the route can still fail the request."""
+    budget = query_budget(trace)
+    if budget is not None and trace.queries >= budget:
+        raise QueryBudgetExceeded(
+            f"{trace.endpoint} ran more than {budget} queries, "
+            f"the budget; the next was via {caller()}"
+        )
+
+
+# ---------------------------------------------------------
+# Statement shapes, redaction and origin
+# ---------------------------------------------------------
+_PLACEHOLDER = r"\s*(?:\?|%\(\w+\)s|:\w+)\s*"
+_PLACEHOLDER_LIST = re.compile(rf"\((?:{_PLACEHOLDER},)+{_PLACEHOLDER}\)")
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """Collapse whitespace and IN-lists so equivalent statements compare
+    equal regardless of how many values were bound."""
+    return _PLACEHOLDER_LIST.sub("(...)", " ".join(statement.split()))
+
+
+def redact(parameters: Any) -> Any:
+    """Replace bound values with their type names."""
+    if isinstance(parameters, dict):
+        return {key: redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(value) for value in parameters]
+    return f"<{type(parameters).__name__}>"
+
+
+def caller() -> str:
+    """The innermost crud function on the stack, or else the router."""
+    frame = sys._getframe(1)
+    router = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.crud."):
+            return f"{module}.{frame.f_code.co_name}"
+        if router is None and module.startswith("app.routers."):
+            router = f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return router or "-"
+
+
+# ---------------------------------------------------------
+# Engine hooks (every engine, including read replicas)
+# ---------------------------------------------------------
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _trace.get()
+    if trace is not None and settings.QUERY_BUDGETS_ENFORCE:
+        check_budget(trace)
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    trace = _trace.get()
+
+    if trace is not None:
+        trace.queries += 1
+        trace.db_seconds += elapsed
+
+        shape = statement_shape(statement)
+        trace.shapes[shape] += 1
+        if trace.shapes[shape] == settings.N_PLUS_ONE_THRESHOLD + 1:
+            trace.suspects[shape] = caller()
+
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            "slow query (%.1f ms) in %s via %s: %s params=%s",
+            elapsed * 1000,
+            trace.route if trace else "-",
+            caller(),
+            statement_shape(statement),
+            redact(parameters),
+        )
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
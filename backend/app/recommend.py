@@ -0,0 +1,279 @@
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlmodel import Session, func, select
+
+from app.config import settings
+from app.database import engine
+from app.models.change import Change
+from app.models.project import Project, ProjectStatus
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]{2,}|[㐀-鿿]+")
+_STOPWORDS = frozenset(
+    "an and are as at be by for from has in is it of on or that the this to "
+    "was will with we you our your need needs".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased words; CJK runs become character bigrams."""
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if word[0] >= "㐀":
+            if len(word) == 1:
+                terms.append(word)
+            terms.extend(word[i : i + 2] for i in range(len(word) - 1))
+        elif word not in _STOPWORDS:
+            terms.append(word)
+    return terms
+
+
+def term_vector(texts: Iterable[str]) -> dict[str, float]:
+    """Length-normalised term frequencies of the concatenated texts."""
+    counts = Counter(term for text in texts for term in tokenize(text))
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {term: c / norm for term, c in counts.items()} if norm else {}
+
+
+def top_terms(vector: dict[str, float], n: int) -> dict[str, float]:
+    """Keep the ``n`` heaviest terms, which bounds the cost of a search."""
+    return dict(heapq.nlargest(n, vector.items(), key=lambda item: item[1]))
+
+
+# ---------------------------------------------------------
+# Inverted index over open projects
+# ---------------------------------------------------------
+class ProjectIndex:
+    """Term -> {project_id: weight} postings for open projects.
+
+    Searches only walk each query term's "champion list" (its highest
+    weighted postings), so the cost is bounded by query terms x champion
+    size no matter how many projects are open.
+
+    Champion lists are kept up to date as postings are added: a new
+    posting enters if it beats the lightest champion. Removing a champion
+    leaves its list short until ``refresh_champions`` refills it, which
+    runs with the background sync; ``search`` never scans all postings.
+    """
+
+    def __init__(self, champion_size: int) -> None:
+        self._postings: dict[str, dict[int, float]] = {}
+        self._docs: dict[int, tuple[str, ...]] = {}
+        # only for terms with more postings than champion_size
+        self._champions: dict[str, dict[int, float]] = {}
+        # min-heap over each champion list; entries no longer in it are skipped
+        self._floors: dict[str, list[tuple[float, int]]] = {}
+        # terms that lost a champion since their list was filled
+        self._stale: set[str] = set()
+        self._champion_size = champion_size
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, project_id: int, text: str) -> None:
+        vector = term_vector([text])
+        with self._lock:
+            self._remove(project_id)
+            for term, weight in vector.items():
+                postings = self._postings.setdefault(term, {})
+                postings[project_id] = weight
+                self._offer(term, postings, project_id, weight)
+            self._docs[project_id] = tuple(vector)
+
+    def remove(self, project_id: int) -> None:
+        with self._lock:
+            self._remove(project_id)
+
+    def _remove(self, project_id: int) -> None:
+        for term in self._docs.pop(project_id, ()):
+            postings = self._postings[term]
+            del postings[project_id]
+            if len(postings) <= self._champion_size:
+                self._drop_champions(term)
+                if not postings:
+                    del self._postings[term]
+            elif self._champions[term].pop(project_id, None) is not None:
+                self._stale.add(term)
+
+    # ---------------------------------------------------------
+    # Champion lists
+    # ---------------------------------------------------------
+    def _offer(
+        self, term: str, postings: dict[int, float], project_id: int, weight: float
+    ) -> None:
+        champions = self._champions.get(term)
+        if champions is None:
+            if len(postings) > self._champion_size:
+                self._fill(term, postings)
+            return
+
+        floor = self._floors[term]
+        if len(champions) >= self._champion_size:
+            while champions.get(floor[0][1]) != floor[0][0]:
+                heapq.heappop(floor)
+            if weight <= floor[0][0]:
+                return
+            del champions[heapq.heappop(floor)[1]]
+        champions[project_id] = weight
+        heapq.heappush(floor, (weight, project_id))
+
+    def _fill(self, term: str, postings: dict[int, float]) -> None:
+        top = heapq.nlargest(
+            self._champion_size, postings.items(), key=lambda item: item[1]
+        )
+        self._champions[term] = dict(top)
+        floor = [(weight, project_id) for project_id, weight in top]
+        heapq.heapify(floor)
+        self._floors[term] = floor
+        self._stale.discard(term)
+
+    def _drop_champions(self, term: str) -> None:
+        self._champions.pop(term, None)
+        self._floors.pop(term, None)
+        self._stale.discard(term)
+
+    def refresh_champions(self) -> int:
+        """Refill the champion lists that lost members; one term per lock
+        hold, so searches are not held up for long."""
+        refilled = 0
+        while True:
+            with self._lock:
+                if not self._stale:
+                    return refilled
+                term = self._stale.pop()
+                self._fill(term, self._postings[term])
+            refilled += 1
+
+    def search(
+        self, query: dict[str, float], k: int, exclude: set[int]
+    ) -> list[tuple[int, float]]:
+        """Top ``k`` (project_id, score) pairs by tf-idf cosine-like score."""
+        scores: dict[int, float] = {}
+        score = scores.get
+        with self._lock:
+            total = len(self._docs)
+            for term, q_weight in query.items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + total / len(postings))
+                factor = q_weight * idf * idf
+                for project_id, weight in self._champion_list(term, postings):
+                    scores[project_id] = score(project_id, 0.0) + weight * factor
+
+        for project_id in exclude:
+            scores.pop(project_id, None)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def _champion_list(
+        self, term: str, postings: dict[int, float]
+    ) -> Iterable[tuple[int, float]]:
+        champions = self._champions.get(term)
+        return postings.items() if champions is None else champions.items()
+
+
+class Recommender:
+    """Keeps a ``ProjectIndex`` in sync with the database.
+
+    A full rebuild runs in the background at startup and periodically;
+    in between, the change log is tailed so projects written by any
+    process are picked up within a few seconds.
+    """
+
+    def __init__(self) -> None:
+        self.index: Optional[ProjectIndex] = None
+        self._cursor = 0
+        self._sync_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    def rebuild(self) -> None:
+        index = ProjectIndex(settings.RECOMMEND_CHAMPION_SIZE)
+
+        with Session(engine) as session:
+            # everything after this cursor is replayed by sync(); a change
+            # still settling may be missing from the rows read below
+            cursor = (
+                session.exec(
+                    select(func.max(Change.id)).where(Change.create_at <= _settled())
+                ).one()
+                or 0
+            )
+
+            rows = session.exec(
+                select(Project.id, Project.title, Project.description)
+                .where(Project.status == ProjectStatus.OPEN)
+                .execution_options(yield_per=1000)
+            )
+            for project_id, title, description in rows:
+                index.add(project_id, f"{title} {description}")  # type: ignore[arg-type]
+
+        with self._sync_lock:
+            self.index, self._cursor = index, cursor
+        logger.info("recommendation index rebuilt with %d projects", len(index))
+
+        self.sync()
+
+    def sync(self) -> None:
+        """Apply project changes logged since the last rebuild/sync.
+
+        Like the change feed, entries younger than CHANGES_SETTLE_SECONDS
+        wait: a slower transaction can still commit a smaller id.
+        """
+        if self.index is None:
+            return
+
+        with self._sync_lock, Session(engine) as session:
+            changes = session.exec(
+                select(Change.id, Change.entity_id)
+                .where(
+                    Change.entity == "projects",
+                    Change.id > self._cursor,  # type: ignore
+                    Change.create_at <= _settled(),  # type: ignore
+                )
+                .order_by(Change.id)  # type: ignore
+            ).all()
+            if not changes:
+                self.index.refresh_champions()
+                return
+
+            ids = {entity_id for _, entity_id in changes}
+            rows = session.exec(
+                select(
+                    Project.id, Project.title, Project.description, Project.status
+                ).where(Project.id.in_(ids))  # type: ignore[union-attr]
+            ).all()
+
+            found = set()
+            for project_id, title, description, status in rows:
+                found.add(project_id)
+                if status == ProjectStatus.OPEN:
+                    self.index.add(project_id, f"{title} {description}")  # type: ignore[arg-type]
+                else:
+                    self.index.remove(project_id)  # type: ignore[arg-type]
+
+            for project_id in ids - found:
+                self.index.remove(project_id)
+
+            self._cursor = changes[-1][0]
+        self.index.refresh_champions()
+
+
+def _settled() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(
+        seconds=settings.CHANGES_SETTLE_SECONDS
+    )
+
+
+recommender = Recommender()
@@ -0,0 +1,215 @@
+import hashlib
+import hmac
+import random
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional, Sequence, TypeVar
+
+from sqlalchemy import Column, Engine, Float, String, Table, delete, event, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlmodel import SQLModel
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.metrics import DB_SESSIONS
+from app.security import token_subject
+
+F = TypeVar("F", bound=Callable)
+
+# On the primary: users (JWT ``sub``) who wrote moments ago. Until
+# ``until`` their read-only requests still go to the primary, so they see
+# their own writes, whichever worker process serves them.
+recent_writers = Table(
+    "recent_writers",
+    SQLModel.metadata,
+    Column("subject", String, primary_key=True),
+    Column("until", Float, nullable=False, index=True),
+)
+
+# Signed "writes visible until" claim, sent with every response to a
+# request that wrote. Clients that echo it back are routed without a
+# lookup in recent_writers.
+CLAIM_HEADER = "Writes-Visible-Until"
+
+# marks this process made or read, so most lookups need no query
+_marked: dict[str, float] = {}
+# subjects found without a mark: subject -> when to ask the table again
+_unmarked: dict[str, float] = {}
+
+
+def read_only(endpoint: F) -> F:
+    """Mark a route whose session may read from a replica.
+
+    Put it below the ``@router.get`` decorator. The route's dependencies,
+    ``get_current_user`` included, share that session, so they must not
+    write either.
+    """
+    endpoint.read_only = True  # type: ignore[attr-defined]
+    return endpoint
+
+
+def choose_engine(
+    request: Request, primary: Engine, replicas: Sequence[Engine]
+) -> Engine:
+    endpoint = request.scope.get("endpoint")
+    if replicas and getattr(endpoint, "read_only", False):
+        subject = token_subject(request.headers.get("authorization"))
+        if subject is None or not wrote_recently(
+            primary, subject, request.headers.get(CLAIM_HEADER)
+        ):
+            DB_SESSIONS.labels("replica").inc()
+            return random.choice(replicas)
+    DB_SESSIONS.labels("primary").inc()
+    return primary
+
+
+# ---------------------------------------------------------
+# Read-your-writes
+# ---------------------------------------------------------
+class _Writes:
+    committed = False
+    # who wrote, for requests without a bearer token (register, login)
+    subject: Optional[str] = None
+
+
+# a mutable holder: commits happen in threadpool copies of the context
+_writes: ContextVar[Optional[_Writes]] = ContextVar("request_writes", default=None)
+
+
+def wrote_recently(primary: Engine, subject: str, claim: Optional[str] = None) -> bool:
+    """Whether ``subject`` wrote within READ_YOUR_WRITES_SECONDS.
+
+    Checked in order: the client's signed claim, this process' marks, a
+    recent "no" for the subject, and only then ``recent_writers`` on the
+    primary.
+    """
+    now = time.time()
+    if claim_until(subject, claim) > now or _marked.get(subject, 0.0) > now:
+        return True
+    if _unmarked.get(subject, 0.0) > now:
+        return False
+    with primary.connect() as conn:
+        until = conn.scalar(
+            select(recent_writers.c.until).where(recent_writers.c.subject == subject)
+        )
+    if until is not None and until > now:
+        _marked[subject] = until
+        return True
+    _unmarked[subject] = now + settings.READ_YOUR_WRITES_NEGATIVE_CACHE_SECONDS
+    return False
+
+
+def sign_claim(subject: str, until: float) -> str:
+    value = f"{until:.3f}"
+    return f"{value}.{_signature(subject, value)}"
+
+
+def claim_until(subject: str, claim: Optional[str]) -> float:
+    """The time in a valid claim for ``subject``; 0 for anything else."""
+    value, _, signature = (claim or "").rpartition(".")
+    if not value or not hmac.compare_digest(signature, _signature(subject, value)):
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+def _signature(subject: str, value: str) -> str:
+    message = f"read-your-writes:{subject}:{value}".encode()
+    key = settings.JWT_SECRET_KEY.encode()
+    return hmac.new(key, message, hashlib.sha256).hexdigest()[:32]
+
+
+def note_writer(subject: str) -> None:
+    """Name the user of a request that authenticates without a token, so
+    its write is marked for them (register, login)."""
+    writes = _writes.get()
+    if writes is not None:
+        writes.subject = subject
+
+
+def mark_write(primary: Engine, subject: str) -> float:
+    """Send ``subject``'s reads to the primary for READ_YOUR_WRITES_SECONDS;
+    returns until when."""
+    until = time.time() + settings.READ_YOUR_WRITES_SECONDS
+    insert = pg_insert if primary.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(recent_writers).values(subject=subject, until=until)
+    with primary.begin() as conn:
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[recent_writers.c.subject],
+                set_={"until": stmt.excluded.until},
+            )
+        )
+    _marked[subject] = until
+    _unmarked.pop(subject, None)
+    return until
+
+
+def prune_recent_writers(primary: Engine) -> int:
+    now = time.time()
+    for cache in (_marked, _unmarked):
+        for subject in [s for s, until in cache.items() if until <= now]:
+            cache.pop(subject, None)
+    with primary.begin() as conn:
+        result = conn.execute(
+            delete(recent_writers).where(recent_writers.c.until <= now)
+        )
+    return result.rowcount
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    note_write()
+
+
+def note_write() -> None:
+    """Treat the current request as one that wrote to the primary."""
+    writes = _writes.get()
+    if writes is not None:
+        writes.committed = True
+
+
+class ReadYourWritesMiddleware:
+    """Mark the user of a request that committed to the primary in
+    ``recent_writers``, before the response goes out, and send them the
+    signed claim in the ``Writes-Visible-Until`` header.
+
+    Keyed on the token's subject, or the user a route named with
+    ``note_writer``, rather than on a cookie, so it also works for
+    cross-origin clients that send no credentials. Only with replicas.
+    """
+
+    def __init__(self, app: ASGIApp, primary: Engine) -> None:
+        self.app = app
+        self.primary = primary
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.DATABASE_REPLICA_URLS:
+            await self.app(scope, receive, send)
+            return
+
+        writes = _Writes()
+        token = _writes.set(writes)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and writes.committed:
+                subject = writes.subject or token_subject(
+                    Headers(scope=scope).get("authorization")
+                )
+                if subject is not None:
+                    until = await run_in_threadpool(mark_write, self.primary, subject)
+                    headers = MutableHeaders(scope=message)
+                    headers[CLAIM_HEADER] = sign_claim(subject, until)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _writes.reset(token)
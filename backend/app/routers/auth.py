@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session
 
+from app.audit import audit_log
 from app.database import get_session
+from app.replicas import note_writer
 from app.schemas.user import UserCreate, UserLogin, UserRead
 from app.crud.user import (
     create_user,
@@ -11,16 +15,22 @@ from app.crud.user import (
 )
 from app.security import create_access_token
 from app.models.user import User
+from app.throttle import LoginThrottled, login_throttle
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def _client(request: Request) -> str:
+    return request.client.host if request.client else ""
+
+
 # ------------------------------------------------------
 # Register
 # ------------------------------------------------------
 @router.post("/register", response_model=UserRead)
 def register_user(
+    request: Request,
     data: UserCreate,
     session: Session = Depends(get_session),
 ):
@@ -32,29 +42,42 @@ def register_user(
         )
 
     user = create_user(session, data)
+    # no token yet: its first reads must still see the new account
+    note_writer(user.username)
+    audit_log.auth("auth.register", user.username, _client(request), user.id)
     return user
 
 
 # ------------------------------------------------------
 # Login
 # ------------------------------------------------------
-@router.post("/login")
-def login_form(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(get_session),
-):
-    user: User | None = authenticate_user(
-        session,
-        form_data.username,
-        form_data.password,
-    )
+def _login(request: Request, session: Session, username: str, password: str):
+    client = _client(request)
+    # throttled attempts never reach the database or the hasher
+    try:
+        login_throttle.check(username, client)
+    except LoginThrottled as exc:
+        audit_log.auth("auth.login_throttled", username, client)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please retry later",
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        )
+
+    user: User | None = authenticate_user(session, username, password)
 
     if not user:
+        login_throttle.failed(username, client)
+        audit_log.auth("auth.login_failed", username, client)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    login_throttle.succeeded(username)
+    # a login that rewrote the password hash counts as this user's write
+    note_writer(user.username)
+    audit_log.auth("auth.login", username, client, user.id)
 
     token = create_access_token({"sub": user.username})
     return {
@@ -63,26 +86,19 @@ def login_form(
     }
 
 
+@router.post("/login")
+def login_form(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    session: Session = Depends(get_session),
+):
+    return _login(request, session, form_data.username, form_data.password)
+
+
 @router.post("/login/json")
 def login_json(
+    request: Request,
     data: UserLogin,
     session: Session = Depends(get_session),
 ):
-    user: User | None = authenticate_user(
-        session,
-        data.username,
-        data.password,
-    )
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    token = create_access_token({"sub": user.username})
-    return {
-        "access_token": token,
-        "token_type": "bearer",
-    }
\ No newline at end of file
+    return _login(request, session, data.username, data.password)
@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, Query
+from sqlmodel import Session
+
+from app.config import settings
+from app.crud.change import (
+    could_have_seen,
+    last_settled_change_id,
+    list_changes_since,
+    load_changed_rows,
+)
+from app.database import get_session
+from app.deps import get_current_user
+from app.models.project import ProjectStatus
+from app.models.user import User
+from app.schemas.change import ChangeFeed, Tombstone
+
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+@router.get("", response_model=ChangeFeed)
+def list_changes_route(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Rows changed after the ``since`` cursor that the current user can see.
+
+    Start with ``since=0`` for a full sync, then pass back ``cursor``.
+    """
+    limit = min(limit, settings.CHANGES_MAX_PAGE_SIZE)
+    viewer_id = current_user.id
+    assert viewer_id is not None
+    changes = list_changes_since(
+        session, since, limit, settings.CHANGES_SETTLE_SECONDS, viewer_id
+    )
+    rows, deleted = load_changed_rows(session, changes)
+    has_more = len(changes) == limit
+    if has_more:
+        cursor = changes[-1].id
+    else:
+        # skip past the changes about rows this user never sees
+        cursor = max(
+            since, last_settled_change_id(session, settings.CHANGES_SETTLE_SECONDS)
+        )
+    feed = ChangeFeed(cursor=cursor, has_more=has_more)
+
+    # the last entry per row decides; it carries who can see the row now
+    latest = {(change.entity, change.entity_id): change for change in changes}
+    for (entity, entity_id), change in sorted(latest.items()):
+        row = rows.get(entity, {}).get(entity_id)
+        if (entity, entity_id) in deleted or row is None:
+            visible = False
+        elif entity == "projects":
+            visible = row.status == ProjectStatus.OPEN or viewer_id in (
+                row.client_id,
+                row.worker_id,
+            )
+        elif entity == "users":
+            visible = entity_id == viewer_id
+        else:
+            # quotes / deliverables: their worker and the project owner
+            visible = viewer_id in (row.worker_id, change.owner_id)
+
+        if visible:
+            getattr(feed, entity).append(row)
+        elif could_have_seen(change, viewer_id, since):
+            # e.g. an open project that was assigned to someone else
+            feed.deleted.append(Tombstone(entity=entity, id=entity_id))
+
+    return feed
@@ -4,19 +4,44 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from fastapi.responses import FileResponse
 from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
+from app.config import settings
 from app.database import get_session
-from app.deps import get_current_user
+from app.replicas import read_only
+from app.deps import get_current_user, get_expand
+from app.events import broker
+from app.metrics import DOWNLOAD_BYTES, UPLOAD_BYTES
 from app.models.user import User, UserRole
 from app.schemas.deliverable import DeliverableCreate, DeliverableRead
-from app.crud.deliverable import create_deliverable, list_deliverables_by_project
+from app.schemas.expanded import DeliverableExpandedRead
+from app.crud.deliverable import (
+    create_deliverable,
+    get_deliverable,
+    list_deliverables_by_project,
+)
 from app.crud.project import get_project
+from app.crud.upload import get_upload_usage
 from app.models.deliverable import Deliverable
+from app.uploads import upload_dir
 
 
 router = APIRouter(prefix="/deliverables", tags=["deliverables"])
 
 
+def notify_deliverable_created(client_id: int | None, deliverable: Deliverable) -> None:
+    """Tell the project's client that new work was delivered."""
+    broker.publish(
+        client_id,
+        "deliverable.created",
+        {
+            "deliverable_id": deliverable.id,
+            "project_id": deliverable.project_id,
+            "worker_id": deliverable.worker_id,
+        },
+    )
+
+
 @router.post(
     "/projects/{project_id}",
     response_model=DeliverableRead,
@@ -39,27 +64,30 @@ def create_deliverable_route(
         raise HTTPException(403, "You are not assigned to this project")
 
     deliverable = create_deliverable(session, project_id, current_user.id, data)
+    notify_deliverable_created(project.client_id, deliverable)
 
     return deliverable
 
 
 @router.get(
     "/projects/{project_id}",
-    response_model=list[DeliverableRead],
+    response_model=list[DeliverableExpandedRead],
 )
+@read_only
 def list_deliverables_route(
     project_id: int,
+    expand: frozenset[str] = Depends(get_expand),
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
-    project = get_project(session, project_id)
+    project = get_project(session, project_id, include_archived=True)
     if not project:
         raise HTTPException(404, "Project not found")
 
     if project.client_id != current_user.id:
         raise HTTPException(403, "Only the client can view deliverables")
 
-    items = list_deliverables_by_project(session, project_id)
+    items = list_deliverables_by_project(session, project_id, expand)
     return items
 
 
@@ -87,28 +115,50 @@ async def upload_deliverable_file(
     if project.worker_id != current_user.id:
         raise HTTPException(403, "You are not assigned to this project")
 
+    content = await file.read()
+
+    # ---- 檢查配額（0 = 不限）----
+    project_bytes, worker_bytes = get_upload_usage(
+        session, project_id, current_user.id  # type: ignore[arg-type]
+    )
+    for used, quota_mb in (
+        (project_bytes, settings.UPLOAD_PROJECT_QUOTA_MB),
+        (worker_bytes, settings.UPLOAD_WORKER_QUOTA_MB),
+    ):
+        if quota_mb and used + len(content) > quota_mb * 1024 * 1024:
+            raise HTTPException(413, "Upload quota exceeded")
+
     # ---- 準備 uploads 路徑 ----
-    upload_dir = f"uploads/{project_id}"
-    os.makedirs(upload_dir, exist_ok=True)
+    directory = upload_dir(project_id)
+    os.makedirs(directory, exist_ok=True)
 
     # ---- 儲存檔案 ----
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
     filename = f"{timestamp}-{file.filename}"
-    file_path = os.path.join(upload_dir, filename)
+    file_path = os.path.join(directory, filename)
 
     with open(file_path, "wb") as f:
-        f.write(await file.read())
+        f.write(content)
+    UPLOAD_BYTES.inc(len(content))
 
     # ---- 建立 deliverable 記錄 ----
-    deliverable = create_deliverable(
-        session=session,
-        project_id=project_id,
-        worker_id=current_user.id,
-        data=DeliverableCreate(
-            file_url=file_path,
-            note=note,
-        ),
-    )
+    try:
+        deliverable = create_deliverable(
+            session=session,
+            project_id=project_id,
+            worker_id=current_user.id,
+            data=DeliverableCreate(
+                file_url=file_path,
+                note=note,
+            ),
+            file_size=len(content),
+        )
+    except Exception:
+        # 沒有記錄就不留檔案；程序若在這之前就掛了，交給 upload GC
+        os.remove(file_path)
+        raise
+    # NOTIFY on PostgreSQL blocks; keep it off the event loop
+    await run_in_threadpool(notify_deliverable_created, project.client_id, deliverable)
 
     return deliverable
 
@@ -121,11 +171,11 @@ def download_deliverable_file(
     deliverable_id: int,
     session: Session = Depends(get_session),
 ):
-    deliverable = session.get(Deliverable, deliverable_id)
+    deliverable = get_deliverable(session, deliverable_id)
     if not deliverable:
         raise HTTPException(404, "Deliverable not found")
 
-    project = get_project(session, deliverable.project_id)
+    project = get_project(session, deliverable.project_id, include_archived=True)
     if not project:
         raise HTTPException(404, "Project not found")
 
@@ -136,6 +186,7 @@ def download_deliverable_file(
 
     # 用原本檔名當下載名稱會比較友善
     download_name = os.path.basename(file_path)
+    DOWNLOAD_BYTES.inc(os.path.getsize(file_path))
 
     return FileResponse(
         path=file_path,
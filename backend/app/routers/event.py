@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from app.config import settings
+from app.database import get_session
+from app.deps import get_current_user
+from app.events import broker
+from app.models.user import User
+
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("/stream")
+async def stream_events(
+    last_event_id: int | None = Header(default=None),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Server-Sent Events stream of quotes, assignments and deliverables
+    for the current user."""
+    user_id = current_user.id
+
+    # 長連線不需要資料庫連線，先還給 pool
+    session.close()
+
+    async def event_stream():
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n\n"
+
+        async for event in broker.subscribe(
+            user_id,
+            last_event_id,
+            heartbeat=settings.EVENTS_HEARTBEAT_SECONDS,
+        ):
+            yield ": ping\n\n" if event is None else event.encode()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
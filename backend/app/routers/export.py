@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Iterator, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from app.config import settings
+from app.crud.export import EXPORT_TABLES, export_statements, iter_export_rows
+from app.database import get_session
+from app.deps import get_current_user
+from app.models.project import ProjectStatus
+from app.models.user import User
+from app.replicas import read_only
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def encode_ndjson(batches: Iterator[list[dict]]) -> Iterator[str]:
+    for batch in batches:
+        yield "".join(
+            json.dumps({k: _plain(v) for k, v in row.items()}) + "\n" for row in batch
+        )
+
+
+def encode_csv(columns: list[str], batches: Iterator[list[dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # header first, so the client gets bytes before the first query returns
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(row[c]) for c in columns] for row in batch)
+        yield buffer.getvalue()
+
+
+@router.get("/{entity}")
+@read_only
+def export_route(
+    entity: Literal["projects", "quotes", "deliverables"],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    status: Optional[ProjectStatus] = None,
+    since: Optional[datetime] = Query(None, description="create_at >= since"),
+    until: Optional[datetime] = Query(None, description="create_at < until"),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Stream every row of ``entity`` the current user can see.
+
+    ``status`` is the project's status, also for quotes and deliverables.
+    """
+    user_id: int = current_user.id  # type: ignore[assignment]
+    statements = export_statements(entity, user_id, status, since, until)
+    # runs lazily, in the threadpool, while the response is being sent
+    batches = iter_export_rows(session, statements, settings.EXPORT_BATCH_SIZE)
+
+    if format == "csv":
+        columns = [column.name for column in EXPORT_TABLES[entity].c]
+        body = encode_csv(columns, batches)
+    else:
+        body = encode_ndjson(batches)
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{entity}.{format}"',
+            "X-Accel-Buffering": "no",
+        },
+    )
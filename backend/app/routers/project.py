@@ -1,11 +1,19 @@
-from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from sqlmodel import Session
 
+from app.config import settings
 from app.database import get_session
+from app.replicas import read_only
 from app.deps import get_current_user
+from app.events import broker
+from app.recommend import recommender, term_vector, top_terms
 from app.models.user import User, UserRole
-from app.models.project import Project, ProjectStatus
+from app.models.project import Project
+from app.schemas.bulk import BulkItemResult, BulkResult, validate_items
+from app.schemas.history import ProjectDurations, ProjectStatusEventRead
 from app.schemas.project import (
     ProjectCreate,
     ProjectUpdate,
@@ -13,15 +21,22 @@ from app.schemas.project import (
 )
 from app.crud.project import (
     create_project,
+    create_projects,
     get_project,
     list_open_projects,
+    list_open_projects_by_ids,
+    list_project_texts,
+    list_recent_open_projects,
     list_projects_by_client,
     list_projects_by_worker,
+    list_recent_worker_project_ids,
     update_project,
     assign_worker,
     complete_project,
     reject_project,
 )
+from app.crud.history import list_project_history, project_durations
+from app.crud.quote import list_quoted_among, list_quoted_project_ids
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
@@ -42,7 +57,45 @@ def create_project_route(
     return project
 
 
+@router.post("/bulk", response_model=BulkResult)
+def create_projects_route(
+    items: list[Any] = Body(description="ProjectCreate objects"),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Create up to ``BULK_MAX_ITEMS`` projects in one transaction.
+
+    Invalid items are reported as failed; the rest are created.
+    """
+    if current_user.role != UserRole.CLIENT:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only clients can create projects",
+        )
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_MAX_ITEMS} items per request",
+        )
+
+    accepted, results = validate_items(ProjectCreate, items)
+    ids = []
+    if accepted:
+        ids = create_projects(session, current_user.id, [item for _, item in accepted])
+    results.extend(
+        BulkItemResult(index=index, id=project_id)
+        for (index, _), project_id in zip(accepted, ids)
+    )
+    results.sort(key=lambda result: result.index)
+    return BulkResult(
+        created=len(ids),
+        failed=sum(result.error is not None for result in results),
+        items=results,
+    )
+
+
 @router.get("/open", response_model=list[ProjectRead])
+@read_only
 def list_open_projects_route(
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
@@ -51,7 +104,49 @@ def list_open_projects_route(
     return projects
 
 
+@router.get("/recommended", response_model=list[ProjectRead])
+@read_only
+def list_recommended_projects_route(
+    k: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Open projects most similar to the ones this worker quoted on or
+    worked on."""
+    if current_user.role != UserRole.WORKER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only workers get project recommendations",
+        )
+
+    # only the latest history, like the query vector only keeps top terms
+    size = settings.RECOMMEND_HISTORY_SIZE
+    history = set(list_quoted_project_ids(session, current_user.id, limit=size))
+    history.update(list_recent_worker_project_ids(session, current_user.id, size))
+
+    query = top_terms(
+        term_vector(list_project_texts(session, history)),
+        settings.RECOMMEND_QUERY_TERMS,
+    )
+
+    index = recommender.index
+    if index is None or not query:
+        # 索引尚未建好，或是新的接案人：先給最新的專案
+        return list_recent_open_projects(session, k)
+
+    # ask for a few extra in case some closed since the last index sync, or
+    # were quoted on longer ago than the history goes back
+    hits = index.search(query, k + 10, exclude=history)
+    hit_ids = [project_id for project_id, _ in hits]
+    quoted = list_quoted_among(session, current_user.id, hit_ids)
+    projects = list_open_projects_by_ids(
+        session, [project_id for project_id in hit_ids if project_id not in quoted]
+    )
+    return projects[:k]
+
+
 @router.get("/me/client", response_model=list[ProjectRead])
+@read_only
 def list_client_projects_route(
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
@@ -61,6 +156,7 @@ def list_client_projects_route(
 
 
 @router.get("/me/worker", response_model=list[ProjectRead])
+@read_only
 def list_worker_projects_route(
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
@@ -69,6 +165,38 @@ def list_worker_projects_route(
     return projects
 
 
+# status history is written in the background, up to a flush interval behind
+@router.get("/me/durations", response_model=ProjectDurations)
+@read_only
+def project_durations_route(
+    since: Optional[datetime] = Query(None, description="created at or after"),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Time to assign and time to complete over the current user's
+    projects: those they created as a client, or worked on as a worker."""
+    if current_user.role == UserRole.CLIENT:
+        return project_durations(session, client_id=current_user.id, since=since)
+    return project_durations(session, worker_id=current_user.id, since=since)
+
+
+@router.get("/{project_id}/history", response_model=list[ProjectStatusEventRead])
+@read_only
+def project_history_route(
+    project_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    project = get_project(session, project_id, include_archived=True)
+    if not project:
+        raise HTTPException(404, "Project not found")
+
+    if current_user.id not in (project.client_id, project.worker_id):
+        raise HTTPException(403, "Only the client or the worker can view its history")
+
+    return list_project_history(session, project_id)
+
+
 @router.patch("/{project_id}", response_model=ProjectRead)
 def update_project_route(
     project_id: int,
@@ -86,7 +214,7 @@ def update_project_route(
             detail="Only the client can update this project",
         )
 
-    updated = update_project(session, project, data)
+    updated = update_project(session, project, data, current_user.id)
     return updated
 
 
@@ -114,13 +242,14 @@ def assign_project(
     if not worker or worker.role != UserRole.WORKER:
         raise HTTPException(status_code=400, detail="Invalid worker id")
 
-    project.worker_id = worker_id
-    project.status = ProjectStatus.IN_PROGRESS
-    project.update_at = datetime.now(timezone.utc)
+    project = assign_worker(session, project, worker_id, current_user.id)
 
-    session.add(project)
-    session.commit()
-    session.refresh(project)
+    # 通知接案人被指派
+    broker.publish(
+        worker_id,
+        "project.assigned",
+        {"project_id": project.id, "client_id": project.client_id},
+    )
 
     return {"message": "Project assigned successfully", "project": project}
 
@@ -138,7 +267,7 @@ def complete_project_route(
     if project.client_id != current_user.id:
         raise HTTPException(403, "Only the client can complete the project")
 
-    return complete_project(session, project)
+    return complete_project(session, project, current_user.id)
 
 
 @router.post("/{project_id}/reject", response_model=ProjectRead)
@@ -154,4 +283,4 @@ def reject_project_route(
     if project.client_id != current_user.id:
         raise HTTPException(403, "Only the client can reject the project")
 
-    return reject_project(session, project)
+    return reject_project(session, project, current_user.id)
@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Literal
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from sqlmodel import Session
 
+from app.config import settings
 from app.database import get_session
-from app.deps import get_current_user
+from app.replicas import read_only
+from app.deps import get_current_user, get_expand
+from app.events import broker
 from app.models.user import User, UserRole
 from app.models.project import Project
-from app.schemas.quote import QuoteCreate, QuoteRead
+from app.models.project import ProjectStatus
+from app.schemas.bulk import BulkItemResult, BulkResult, validate_items
+from app.schemas.expanded import QuoteExpandedRead
+from app.schemas.quote import QuoteBulkItem, QuoteCreate, QuoteRead
 from app.crud.quote import (
     create_quote,
+    create_quotes,
     list_quotes_by_project,
     list_quotes_by_worker,
+    list_top_quotes,
 )
-from app.crud.project import get_project
+from app.crud.project import get_project, get_projects
 
 
 router = APIRouter(prefix="/quotes", tags=["quotes"])
@@ -40,19 +50,106 @@ def create_quote_route(
         raise HTTPException(400, "Cannot quote on closed or assigned projects")
 
     quote = create_quote(session, project_id, current_user.id, data)
+
+    # 通知委託人有新的報價
+    broker.publish(
+        project.client_id,
+        "quote.created",
+        {
+            "quote_id": quote.id,
+            "project_id": quote.project_id,
+            "worker_id": quote.worker_id,
+            "amount": quote.amount,
+            "days": quote.days,
+        },
+    )
     return quote
 
 
+@router.post("/bulk", response_model=BulkResult)
+def create_quotes_route(
+    items: list[Any] = Body(description="QuoteBulkItem objects"),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Submit up to ``BULK_MAX_ITEMS`` quotes in one transaction.
+
+    Invalid items, and items on a missing or non-open project, are
+    reported as failed; the rest are created.
+    """
+    if current_user.role != UserRole.WORKER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only workers can submit quotes",
+        )
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_MAX_ITEMS} items per request",
+        )
+
+    valid, results = validate_items(QuoteBulkItem, items)
+
+    # check the projects of the whole batch with one query
+    projects = get_projects(session, {item.project_id for _, item in valid})
+    accepted: list[tuple[int, QuoteBulkItem]] = []
+    for index, item in valid:
+        project = projects.get(item.project_id)
+        if project is None:
+            results.append(BulkItemResult(index=index, error="Project not found"))
+        elif project.status != ProjectStatus.OPEN:
+            results.append(
+                BulkItemResult(
+                    index=index, error="Cannot quote on closed or assigned projects"
+                )
+            )
+        else:
+            accepted.append((index, item))
+    # read before the commit expires the projects
+    owners = {project_id: p.client_id for project_id, p in projects.items()}
+
+    ids = []
+    if accepted:
+        ids = create_quotes(session, current_user.id, [item for _, item in accepted])
+    results.extend(
+        BulkItemResult(index=index, id=quote_id)
+        for (index, _), quote_id in zip(accepted, ids)
+    )
+    results.sort(key=lambda result: result.index)
+
+    broker.publish_many(
+        (
+            owners[item.project_id],
+            "quote.created",
+            {
+                "quote_id": quote_id,
+                "project_id": item.project_id,
+                "worker_id": current_user.id,
+                "amount": item.amount,
+                "days": item.days,
+            },
+        )
+        for (_, item), quote_id in zip(accepted, ids)
+    )
+    return BulkResult(
+        created=len(ids),
+        failed=sum(result.error is not None for result in results),
+        items=results,
+    )
+
+
 @router.get(
     "/projects/{project_id}",
-    response_model=list[QuoteRead],
+    response_model=list[QuoteExpandedRead],
 )
+@read_only
 def list_project_quotes_route(
     project_id: int,
+    expand: frozenset[str] = Depends(get_expand),
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
-    project = get_project(session, project_id)
+    project = get_project(session, project_id, include_archived=True)
     if not project:
         raise HTTPException(404, "Project not found")
 
@@ -63,15 +160,43 @@ def list_project_quotes_route(
             "Only the project owner can view its quotes",
         )
 
-    quotes = list_quotes_by_project(session, project_id)
+    quotes = list_quotes_by_project(session, project_id, expand)
     return quotes
 
 
+@router.get(
+    "/projects/{project_id}/top",
+    response_model=list[QuoteExpandedRead],
+)
+@read_only
+def list_top_project_quotes_route(
+    project_id: int,
+    by: Literal["amount", "days"] = "amount",
+    k: int = Query(5, ge=1, le=100),
+    expand: frozenset[str] = Depends(get_expand),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    project = get_project(session, project_id, include_archived=True)
+    if not project:
+        raise HTTPException(404, "Project not found")
+
+    if project.client_id != current_user.id:
+        raise HTTPException(
+            403,
+            "Only the project owner can view its quotes",
+        )
+
+    return list_top_quotes(session, project_id, by, k, expand)
+
+
 @router.get(
     "/me",
-    response_model=list[QuoteRead],
+    response_model=list[QuoteExpandedRead],
 )
+@read_only
 def list_my_quotes_route(
+    expand: frozenset[str] = Depends(get_expand),
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
@@ -81,5 +206,5 @@ def list_my_quotes_route(
             "Only workers can view their submitted quotes",
         )
 
-    quotes = list_quotes_by_worker(session, current_user.id)
+    quotes = list_quotes_by_worker(session, current_user.id, expand)
     return quotes
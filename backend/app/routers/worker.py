@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import Session
+
+from app.database import get_session
+from app.replicas import read_only
+from app.deps import get_current_user
+from app.models.user import User, UserRole
+from app.models.worker_profile import WorkerProfile
+from app.schemas.worker_profile import WorkerProfileRead
+from app.crud.project import get_project
+from app.crud.worker_profile import get_worker_profile, list_profiles_of_quoters
+
+
+router = APIRouter(prefix="/workers", tags=["workers"])
+
+
+@router.get("/{worker_id}/profile", response_model=WorkerProfileRead)
+@read_only
+def get_worker_profile_route(
+    worker_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    profile = get_worker_profile(session, worker_id)
+    if profile:
+        return profile
+
+    worker = session.get(User, worker_id)
+    if not worker or worker.role != UserRole.WORKER:
+        raise HTTPException(404, "Worker not found")
+
+    # 尚未有任何紀錄的接案人
+    return WorkerProfile(worker_id=worker_id)
+
+
+@router.get(
+    "/profiles/projects/{project_id}",
+    response_model=list[WorkerProfileRead],
+)
+@read_only
+def list_quoter_profiles_route(
+    project_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Profiles of every worker who quoted on the project."""
+    project = get_project(session, project_id, include_archived=True)
+    if not project:
+        raise HTTPException(404, "Project not found")
+
+    if project.client_id != current_user.id:
+        raise HTTPException(403, "Only the project owner can view its quoters")
+
+    return list_profiles_of_quoters(session, project_id)
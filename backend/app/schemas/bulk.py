@@ -0,0 +1,47 @@
+from functools import lru_cache
+from typing import Any, Optional, TypeVar
+
+from pydantic import TypeAdapter, ValidationError
+from sqlmodel import SQLModel
+
+T = TypeVar("T")
+
+
+class BulkItemResult(SQLModel):
+    index: int  # position in the request
+    id: Optional[int] = None  # set when created
+    error: Optional[str] = None  # set when rejected
+
+
+class BulkResult(SQLModel):
+    created: int
+    failed: int
+    items: list[BulkItemResult]
+
+
+@lru_cache
+def _adapter(model: type[T]) -> TypeAdapter[T]:
+    return TypeAdapter(model)
+
+
+def validate_items(
+    model: type[T], items: list[Any]
+) -> tuple[list[tuple[int, T]], list[BulkItemResult]]:
+    """Validate each raw item on its own, so that one bad item is reported
+    in its result instead of failing the whole request.
+
+    Returns the valid items with their index, and the failures.
+    """
+    adapter = _adapter(model)
+    valid: list[tuple[int, T]] = []
+    failed: list[BulkItemResult] = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, adapter.validate_python(item)))
+        except ValidationError as exc:
+            error = "; ".join(
+                f"{'.'.join(map(str, e['loc'])) or 'item'}: {e['msg']}"
+                for e in exc.errors()
+            )
+            failed.append(BulkItemResult(index=index, error=error))
+    return valid, failed
@@ -0,0 +1,23 @@
+from sqlmodel import SQLModel
+
+from app.schemas.deliverable import DeliverableRead
+from app.schemas.project import ProjectRead
+from app.schemas.quote import QuoteRead
+from app.schemas.user import UserRead
+
+
+class Tombstone(SQLModel):
+    entity: str
+    id: int
+
+
+class ChangeFeed(SQLModel):
+    # pass back as ?since= on the next call
+    cursor: int
+    has_more: bool
+    projects: list[ProjectRead] = []
+    quotes: list[QuoteRead] = []
+    deliverables: list[DeliverableRead] = []
+    users: list[UserRead] = []
+    # rows that were deleted or are no longer visible to this user
+    deleted: list[Tombstone] = []
@@ -0,0 +1,33 @@
+from typing import Optional
+
+from pydantic import SerializerFunctionWrapHandler, model_serializer
+from sqlmodel import SQLModel
+
+from app.schemas.deliverable import DeliverableRead
+from app.schemas.project import ProjectRead
+from app.schemas.quote import QuoteRead
+from app.schemas.user import UserRead
+
+
+# === Read, with the relations asked for by ?expand= ===
+# left out when not expanded; never loaded one row at a time
+class _Expandable(SQLModel):
+    worker: Optional[UserRead] = None
+    project: Optional[ProjectRead] = None
+
+    # 沒有 expand 的關聯不輸出，回應與原本的 QuoteRead / DeliverableRead 相同
+    @model_serializer(mode="wrap")
+    def _omit_unexpanded(self, handler: SerializerFunctionWrapHandler):
+        data = handler(self)
+        for name in ("worker", "project"):
+            if data.get(name) is None:
+                data.pop(name, None)
+        return data
+
+
+class QuoteExpandedRead(_Expandable, QuoteRead):
+    pass
+
+
+class DeliverableExpandedRead(_Expandable, DeliverableRead):
+    pass
@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import SQLModel
+
+from app.models.project import ProjectStatus
+
+
+class ProjectStatusEventRead(SQLModel):
+    from_status: Optional[ProjectStatus]
+    to_status: ProjectStatus
+    worker_id: Optional[int]
+    actor_id: Optional[int]
+    create_at: datetime
+
+
+class DurationStats(SQLModel):
+    count: int = 0
+    # None until there is something to measure
+    mean_seconds: Optional[float] = None
+    p50_seconds: Optional[float] = None
+    p90_seconds: Optional[float] = None
+
+
+class ProjectDurations(SQLModel):
+    projects: int
+    # creation -> first assignment
+    time_to_assign: DurationStats
+    # first assignment -> completion
+    time_to_complete: DurationStats
@@ -4,6 +4,7 @@ from typing import Optional
 from sqlmodel import SQLModel
 
 from app.models.project import ProjectStatus
+from app.schemas.quote import QuoteStatsRead
 
 
 class ProjectBase(SQLModel):
@@ -33,3 +34,5 @@ class ProjectRead(ProjectBase):
     worker_id: Optional[int]
     create_at: datetime
     update_at: datetime
+    # None until the first quote arrives
+    quote_stats: Optional[QuoteStatsRead] = None
@@ -1,4 +1,6 @@
 from datetime import datetime
+from typing import Optional
+
 from sqlmodel import SQLModel
 
 
@@ -7,6 +9,10 @@ class QuoteCreate(SQLModel):
     days: int
 
 
+class QuoteBulkItem(QuoteCreate):
+    project_id: int
+
+
 class QuoteRead(SQLModel):
     id: int
     project_id: int
@@ -15,3 +21,10 @@ class QuoteRead(SQLModel):
     days: int
     create_at: datetime
     update_at: datetime
+
+
+class QuoteStatsRead(SQLModel):
+    quote_count: int
+    min_amount: Optional[float]
+    avg_amount: Optional[float]
+    min_days: Optional[int]
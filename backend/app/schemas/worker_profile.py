@@ -0,0 +1,15 @@
+from typing import Optional
+
+from sqlmodel import SQLModel
+
+
+class WorkerProfileRead(SQLModel):
+    worker_id: int
+    quote_count: int
+    avg_quoted_days: Optional[float]
+    active_count: int
+    completed_count: int
+    rejected_count: int
+    # actual assignment-to-completion time vs. what was quoted
+    avg_completion_days: Optional[float]
+    avg_completion_quoted_days: Optional[float]
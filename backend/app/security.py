@@ -1,33 +1,64 @@
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+from functools import cache
+from typing import TYPE_CHECKING, Any, Optional
 
 import jwt
 from fastapi.security import OAuth2PasswordBearer
-from pwdlib import PasswordHash
 
 from .config import settings
+from .metrics import time_password_hash
+
+if TYPE_CHECKING:
+    from pwdlib import PasswordHash
 
 
 # OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-# 現代化密碼雜湊工具（預設使用 argon2）
-pwd_context = PasswordHash.recommended()  # 使用 argon2id（最安全的現代方案）
-
 
 # -------------------------
 # 密碼處理（pwdlib）
 # -------------------------
 
 
+@cache
+def password_hasher() -> "PasswordHash":
+    """The argon2id password hasher, built on first use.
+
+    Cost parameters come from settings; ``python -m app calibrate-hasher``
+    picks them for this hardware.
+    """
+    # 延後載入 pwdlib / argon2 以縮短冷啟動；serve 會在 fork 前先呼叫一次
+    from pwdlib import PasswordHash
+    from pwdlib.hashers.argon2 import Argon2Hasher
+
+    return PasswordHash(
+        (
+            Argon2Hasher(
+                time_cost=settings.PASSWORD_HASH_TIME_COST,
+                memory_cost=settings.PASSWORD_HASH_MEMORY_KIB,
+                parallelism=settings.PASSWORD_HASH_PARALLELISM,
+            ),
+        )
+    )
+
+
 def hash_password(password: str) -> str:
     """Hash a plain password with argon2id."""
-    return pwd_context.hash(password)
+    with time_password_hash("hash"):
+        return password_hasher().hash(password)
 
 
 def verify_password(password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(password, hashed_password)
+    with time_password_hash("verify"):
+        return password_hasher().verify(password, hashed_password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with other cost parameters than the
+    current settings."""
+    return password_hasher().current_hasher.check_needs_rehash(hashed_password)
 
 
 # -------------------------
@@ -70,3 +101,12 @@ def decode_access_token(token: str) -> Optional[dict[str, Any]]:
         return payload
     except jwt.PyJWTError:
         return None
+
+
+def token_subject(authorization: Optional[str]) -> Optional[str]:
+    """The ``sub`` of the valid bearer token in an Authorization header."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_access_token(token)
+    return payload.get("sub") if payload else None
@@ -0,0 +1,205 @@
+"""SQLite engine for single-node and test deployments.
+
+WAL lets readers run alongside the one writer SQLite allows. Reads run
+in autocommit mode, so like Postgres' READ COMMITTED each statement sees
+the latest commit. The first write of a transaction takes a per-process
+writer lock and then ``BEGIN IMMEDIATE``. The lock is held until commit or
+rollback, so writer threads queue in Python instead of failing with
+``database is locked``. Writers in other processes wait on
+``busy_timeout``.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable, Mapping
+
+from sqlalchemy import Engine, Table, create_engine, event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool, StaticPool
+from sqlalchemy.schema import CreateTable
+
+from app.config import settings
+from app.metrics import SQLITE_WRITE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# statements that never need the write lock
+READ_STATEMENTS = ("SELECT", "WITH", "PRAGMA", "EXPLAIN")
+
+# connection info key: this connection holds the writer lock
+WRITING = "sqlite_writing"
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def create_sqlite_engine(url: str) -> Engine:
+    in_memory = make_url(url).database in (None, "", ":memory:")
+    if in_memory:
+        # one shared connection, or every checkout would see an empty database
+        pool: dict[str, Any] = {"poolclass": StaticPool}
+    else:
+        # connections are cheap and WAL readers do not block each other
+        pool = {
+            "poolclass": QueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+        }
+    engine = create_engine(
+        url,
+        echo=settings.SQL_ECHO,
+        connect_args={"check_same_thread": False},
+        **pool,
+    )
+    _install_listeners(engine, threading.Lock())
+    return engine
+
+
+def _install_listeners(engine: Engine, writer: threading.Lock) -> None:
+    timeout = settings.SQLITE_BUSY_TIMEOUT_SECONDS
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection: sqlite3.Connection, connection_record: Any) -> None:
+        # we issue BEGIN ourselves, and only once a transaction writes
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in (
+            "journal_mode = WAL",
+            f"synchronous = {settings.SQLITE_SYNCHRONOUS}",
+            f"cache_size = -{settings.SQLITE_CACHE_SIZE_MB * 1024}",
+            f"mmap_size = {settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024}",
+            "temp_store = MEMORY",
+            "foreign_keys = ON",
+            f"busy_timeout = {int(timeout * 1000)}",
+        ):
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        if conn.info.get(WRITING) or not conn.in_transaction():
+            return
+        if statement.lstrip()[:7].upper().startswith(READ_STATEMENTS):
+            return
+
+        start = time.perf_counter()
+        if not writer.acquire(timeout=timeout):
+            raise OperationalError(
+                statement, parameters, sqlite3.OperationalError("database is locked")
+            )
+        SQLITE_WRITE_WAIT_SECONDS.observe(time.perf_counter() - start)
+        conn.info[WRITING] = True
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            _release(conn.info)
+            raise
+
+    def _release(info: dict) -> None:
+        if info.pop(WRITING, False):
+            writer.release()
+
+    # SQLAlchemy calls these before the DBAPI commit / rollback, so end the
+    # transaction here first: the next writer must not find it still open
+    @event.listens_for(engine, "commit")
+    def _commit(conn) -> None:
+        if conn.info.get(WRITING):
+            try:
+                conn.connection.dbapi_connection.commit()
+            finally:
+                _release(conn.info)
+
+    @event.listens_for(engine, "rollback")
+    def _rollback(conn) -> None:
+        if conn.info.get(WRITING):
+            try:
+                conn.connection.dbapi_connection.rollback()
+            finally:
+                _release(conn.info)
+
+    # a connection returned or dropped mid-transaction must not keep the lock
+    @event.listens_for(engine, "reset")
+    def _reset(dbapi_connection, connection_record, reset_state) -> None:
+        if connection_record.info.get(WRITING):
+            try:
+                dbapi_connection.rollback()
+            finally:
+                _release(connection_record.info)
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception) -> None:
+        _release(connection_record.info)
+
+
+# ---------------------------------------------------------
+# AUTOINCREMENT for tables created without it
+# ---------------------------------------------------------
+def add_autoincrement(
+    engine: Engine, tables: Iterable[Table], archives: Mapping[str, Table]
+) -> None:
+    """Rebuild the tables declared with ``sqlite_autoincrement`` that an
+    older schema created without it.
+
+    Without AUTOINCREMENT SQLite gives the next row max(id) + 1, so once
+    the row with the largest id is archived its id is handed out again.
+    A rebuilt table's sequence starts past the largest id in its archive.
+    """
+    pending = [
+        table for table in tables if table.dialect_options["sqlite"]["autoincrement"]
+    ]
+    if not pending:
+        return
+
+    with engine.connect() as conn:
+        # the copy replaces the table the other tables' foreign keys point at
+        conn.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        try:
+            for table in pending:
+                sql = conn.exec_driver_sql(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                    (table.name,),
+                ).scalar()
+                if sql is None or "AUTOINCREMENT" in sql.upper():
+                    continue
+
+                # the documented way: create the new table, copy, drop, rename
+                preparer = conn.dialect.identifier_preparer
+                name = preparer.format_table(table)
+                rebuilt = preparer.quote(f"{table.name}_rebuild")
+                ddl = str(CreateTable(table).compile(conn)).strip()
+                conn.exec_driver_sql(
+                    ddl.replace(f"CREATE TABLE {name} ", f"CREATE TABLE {rebuilt} ", 1)
+                )
+                columns = ", ".join(preparer.quote(c.name) for c in table.c)
+                conn.exec_driver_sql(
+                    f"INSERT INTO {rebuilt} ({columns}) SELECT {columns} FROM {name}"
+                )
+                conn.exec_driver_sql(f"DROP TABLE {name}")
+                conn.exec_driver_sql(f"ALTER TABLE {rebuilt} RENAME TO {name}")
+
+                floor = 0
+                if table.name in archives:
+                    floor = (
+                        conn.scalar(select(func.max(archives[table.name].c.id))) or 0
+                    )
+                updated = conn.exec_driver_sql(
+                    "UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?",
+                    (floor, table.name),
+                ).rowcount
+                if not updated:
+                    conn.exec_driver_sql(
+                        "INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)",
+                        (table.name, floor),
+                    )
+                conn.commit()
+                logger.info("rebuilt %s with AUTOINCREMENT", table.name)
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql("PRAGMA foreign_keys = ON")
+            conn.commit()
@@ -0,0 +1,192 @@
+import asyncio
+import fcntl
+import logging
+from datetime import timedelta
+from typing import IO, Any, Callable, Optional
+
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.audit import audit_log
+from app.config import settings
+from app.crud.archive import archive_finished_projects
+from app.crud.change import compact_changes
+from app.database import engine
+from app.idempotency import prune_idempotency_keys
+from app.profiling import aggregate
+from app.replicas import prune_recent_writers
+from app.throttle import login_throttle
+from app.uploads import collect_garbage
+
+logger = logging.getLogger(__name__)
+
+_tasks: list[asyncio.Task[None]] = []
+
+# pg_try_advisory_lock key of the process running the exclusive jobs
+JOBS_LOCK_KEY = 0x68616E64
+
+
+# ---------------------------------------------------------
+# Periodic background jobs (started / stopped in lifespan)
+# ---------------------------------------------------------
+def run_periodically(
+    name: str,
+    interval: float,
+    job: Callable[[], Any],
+    run_first: bool = False,
+    exclusive: bool = False,
+) -> None:
+    """Run the sync ``job`` in the threadpool every ``interval`` seconds,
+    optionally once right away. An ``exclusive`` job is skipped unless this
+    process holds the jobs lock, so pre-fork workers do not all repeat it;
+    another worker takes over when the holder exits."""
+
+    def run() -> None:
+        if not exclusive or jobs_lock.acquire():
+            job()
+
+    async def loop() -> None:
+        if not run_first:
+            await asyncio.sleep(interval)
+        while True:
+            try:
+                await run_in_threadpool(run)
+            except Exception:
+                logger.exception("background job %s failed", name)
+            await asyncio.sleep(interval)
+
+    _tasks.append(asyncio.create_task(loop(), name=name))
+
+
+async def stop_all() -> None:
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    jobs_lock.release()
+
+
+class JobsLock:
+    """Held by at most one process per database, until it exits or calls
+    ``release``: a session advisory lock on a connection of its own on
+    PostgreSQL, an ``flock`` on SQLite (one host anyway)."""
+
+    def __init__(self) -> None:
+        self._conn: Any = None
+        self._file: Optional[IO[str]] = None
+
+    def acquire(self) -> bool:
+        """Whether this process holds the lock, trying to take it if not."""
+        if engine.dialect.name == "postgresql":
+            return self._advisory_lock()
+        return self._lock_file()
+
+    def release(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _advisory_lock(self) -> bool:
+        import psycopg2
+
+        if self._conn is not None:
+            try:
+                with self._conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                return True
+            except psycopg2.Error:
+                # the connection and the lock with it are gone
+                self.release()
+
+        # not from the pool: it stays checked out for the process' lifetime
+        dsn = engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        conn = psycopg2.connect(dsn)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (JOBS_LOCK_KEY,))
+            [held] = cur.fetchone()
+        if held:
+            self._conn = conn
+        else:
+            conn.close()
+        return held
+
+    def _lock_file(self) -> bool:
+        if self._file is not None:
+            return True
+        path = settings.JOBS_LOCK_FILE
+        if not path:
+            database = engine.url.database
+            if not database or database == ":memory:":
+                # private to this process
+                return True
+            path = f"{database}.jobs.lock"
+
+        file = open(path, "a")
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            file.close()
+            return False
+        self._file = file
+        return True
+
+
+jobs_lock = JobsLock()
+
+
+# ---------------------------------------------------------
+# Jobs
+# ---------------------------------------------------------
+def compact_change_log() -> None:
+    with Session(engine) as session:
+        removed = compact_changes(session, settings.CHANGES_SETTLE_SECONDS)
+    if removed:
+        logger.info("compacted %d change log entries", removed)
+
+
+def archive_projects() -> None:
+    """Move finished projects to the archive, one batch per transaction,
+    until none are left."""
+    moved = 0
+    while True:
+        with Session(engine) as session:
+            batch = archive_finished_projects(
+                session,
+                timedelta(days=settings.ARCHIVE_AFTER_DAYS),
+                settings.ARCHIVE_BATCH_SIZE,
+            )
+        if not batch:
+            break
+        moved += batch
+    if moved:
+        logger.info("archived %d finished projects", moved)
+
+
+def flush_audit_log() -> None:
+    audit_log.flush()
+
+
+def prune_read_your_writes() -> None:
+    prune_recent_writers(engine)
+
+
+def prune_login_throttle() -> None:
+    login_throttle.prune()
+
+
+def prune_idempotency() -> None:
+    prune_idempotency_keys()
+
+
+def collect_upload_garbage() -> None:
+    collect_garbage(settings.UPLOAD_GC_GRACE_SECONDS, settings.UPLOAD_GC_BATCH_SIZE)
+
+
+def write_profile_report() -> None:
+    aggregate.flush()
@@ -0,0 +1,265 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from sqlalchemy import JSON, Column, Float, String, Table, bindparam, delete, select
+from sqlmodel import Session, SQLModel
+
+from app.config import settings
+from app.database import dialect_insert, engine
+from app.metrics import LOGIN_THROTTLED
+
+# shared throttle state, used with LOGIN_THROTTLE_BACKEND=database
+login_throttle_table = Table(
+    "login_throttle",
+    SQLModel.metadata,
+    Column("key", String, primary_key=True),
+    Column("state", JSON, nullable=False),
+    Column("expires_at", Float, nullable=False, index=True),
+)
+
+
+class LoginThrottled(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float  # attempts per second, refilling the bucket
+    burst: int  # bucket size
+    max_failures: int  # within LOGIN_FAILURE_WINDOW_SECONDS, then locked out
+
+
+# ---------------------------------------------------------
+# State stores
+# ---------------------------------------------------------
+class MemoryStore:
+    """Throttle state of this process only, oldest keys evicted first."""
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._states: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self, keys: list[str]) -> Iterator[dict[str, dict]]:
+        """The states of ``keys``, written back when the block ends."""
+        with self._lock:
+            states = {key: dict(self._states.get(key, {})) for key in keys}
+            yield states
+            for key, state in states.items():
+                self._states[key] = state
+                self._states.move_to_end(key)
+            while len(self._states) > self.max_keys:
+                self._states.popitem(last=False)
+
+    def prune(self, now: float) -> int:
+        with self._lock:
+            expired = [
+                k for k, s in self._states.items() if s.get("expires_at", 0.0) <= now
+            ]
+            for key in expired:
+                del self._states[key]
+        return len(expired)
+
+
+class DatabaseStore:
+    """Throttle state in the ``login_throttle`` table, so the limits hold
+    across worker processes. One short transaction per call; the rows are
+    locked in key order, so concurrent logins cannot deadlock."""
+
+    @contextmanager
+    def locked(self, keys: list[str]) -> Iterator[dict[str, dict]]:
+        table = login_throttle_table
+        keys = sorted(keys)
+        with Session(engine) as session:
+            insert = dialect_insert(session)
+            session.execute(
+                insert(table)
+                .values([{"key": k, "state": {}, "expires_at": 0.0} for k in keys])
+                .on_conflict_do_nothing()
+            )
+            rows = session.execute(
+                select(table.c.key, table.c.state)
+                .where(table.c.key.in_(keys))
+                .order_by(table.c.key)
+                .with_for_update()
+            )
+            states = {key: dict(state) for key, state in rows}
+            yield states
+            session.execute(
+                table.update()
+                .where(table.c.key == bindparam("b_key"))
+                .values(state=bindparam("b_state"), expires_at=bindparam("b_expires")),
+                [
+                    {"b_key": k, "b_state": s, "b_expires": s.get("expires_at", 0.0)}
+                    for k, s in states.items()
+                ],
+            )
+            session.commit()
+
+    def prune(self, now: float) -> int:
+        table = login_throttle_table
+        with Session(engine) as session:
+            result = session.execute(delete(table).where(table.c.expires_at <= now))
+            session.commit()
+        return result.rowcount  # type: ignore[attr-defined]
+
+
+# ---------------------------------------------------------
+# Token buckets and failure windows
+# ---------------------------------------------------------
+def _tokens(state: dict, now: float, limit: Limit) -> float:
+    elapsed = now - state.get("at", now)
+    return min(limit.burst, state.get("tokens", limit.burst) + elapsed * limit.rate)
+
+
+def _recent_failures(state: dict, now: float) -> list[float]:
+    window_start = now - settings.LOGIN_FAILURE_WINDOW_SECONDS
+    return [t for t in state.get("failures", []) if t > window_start]
+
+
+class LoginThrottle:
+    """Decide whether a login attempt may reach the password hasher.
+
+    Every attempt takes a token from the bucket of its username and of its
+    client address; failures inside a sliding window lock either out for
+    ``LOGIN_LOCKOUT_SECONDS``. All of it is checked before any hashing.
+    """
+
+    def __init__(self, store: MemoryStore | DatabaseStore) -> None:
+        self.store = store
+        self.limits = {
+            "user": Limit(
+                settings.LOGIN_USER_RATE_PER_MINUTE / 60,
+                settings.LOGIN_USER_BURST,
+                settings.LOGIN_USER_MAX_FAILURES,
+            ),
+            "client": Limit(
+                settings.LOGIN_CLIENT_RATE_PER_MINUTE / 60,
+                settings.LOGIN_CLIENT_BURST,
+                settings.LOGIN_CLIENT_MAX_FAILURES,
+            ),
+        }
+        # long enough to forget nothing that still matters
+        self.ttl = max(
+            settings.LOGIN_FAILURE_WINDOW_SECONDS,
+            settings.LOGIN_LOCKOUT_SECONDS,
+            *(limit.burst / limit.rate for limit in self.limits.values()),
+        )
+
+    def check(self, username: str, client: str) -> None:
+        """Take a token for this attempt, or raise ``LoginThrottled``."""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        now = time.time()
+        keys = {"user": f"user:{username}", "client": f"client:{client}"}
+        with self.store.locked(list(keys.values())) as states:
+            denied = self._denied(states, keys, now)
+            if denied is None:
+                for kind, key in keys.items():
+                    state = states[key]
+                    state["tokens"] = _tokens(state, now, self.limits[kind]) - 1
+                    state["at"] = now
+                    state["expires_at"] = now + self.ttl
+
+        if denied is not None:
+            LOGIN_THROTTLED.labels(denied.reason).inc()
+            raise denied
+
+    def _denied(
+        self, states: dict[str, dict], keys: dict[str, str], now: float
+    ) -> Optional[LoginThrottled]:
+        for kind, key in keys.items():
+            locked_until = states[key].get("locked_until", 0.0)
+            if locked_until > now:
+                return LoginThrottled(f"{kind}_locked", locked_until - now)
+        for kind, key in keys.items():
+            limit = self.limits[kind]
+            tokens = _tokens(states[key], now, limit)
+            if tokens < 1:
+                return LoginThrottled(f"{kind}_rate", (1 - tokens) / limit.rate)
+        return None
+
+    def failed(self, username: str, client: str) -> None:
+        """Count a wrong password or unknown username."""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        now = time.time()
+        keys = {"user": f"user:{username}", "client": f"client:{client}"}
+        with self.store.locked(list(keys.values())) as states:
+            for kind, key in keys.items():
+                state = states[key]
+                failures = _recent_failures(state, now) + [now]
+                if len(failures) >= self.limits[kind].max_failures:
+                    state["locked_until"] = now + settings.LOGIN_LOCKOUT_SECONDS
+                    failures = []
+                state["failures"] = failures
+                state["expires_at"] = now + self.ttl
+
+    def succeeded(self, username: str) -> None:
+        """Forget the username's failures; the client's stay counted."""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        with self.store.locked([f"user:{username}"]) as states:
+            for state in states.values():
+                state.pop("failures", None)
+                state.setdefault("expires_at", time.time() + self.ttl)
+
+    def prune(self) -> int:
+        return self.store.prune(time.time())
+
+
+# ---------------------------------------------------------
+# Negative cache of unknown usernames
+# ---------------------------------------------------------
+class UnknownUsernames:
+    """Usernames recently looked up and not found, so repeated attempts
+    with them skip the database as well.
+
+    Per process: registering a name forgets it here at once, in the other
+    workers after ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._expiry: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, username: str) -> bool:
+        with self._lock:
+            expires_at = self._expiry.get(username)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._expiry[username]
+                return False
+            return True
+
+    def add(self, username: str) -> None:
+        with self._lock:
+            self._expiry[username] = time.monotonic() + self.ttl
+            self._expiry.move_to_end(username)
+            while len(self._expiry) > self.max_size:
+                self._expiry.popitem(last=False)
+
+    def discard(self, username: str) -> None:
+        with self._lock:
+            self._expiry.pop(username, None)
+
+
+login_throttle = LoginThrottle(
+    DatabaseStore()
+    if settings.LOGIN_THROTTLE_BACKEND == "database"
+    else MemoryStore(settings.LOGIN_THROTTLE_MAX_KEYS)
+)
+unknown_usernames = UnknownUsernames(
+    settings.LOGIN_UNKNOWN_USER_TTL_SECONDS, settings.LOGIN_UNKNOWN_USER_CACHE_SIZE
+)
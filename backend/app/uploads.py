@@ -0,0 +1,96 @@
+import logging
+import os
+import time
+from dataclasses import dataclass
+from itertools import batched
+
+from sqlmodel import Session
+
+from app.crud.upload import referenced_files
+from app.database import engine
+from app.metrics import UPLOAD_GC_REMOVED_BYTES, UPLOAD_GC_REMOVED_FILES
+
+logger = logging.getLogger(__name__)
+
+# relative to the working directory; deliverables store paths below it
+UPLOAD_ROOT = "uploads"
+
+
+def upload_dir(project_id: int) -> str:
+    return os.path.join(UPLOAD_ROOT, str(project_id))
+
+
+@dataclass
+class GarbageReport:
+    scanned: int = 0
+    removed: int = 0
+    removed_bytes: int = 0
+
+
+# ---------------------------------------------------------
+# Orphaned upload collection
+# ---------------------------------------------------------
+def collect_garbage(
+    grace_seconds: float, batch_size: int, dry_run: bool = False
+) -> GarbageReport:
+    """Remove uploaded files that no deliverable points to.
+
+    The tree is streamed with ``os.scandir`` and checked one batch of
+    entries per query, so neither a huge directory nor the deliverables
+    table is ever held in memory. Files younger than ``grace_seconds`` are
+    kept: their upload may not have committed its deliverable yet.
+    """
+    report = GarbageReport()
+    if not os.path.isdir(UPLOAD_ROOT):
+        return report
+
+    cutoff = time.time() - grace_seconds
+    with os.scandir(UPLOAD_ROOT) as project_dirs:
+        for project_dir in project_dirs:
+            if project_dir.is_dir(follow_symlinks=False):
+                _collect_dir(project_dir.path, cutoff, batch_size, dry_run, report)
+
+    if report.removed:
+        logger.info(
+            "%s %d orphaned uploads (%d bytes) of %d files",
+            "would remove" if dry_run else "removed",
+            report.removed,
+            report.removed_bytes,
+            report.scanned,
+        )
+    return report
+
+
+def _collect_dir(
+    path: str, cutoff: float, batch_size: int, dry_run: bool, report: GarbageReport
+) -> None:
+    with os.scandir(path) as entries:
+        for batch in batched(entries, batch_size):
+            files = {e.path: e for e in batch if e.is_file(follow_symlinks=False)}
+            report.scanned += len(files)
+            with Session(engine) as session:
+                referenced = referenced_files(session, files)
+
+            for file_path, entry in files.items():
+                if file_path in referenced:
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime > cutoff:
+                    continue
+                if not dry_run:
+                    try:
+                        os.remove(file_path)
+                    except FileNotFoundError:
+                        continue
+                    UPLOAD_GC_REMOVED_FILES.inc()
+                    UPLOAD_GC_REMOVED_BYTES.inc(stat.st_size)
+                report.removed += 1
+                report.removed_bytes += stat.st_size
+
+    # an emptied directory goes one run later, once its mtime is old too,
+    # so an upload that just created it is not pulled from under it
+    if not dry_run and os.stat(path).st_mtime <= cutoff:
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
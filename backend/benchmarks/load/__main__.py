@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from benchmarks.load import __doc__ as usage
+from benchmarks.load.report import compare, load, print_table, save, summarize
+
+
+def absolute_sqlite_url(url: str) -> str:
+    """Pin a relative SQLite path before we chdir into the work dir."""
+    prefix = "sqlite:///"
+    if url.startswith(prefix) and not url.startswith(prefix + "/"):
+        return prefix + os.path.abspath(url[len(prefix) :])
+    return url
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=usage.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=usage,
+    )
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=100_000)
+    parser.add_argument("--quotes-per-project", type=int, default=3)
+    parser.add_argument("--reseed", action="store_true", help="drop and seed again")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--upload-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="uploads go here (default: a temp dir)")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument(
+        "--log-queries", action="store_true", help="keep slow-query / N+1 warnings"
+    )
+    args = parser.parse_args()
+
+    # settings are read at import time, so the app is imported only now
+    if args.database_url:
+        os.environ["DATABASE_URL"] = absolute_sqlite_url(args.database_url)
+    out = os.path.abspath(args.out) if args.out else None
+    baseline = load(args.baseline) if args.baseline else None
+    os.chdir(args.workdir or tempfile.mkdtemp(prefix="handshake-bench-"))
+    # every virtual user logs in from the same address
+    os.environ.setdefault("LOGIN_THROTTLE_ENABLED", "false")
+
+    from app.database import engine, init_db
+    from app.main import app
+    from benchmarks.load import seed, workload
+
+    if not args.log_queries:
+        logging.getLogger("app.querylog").setLevel(logging.ERROR)
+
+    init_db()
+    if args.reseed or not seed.is_seeded(engine, args.projects):
+        print(f"seeding {engine.url.render_as_string()} ...")
+        seed.reset(engine)
+        counts = seed.seed(
+            engine,
+            args.users,
+            args.projects,
+            args.quotes_per_project,
+            random.Random(args.seed),
+        )
+        print("seeded " + ", ".join(f"{n} {table}" for table, n in counts.items()))
+
+    recorder, queries, elapsed = asyncio.run(
+        workload.run(app, args.concurrency, args.duration, args.upload_bytes, args.seed)
+    )
+
+    result = summarize(
+        recorder,
+        elapsed,
+        queries,
+        meta={
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "projects": args.projects,
+            "users": args.users,
+        },
+    )
+    print_table(result, baseline)
+    if out:
+        save(result, out)
+        print(f"results written to {out}")
+
+    if baseline:
+        regressions = compare(result, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import json
+import statistics
+from collections import defaultdict
+from typing import Any
+
+
+class Recorder:
+    """Client-side latencies and status codes per endpoint."""
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.shed: dict[str, int] = defaultdict(int)
+
+    def add(self, endpoint: str, seconds: float, status: int) -> None:
+        self.latencies[endpoint].append(seconds)
+        if status == 503:
+            self.shed[endpoint] += 1
+        elif status >= 400:
+            self.errors[endpoint] += 1
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    if len(samples) < 2:
+        value = samples[0] * 1000 if samples else 0.0
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+    }
+
+
+def summarize(
+    recorder: Recorder,
+    elapsed: float,
+    queries: dict[str, float],
+    meta: dict[str, Any],
+) -> dict[str, Any]:
+    """Build the JSON document stored for a run.
+
+    ``queries`` maps endpoint -> total database queries observed by the
+    server while the run was measured.
+    """
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.latencies.items()):
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "errors": recorder.errors[endpoint],
+            "shed": recorder.shed[endpoint],
+            "rps": round(len(samples) / elapsed, 2),
+            **percentiles(samples),
+            "queries_per_request": round(queries.get(endpoint, 0.0) / len(samples), 2),
+        }
+
+    everything = [s for samples in recorder.latencies.values() for s in samples]
+    return {
+        "meta": {**meta, "elapsed_s": round(elapsed, 2)},
+        "total": {
+            "requests": len(everything),
+            "errors": sum(recorder.errors.values()),
+            "shed": sum(recorder.shed.values()),
+            "rps": round(len(everything) / elapsed, 2),
+            **percentiles(everything),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Endpoints whose p95 latency or throughput regressed by more than
+    ``tolerance`` (a fraction) against ``baseline``."""
+    regressions = []
+    for endpoint, now in current["endpoints"].items():
+        before = baseline["endpoints"].get(endpoint)
+        if before is None:
+            continue
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{endpoint}: p95 {before['p95_ms']:.1f} -> {now['p95_ms']:.1f} ms"
+            )
+        if now["queries_per_request"] > before["queries_per_request"]:
+            regressions.append(
+                f"{endpoint}: queries/request {before['queries_per_request']}"
+                f" -> {now['queries_per_request']}"
+            )
+
+    if current["total"]["rps"] < baseline["total"]["rps"] * (1 - tolerance):
+        regressions.append(
+            f"total: {baseline['total']['rps']:.1f} -> {current['total']['rps']:.1f} rps"
+        )
+    return regressions
+
+
+def print_table(result: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    previous = baseline["endpoints"] if baseline else {}
+    print(
+        f"{'endpoint':<48} {'reqs':>6} {'err':>4} {'shed':>5} {'rps':>8} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6} {'Δp95':>7}"
+    )
+    for endpoint, row in result["endpoints"].items():
+        before = previous.get(endpoint)
+        delta = (
+            f"{(row['p95_ms'] / before['p95_ms'] - 1) * 100:+.0f}%"
+            if before and before["p95_ms"]
+            else ""
+        )
+        print(
+            f"{endpoint:<48} {row['requests']:>6} {row['errors']:>4} {row['shed']:>5} "
+            f"{row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['queries_per_request']:>6.1f} {delta:>7}"
+        )
+    total = result["total"]
+    print(
+        f"{'total':<48} {total['requests']:>6} {total['errors']:>4} {total['shed']:>5} "
+        f"{total['rps']:>8.1f} {total['p50_ms']:>8.1f} {total['p95_ms']:>8.1f} "
+        f"{total['p99_ms']:>8.1f}"
+    )
+
+
+def load(path: str) -> dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(result: dict[str, Any], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+        f.write("\n")
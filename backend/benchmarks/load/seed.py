@@ -0,0 +1,157 @@
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import Engine, func, insert
+from sqlmodel import Session, SQLModel, select
+
+from app.crud.quote import rebuild_quote_stats
+from app.crud.worker_profile import rebuild_worker_profiles
+from app.database import init_db
+from app.models.deliverable import Deliverable
+from app.models.project import Project, ProjectStatus
+from app.models.quote import Quote
+from app.models.user import User, UserRole
+from app.security import hash_password
+from benchmarks.recommend import synthetic_texts
+
+PASSWORD = "bench-password"
+SEED_FILE = "uploads/seed/spec.bin"
+
+# share of seeded projects in each status
+STATUS_WEIGHTS = {
+    ProjectStatus.OPEN: 0.1,
+    ProjectStatus.IN_PROGRESS: 0.2,
+    ProjectStatus.COMPLETED: 0.6,
+    ProjectStatus.REJECTED: 0.1,
+}
+CHUNK = 5000
+
+
+def _insert(
+    session: Session, model: type[SQLModel], rows: list[dict[str, Any]]
+) -> None:
+    for i in range(0, len(rows), CHUNK):
+        session.execute(insert(model), rows[i : i + CHUNK])
+
+
+def is_seeded(engine: Engine, projects: int) -> bool:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(Project)).one() >= projects
+
+
+def reset(engine: Engine) -> None:
+    SQLModel.metadata.drop_all(engine)
+    init_db()
+
+
+def seed(
+    engine: Engine,
+    users: int,
+    projects: int,
+    quotes_per_project: int,
+    rng: random.Random,
+) -> dict[str, int]:
+    """Bulk-load a fresh database; returns row counts per table."""
+    os.makedirs(os.path.dirname(SEED_FILE), exist_ok=True)
+    with open(SEED_FILE, "wb") as f:
+        f.write(rng.randbytes(64 * 1024))
+
+    # one hash for every seeded user: argon2 would dominate seeding otherwise
+    password = hash_password(PASSWORD)
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    counts: dict[str, int] = {}
+
+    with Session(engine) as session:
+        _insert(
+            session,
+            User,
+            [
+                {
+                    "username": f"seed-{role.value}-{i}",
+                    "password": password,
+                    "role": role,
+                    "create_at": start,
+                    "update_at": start,
+                }
+                for role in UserRole
+                for i in range(users // 2)
+            ],
+        )
+        clients = session.exec(
+            select(User.id).where(User.role == UserRole.CLIENT)
+        ).all()
+        workers = session.exec(
+            select(User.id).where(User.role == UserRole.WORKER)
+        ).all()
+        counts["users"] = len(clients) + len(workers)
+
+        statuses = rng.choices(
+            list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values()), k=projects
+        )
+        project_rows = []
+        quote_rows = []
+        for status, text in zip(
+            statuses, synthetic_texts(projects, 20_000, rng.randrange(2**32))
+        ):
+            created = start + timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+            quoters = rng.sample(
+                workers, min(len(workers), rng.randint(0, 2 * quotes_per_project))
+            )
+            if status != ProjectStatus.OPEN and not quoters:
+                quoters = [rng.choice(workers)]
+            project_rows.append(
+                {
+                    "title": " ".join(text.split()[:6]),
+                    "description": text,
+                    "client_id": rng.choice(clients),
+                    "worker_id": None if status == ProjectStatus.OPEN else quoters[0],
+                    "status": status,
+                    "create_at": created,
+                    "update_at": created,
+                }
+            )
+            quote_rows.append(
+                [
+                    {
+                        "worker_id": worker_id,
+                        "amount": round(rng.uniform(100, 50_000), 2),
+                        "days": rng.randint(1, 90),
+                        "create_at": created,
+                        "update_at": created,
+                    }
+                    for worker_id in quoters
+                ]
+            )
+
+        _insert(session, Project, project_rows)
+        project_ids = session.exec(select(Project.id).order_by(Project.id)).all()  # type: ignore[arg-type]
+        counts["projects"] = len(project_ids)
+
+        flat_quotes = []
+        deliverable_rows = []
+        for project_id, row, quotes in zip(project_ids, project_rows, quote_rows):
+            for quote in quotes:
+                quote["project_id"] = project_id
+                flat_quotes.append(quote)
+            if row["status"] in (ProjectStatus.IN_PROGRESS, ProjectStatus.COMPLETED):
+                deliverable_rows.append(
+                    {
+                        "project_id": project_id,
+                        "worker_id": row["worker_id"],
+                        "file_url": SEED_FILE,
+                        "create_at": row["create_at"],
+                        "update_at": row["update_at"],
+                    }
+                )
+        _insert(session, Quote, flat_quotes)
+        _insert(session, Deliverable, deliverable_rows)
+        counts["quotes"] = len(flat_quotes)
+        counts["deliverables"] = len(deliverable_rows)
+        session.commit()
+
+        rebuild_quote_stats(session)
+        rebuild_worker_profiles(session)
+
+    return counts
@@ -0,0 +1,209 @@
+import asyncio
+import random
+import time
+from typing import Any, Optional
+
+import httpx
+from prometheus_client import REGISTRY
+
+from app.recommend import recommender
+from benchmarks.load.report import Recorder
+
+# endpoint names are "METHOD route-template", matching the server metrics
+ROUTES = {
+    "register": ("POST", "/auth/register"),
+    "login": ("POST", "/auth/login/json"),
+    "browse": ("GET", "/projects/open"),
+    "recommended": ("GET", "/projects/recommended"),
+    "create_project": ("POST", "/projects/"),
+    "quote": ("POST", "/quotes/projects/{project_id}"),
+    "list_quotes": ("GET", "/quotes/projects/{project_id}"),
+    "top_quotes": ("GET", "/quotes/projects/{project_id}/top"),
+    "assign": ("PATCH", "/projects/{project_id}/assign"),
+    "upload": ("POST", "/deliverables/projects/{project_id}/upload"),
+    "list_deliverables": ("GET", "/deliverables/projects/{project_id}"),
+    "download": ("GET", "/deliverables/{deliverable_id}/download"),
+    "complete": ("POST", "/projects/{project_id}/complete"),
+    "my_quotes": ("GET", "/quotes/me"),
+    "profile": ("GET", "/workers/{worker_id}/profile"),
+}
+
+
+class StepFailed(Exception):
+    pass
+
+
+class VirtualUser:
+    """A client and a worker account taking projects from creation to
+    completion, with the worker browsing and quoting along the way."""
+
+    def __init__(
+        self,
+        http: httpx.AsyncClient,
+        recorder: Recorder,
+        name: str,
+        upload_bytes: int,
+        rng: random.Random,
+    ) -> None:
+        self.http = http
+        self.recorder = recorder
+        self.name = name
+        self.upload = rng.randbytes(upload_bytes)
+        self.rng = rng
+        self.client: dict[str, str] = {}
+        self.worker: dict[str, str] = {}
+        self.worker_id = 0
+
+    async def call(
+        self,
+        step: str,
+        auth: Optional[dict[str, str]] = None,
+        expect: int = 200,
+        path: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        method, template = ROUTES[step]
+        url = template.format(**path) if path else template
+
+        while True:
+            start = time.perf_counter()
+            response = await self.http.request(method, url, headers=auth, **kwargs)
+            self.recorder.add(
+                f"{method} {template}",
+                time.perf_counter() - start,
+                response.status_code,
+            )
+            if response.status_code != 503:
+                break
+            # shed by admission control: back off like a real client
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+
+        if response.status_code != expect:
+            raise StepFailed(f"{step}: {response.status_code} {response.text[:200]}")
+        return response
+
+    async def sign_up(self) -> None:
+        for role, attr in (("client", "client"), ("worker", "worker")):
+            username = f"{self.name}-{role}"
+            user = await self.call(
+                "register",
+                json={"username": username, "password": "pw", "role": role},
+            )
+            token = await self.call(
+                "login", json={"username": username, "password": "pw"}
+            )
+            setattr(
+                self, attr, {"Authorization": f"Bearer {token.json()['access_token']}"}
+            )
+            if role == "worker":
+                self.worker_id = user.json()["id"]
+
+    async def iteration(self) -> None:
+        client, worker = self.client, self.worker
+
+        open_projects = (await self.call("browse", worker)).json()
+        await self.call("recommended", worker)
+        if open_projects:
+            other = self.rng.choice(open_projects)["id"]
+            await self.call(
+                "quote",
+                worker,
+                expect=201,
+                path={"project_id": other},
+                json={
+                    "amount": self.rng.uniform(100, 5000),
+                    "days": self.rng.randint(1, 30),
+                },
+            )
+
+        project = (
+            await self.call(
+                "create_project",
+                client,
+                json={"title": f"{self.name} job", "description": "benchmark project"},
+            )
+        ).json()
+        ids = {"project_id": project["id"]}
+
+        await self.call(
+            "quote", worker, expect=201, path=ids, json={"amount": 1000, "days": 7}
+        )
+        await self.call("list_quotes", client, path=ids)
+        await self.call("top_quotes", client, path=ids)
+        await self.call(
+            "assign",
+            client,
+            path=ids,
+            params={"worker_id": self.worker_id},
+        )
+
+        deliverable = (
+            await self.call(
+                "upload",
+                worker,
+                expect=201,
+                path=ids,
+                files={"file": ("work.bin", self.upload)},
+            )
+        ).json()
+        await self.call("list_deliverables", client, path=ids)
+        await self.call("download", client, path={"deliverable_id": deliverable["id"]})
+        await self.call("complete", client, path=ids)
+
+        await self.call("my_quotes", worker)
+        await self.call("profile", client, path={"worker_id": self.worker_id})
+
+    async def run(self, deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            try:
+                await self.iteration()
+            except StepFailed as exc:
+                print(f"{self.name}: {exc}")
+                await asyncio.sleep(0.1)
+
+
+def server_query_totals() -> dict[str, float]:
+    """Queries per endpoint so far, from the app's own metrics."""
+    totals = {}
+    for method, template in ROUTES.values():
+        value = REGISTRY.get_sample_value(
+            "http_request_db_queries_sum", {"method": method, "route": template}
+        )
+        totals[f"{method} {template}"] = value or 0.0
+    return totals
+
+
+async def run(
+    app: Any, concurrency: int, duration: float, upload_bytes: int, seed: int
+) -> tuple[Recorder, dict[str, float], float]:
+    """Run the workload; returns the recorder, server-side query counts
+    for the measured window and its length in seconds."""
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    run_id = f"bench-{int(time.time())}"
+
+    async with (
+        app.router.lifespan_context(app),
+        httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as http,
+    ):
+        while not recommender.ready:
+            await asyncio.sleep(0.1)
+
+        users = [
+            VirtualUser(
+                http, recorder, f"{run_id}-{i}", upload_bytes, random.Random(seed + i)
+            )
+            for i in range(concurrency)
+        ]
+
+        before = server_query_totals()
+        start = time.perf_counter()
+        await asyncio.gather(*(user.sign_up() for user in users))
+        await asyncio.gather(*(user.run(start + duration) for user in users))
+        elapsed = time.perf_counter() - start
+        after = server_query_totals()
+
+    queries = {endpoint: after[endpoint] - before[endpoint] for endpoint in after}
+    return recorder, queries, elapsed
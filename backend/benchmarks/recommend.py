@@ -0,0 +1,83 @@
+"""Benchmark the open-project recommendation index.
+
+    uv run python -m benchmarks.recommend --projects 100000
+
+Builds a ``ProjectIndex`` over synthetic projects with a Zipf-like
+vocabulary and times top-k searches against a brute-force scan.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from app.recommend import ProjectIndex, term_vector, top_terms
+
+
+def synthetic_texts(n: int, vocab_size: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocab_size)]
+    weights = [1 / (rank + 1) for rank in range(vocab_size)]
+    return [
+        " ".join(rng.choices(vocab, weights, k=rng.randint(8, 40)))
+        for _ in range(n)
+    ]
+
+
+def percentile(samples: list[float], p: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(p) - 1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--projects", type=int, default=100_000)
+    parser.add_argument("--vocab", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--terms", type=int, default=32)
+    parser.add_argument("--champions", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.projects, args.vocab, args.seed)
+    index = ProjectIndex(args.champions)
+
+    start = time.perf_counter()
+    for project_id, text in enumerate(texts):
+        index.add(project_id, text)
+    build = time.perf_counter() - start
+    print(f"build: {args.projects} projects in {build:.2f}s")
+
+    # a worker's history: a few random projects
+    rng = random.Random(args.seed + 1)
+    queries = [
+        top_terms(term_vector(rng.sample(texts, 5)), args.terms)
+        for _ in range(args.queries)
+    ]
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, args.k, exclude=set())
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(
+        f"search: p50={percentile(timings, 50):.2f}ms "
+        f"p95={percentile(timings, 95):.2f}ms "
+        f"p99={percentile(timings, 99):.2f}ms"
+    )
+
+    # reference: score every open project
+    vectors = [term_vector([text]) for text in texts[:10_000]]
+    start = time.perf_counter()
+    for query in queries[:10]:
+        sorted(
+            (sum(w * v.get(t, 0.0) for t, w in query.items()), i)
+            for i, v in enumerate(vectors)
+        )[-args.k :]
+    scan = (time.perf_counter() - start) / 10 * 1000 * args.projects / len(vectors)
+    print(f"full scan (extrapolated): {scan:.2f}ms per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Fake a lagging read replica with two SQLite files.
+
+    uv run python -m benchmarks.replica_lag /tmp/primary.db /tmp/replica.db --lag 2
+
+Copies the primary into the replica every ``--lag`` seconds, so reads from
+the replica trail the primary by up to that much. Run the API against both:
+
+    DATABASE_URL=sqlite:////tmp/primary.db \\
+    DATABASE_REPLICA_URLS='["sqlite:////tmp/replica.db"]' \\
+    uv run python -m app serve --workers 1
+"""
+
+import argparse
+import sqlite3
+import time
+
+
+def copy(primary: str, replica: str) -> None:
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("primary")
+    parser.add_argument("replica")
+    parser.add_argument("--lag", type=float, default=2.0, help="seconds")
+    args = parser.parse_args()
+
+    while True:
+        copy(args.primary, args.replica)
+        time.sleep(args.lag)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
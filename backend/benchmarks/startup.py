@@ -0,0 +1,112 @@
+"""Benchmark cold-start time.
+
+    uv run python -m benchmarks.startup --database-url sqlite:////tmp/startup.db
+
+Measures, each in fresh processes: importing ``app.main``, ``init_db`` on an
+empty and on an up-to-date database, and the time from launching
+``python -m app serve`` until the first request is answered.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+INIT_DB = (
+    "import time; import app.main; from app.database import init_db; "
+    "start = time.perf_counter(); init_db(); print(time.perf_counter() - start)"
+)
+IMPORT = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - start)"
+)
+DROP = (
+    "import app.main; from sqlmodel import SQLModel; "
+    "from app.database import engine; SQLModel.metadata.drop_all(engine)"
+)
+
+
+def python(code: str, env: dict[str, str]) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, check=True, capture_output=True
+    )
+    return float(out.stdout.decode().strip() or 0)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_response(env: dict[str, str], workers: int, preload: bool) -> float:
+    port = free_port()
+    command = [sys.executable, "-m", "app", "serve", "--host", "127.0.0.1"]
+    command += ["--port", str(port), "--workers", str(workers), "--log-level", "error"]
+    if not preload:
+        command.append("--no-preload")
+
+    start = time.perf_counter()
+    server = subprocess.Popen(command, env=env)
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                    return time.perf_counter() - start
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("server exited during startup")
+                time.sleep(0.01)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(30)
+
+
+def median(fn, repeat: int) -> float:
+    return round(statistics.median(fn() for _ in range(repeat)), 4)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+
+    def cold_init_db() -> float:
+        python(DROP, env)
+        return python(INIT_DB, env)
+
+    results = {
+        "import_app_s": median(lambda: python(IMPORT, env), args.repeat),
+        "init_db_empty_s": median(cold_init_db, args.repeat),
+        "init_db_current_s": median(lambda: python(INIT_DB, env), args.repeat),
+        "first_response_preload_s": median(
+            lambda: time_to_first_response(env, args.workers, True), args.repeat
+        ),
+        "first_response_no_preload_s": median(
+            lambda: time_to_first_response(env, args.workers, False), args.repeat
+        ),
+    }
+    for name, seconds in results.items():
+        print(f"{name:<30} {seconds * 1000:9.1f} ms")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
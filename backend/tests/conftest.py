@@ -0,0 +1,65 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+# settings are read once, at import: configure before importing the app
+_tmp = tempfile.mkdtemp(prefix="handshake-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_tmp, 'test.db')}",
+    QUERY_BUDGETS_ENFORCE="true",
+    LOGIN_THROTTLE_ENABLED="false",
+    # cheap hashes; tests log in a lot
+    PASSWORD_HASH_TIME_COST="1",
+    PASSWORD_HASH_MEMORY_KIB="1024",
+    PASSWORD_HASH_PARALLELISM="1",
+)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch) -> Iterator[TestClient]:
+    """The app on an empty database, with uploads under ``tmp_path``."""
+    monkeypatch.chdir(tmp_path)
+    SQLModel.metadata.drop_all(engine)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def register(client):
+    """Create a user and return the headers to act as them."""
+
+    def register(username: str, role: str) -> dict[str, str]:
+        client.post(
+            "/auth/register",
+            json={"username": username, "password": "pw", "role": role},
+        )
+        response = client.post(
+            "/auth/login/json", json={"username": username, "password": "pw"}
+        )
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return register
+
+
+@contextmanager
+def count_queries() -> Iterator[list[str]]:
+    """Statements sent to the database inside the block."""
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
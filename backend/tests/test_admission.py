@@ -0,0 +1,23 @@
+import asyncio
+
+from app import admission
+from app.admission import Gate
+
+
+def test_slot_handed_over_as_the_wait_times_out(monkeypatch):
+    async def wait_for_timing_out_late(waiter, timeout):
+        # release() runs in the same loop iteration that the timeout fires in
+        gate.release()
+        raise TimeoutError
+
+    gate = Gate("test", limit=1, max_queue=1)
+
+    async def scenario() -> None:
+        assert await gate.acquire(1.0)
+        monkeypatch.setattr(admission.asyncio, "wait_for", wait_for_timing_out_late)
+        assert await gate.acquire(1.0)
+        assert gate.in_flight == 1
+        gate.release()
+
+    asyncio.run(scenario())
+    assert gate.in_flight == 0
@@ -0,0 +1,107 @@
+from sqlalchemy import delete
+
+from app.config import settings
+from app.database import engine, init_db, schema_version
+from app.tasks import archive_projects
+
+
+def _archive_now(monkeypatch):
+    monkeypatch.setattr(settings, "ARCHIVE_AFTER_DAYS", 0.0)
+    archive_projects()
+
+
+def _new_rejected_project(client, headers, title: str) -> int:
+    project_id = client.post(
+        "/projects/", json={"title": title, "description": "x"}, headers=headers
+    ).json()["id"]
+    client.post(f"/projects/{project_id}/reject", headers=headers)
+    return project_id
+
+
+def test_archived_ids_are_not_reused(client, register, monkeypatch):
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    first = _new_rejected_project(client, alice, "first")
+    client.post(f"/quotes/projects/{first}", json={"amount": 1, "days": 1}, headers=bob)
+    _archive_now(monkeypatch)
+
+    second = client.post(
+        "/projects/", json={"title": "second", "description": "x"}, headers=alice
+    ).json()["id"]
+    assert second > first
+
+    projects = client.get("/projects/me/client", headers=alice).json()
+    assert sorted((p["id"], p["title"]) for p in projects) == [
+        (first, "first"),
+        (second, "second"),
+    ]
+    # the archived project's quote stays with it
+    assert client.get(f"/quotes/projects/{second}", headers=alice).json() == []
+
+    client.post(f"/projects/{second}/reject", headers=alice)
+    _archive_now(monkeypatch)
+    assert client.get(f"/projects/{second}/history", headers=alice).status_code == 200
+
+
+def _drop_autoincrement(table: str) -> None:
+    """Recreate ``table`` the way schemas before AUTOINCREMENT had it."""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        sql = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        ).scalar()
+        conn.exec_driver_sql(
+            sql.replace(table, f"{table}_new", 1).replace(" AUTOINCREMENT", "")
+        )
+        conn.exec_driver_sql(f'INSERT INTO "{table}_new" SELECT * FROM "{table}"')
+        conn.exec_driver_sql(f'DROP TABLE "{table}"')
+        conn.exec_driver_sql(f'ALTER TABLE "{table}_new" RENAME TO "{table}"')
+        conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+        conn.commit()
+        conn.exec_driver_sql("PRAGMA foreign_keys = ON")
+        conn.commit()
+
+
+def test_init_db_adds_autoincrement_past_archived_ids(client, register, monkeypatch):
+    alice = register("alice", "client")
+    _drop_autoincrement("projects")
+    first = _new_rejected_project(client, alice, "first")
+    _archive_now(monkeypatch)
+
+    with engine.begin() as conn:
+        conn.execute(delete(schema_version))
+    init_db()
+
+    second = client.post(
+        "/projects/", json={"title": "second", "description": "x"}, headers=alice
+    ).json()["id"]
+    assert second > first
+
+
+def test_archived_projects_keep_their_quote_stats(client, register, monkeypatch):
+    alice = register("alice", "client")
+    quoted = client.post(
+        "/projects/", json={"title": "quoted", "description": "x"}, headers=alice
+    ).json()["id"]
+    for i, (amount, days) in enumerate([(30, 5), (10, 7), (20, 3)]):
+        client.post(
+            f"/quotes/projects/{quoted}",
+            json={"amount": amount, "days": days},
+            headers=register(f"worker{i}", "worker"),
+        )
+    client.post(f"/projects/{quoted}/reject", headers=alice)
+    _new_rejected_project(client, alice, "unquoted")
+    before = client.get("/projects/me/client", headers=alice).json()
+
+    _archive_now(monkeypatch)
+    after = client.get("/projects/me/client", headers=alice).json()
+    assert sorted(after, key=lambda p: p["id"]) == sorted(before, key=lambda p: p["id"])
+    stats = {p["title"]: p["quote_stats"] for p in after}
+    assert stats["unquoted"] is None
+    assert stats["quoted"] == {
+        "quote_count": 3,
+        "min_amount": 10,
+        "avg_amount": 20,
+        "min_days": 3,
+    }
@@ -0,0 +1,88 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, func, select
+
+from conftest import count_queries
+
+from app.audit import AuditBuffer, audit_log
+from app.config import settings
+from app.database import engine
+from app.main import app
+from app.models.audit import AuditEvent, ProjectStatusEvent
+
+
+def _count(model) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(model)).one()
+
+
+def test_buffer_writes_in_batches_and_drops_when_full(client):
+    buffer = AuditBuffer(max_size=10, batch_size=3)
+    for i in range(12):
+        buffer.auth("auth.login_failed", f"user{i}", "10.0.0.1")
+
+    with count_queries() as statements:
+        assert buffer.flush() == 10
+    inserts = [s for s in statements if s.startswith("INSERT INTO audit_log")]
+    assert len(inserts) == 4
+    assert _count(AuditEvent) == 10
+    assert buffer.flush() == 0
+
+
+def test_buffered_events_are_written_at_shutdown(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "AUDIT_FLUSH_INTERVAL_SECONDS", 3600.0)
+    SQLModel.metadata.drop_all(engine)
+
+    with TestClient(app) as client:
+        client.post(
+            "/auth/register",
+            json={"username": "alice", "password": "pw", "role": "client"},
+        )
+        token = client.post(
+            "/auth/login/json", json={"username": "alice", "password": "pw"}
+        ).json()["access_token"]
+        client.post(
+            "/projects/",
+            json={"title": "p", "description": "x"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert _count(AuditEvent) == _count(ProjectStatusEvent) == 0
+
+    with Session(engine) as session:
+        actions = session.exec(select(AuditEvent.action)).all()
+    assert sorted(actions) == ["auth.login", "auth.register"]
+    assert _count(ProjectStatusEvent) == 1
+
+
+def test_history_and_durations(client, register):
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    carol = register("carol", "worker")
+    client.post("/projects/", json={"title": "p", "description": "x"}, headers=alice)
+    client.patch("/projects/1/assign?worker_id=2", headers=alice)
+    client.post("/projects/1/complete", headers=alice)
+    audit_log.flush()
+
+    history = client.get("/projects/1/history", headers=bob).json()
+    assert [(e["from_status"], e["to_status"]) for e in history] == [
+        (None, "open"),
+        ("open", "in_progress"),
+        ("in_progress", "completed"),
+    ]
+    assert history[-1]["actor_id"] == 1 and history[-1]["worker_id"] == 2
+    assert client.get("/projects/1/history", headers=carol).status_code == 403
+
+    for headers in (alice, bob):
+        durations = client.get("/projects/me/durations", headers=headers).json()
+        assert durations["projects"] == 1
+        assert durations["time_to_assign"]["count"] == 1
+        assert durations["time_to_complete"]["count"] == 1
+        assert durations["time_to_complete"]["mean_seconds"] >= 0
+    durations = client.get("/projects/me/durations", headers=carol).json()
+    assert durations["projects"] == 0
+    assert durations["time_to_complete"] == {
+        "count": 0,
+        "mean_seconds": None,
+        "p50_seconds": None,
+        "p90_seconds": None,
+    }
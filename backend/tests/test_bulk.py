@@ -0,0 +1,54 @@
+from app.config import settings
+
+
+def test_bulk_projects_report_invalid_items(client, register):
+    alice = register("alice", "client")
+    response = client.post(
+        "/projects/bulk",
+        json=[
+            {"title": "a", "description": "x"},
+            {"title": "b"},
+            "not an object",
+            {"title": "c", "description": "x"},
+        ],
+        headers=alice,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (2, 2)
+    assert [item["index"] for item in result["items"]] == [0, 1, 2, 3]
+    assert [item["id"] is not None for item in result["items"]] == [
+        True,
+        False,
+        False,
+        True,
+    ]
+    assert "description" in result["items"][1]["error"]
+
+
+def test_bulk_quotes_report_invalid_items(client, register):
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    project_id = client.post(
+        "/projects/", json={"title": "a", "description": "x"}, headers=alice
+    ).json()["id"]
+
+    result = client.post(
+        "/quotes/bulk",
+        json=[
+            {"project_id": project_id, "amount": 10, "days": 2},
+            {"project_id": project_id, "amount": "lots", "days": 2},
+            {"project_id": project_id + 1, "amount": 10, "days": 2},
+        ],
+        headers=bob,
+    ).json()
+    assert (result["created"], result["failed"]) == (1, 2)
+    assert "amount" in result["items"][1]["error"]
+    assert result["items"][2]["error"] == "Project not found"
+
+
+def test_bulk_size_is_checked_before_validation(client, register, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_ITEMS", 2)
+    alice = register("alice", "client")
+    response = client.post("/projects/bulk", json=[None] * 3, headers=alice)
+    assert response.status_code == 413
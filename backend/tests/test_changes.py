@@ -0,0 +1,120 @@
+import pytest
+
+from app.config import settings
+from app.tasks import archive_projects
+
+
+@pytest.fixture(autouse=True)
+def settled(monkeypatch):
+    monkeypatch.setattr(settings, "CHANGES_SETTLE_SECONDS", 0.0)
+
+
+def _sync(client, headers, since: int = 0, limit: int = 500) -> dict:
+    response = client.get(
+        "/changes", params={"since": since, "limit": limit}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _ids(feed: dict, entity: str) -> list[int]:
+    return [row["id"] for row in feed[entity]]
+
+
+def _tombstones(feed: dict) -> list[tuple[str, int]]:
+    return [(row["entity"], row["id"]) for row in feed["deleted"]]
+
+
+def _new_project(client, alice, title: str = "p") -> int:
+    return client.post(
+        "/projects/", json={"title": title, "description": "x"}, headers=alice
+    ).json()["id"]
+
+
+def test_open_project_assigned_to_another_worker_is_tombstoned(client, register):
+    alice = register("alice", "client")
+    register("bob", "worker")
+    carol = register("carol", "worker")
+    project_id = _new_project(client, alice)
+
+    feed = _sync(client, carol)
+    assert _ids(feed, "projects") == [project_id]
+
+    client.patch(f"/projects/{project_id}/assign?worker_id=2", headers=alice)
+    feed = _sync(client, carol, feed["cursor"])
+    assert _ids(feed, "projects") == []
+    assert _tombstones(feed) == [("projects", project_id)]
+
+
+def test_rows_never_seen_get_no_tombstone(client, register):
+    alice = register("alice", "client")
+    register("bob", "worker")
+    carol = register("carol", "worker")
+    cursor = _sync(client, carol)["cursor"]
+
+    # opened and taken between two syncs: carol never had it
+    project_id = _new_project(client, alice)
+    client.patch(f"/projects/{project_id}/assign?worker_id=2", headers=alice)
+    feed = _sync(client, carol, cursor)
+    assert _ids(feed, "projects") == [] and _tombstones(feed) == []
+
+    # a full sync by a newcomer holds nothing it has to drop
+    dave = register("dave", "worker")
+    assert _tombstones(_sync(client, dave)) == []
+
+
+def test_quotes_reach_their_worker_and_the_owner_only(client, register, monkeypatch):
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    carol = register("carol", "worker")
+    project_id = _new_project(client, alice)
+    quote_id = client.post(
+        f"/quotes/projects/{project_id}",
+        json={"amount": 10, "days": 2},
+        headers=bob,
+    ).json()["id"]
+
+    assert _ids(_sync(client, bob), "quotes") == [quote_id]
+    assert _ids(_sync(client, alice), "quotes") == [quote_id]
+    assert _ids(_sync(client, carol), "quotes") == []
+
+    # the owner is still known once the project moved to the archive
+    client.post(f"/projects/{project_id}/reject", headers=alice)
+    monkeypatch.setattr(settings, "ARCHIVE_AFTER_DAYS", 0.0)
+    archive_projects()
+    feed = _sync(client, alice)
+    assert _ids(feed, "quotes") == [quote_id]
+    assert _ids(feed, "projects") == [project_id]
+    assert _ids(_sync(client, carol), "quotes") == []
+
+
+def test_pages_hold_only_rows_the_user_can_see(client, register):
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    carol = register("carol", "worker")
+    first = _new_project(client, alice, "first")
+    for i in range(5):
+        client.post(
+            f"/quotes/projects/{first}",
+            json={"amount": 10 + i, "days": 2},
+            headers=bob,
+        )
+    second = _new_project(client, alice, "second")
+
+    seen: list[int] = []
+    cursor = 0
+    while True:
+        feed = _sync(client, carol, cursor, limit=1)
+        seen += _ids(feed, "projects")
+        assert feed["quotes"] == []
+        if not feed["has_more"]:
+            break
+        # a full page always carries something for carol
+        assert feed["projects"] or feed["users"]
+        cursor = feed["cursor"]
+    # each quote also touches the project; carol gets those updates
+    assert set(seen) == {first, second}
+
+    # bob's quotes are behind the cursor even though carol never saw them
+    assert _sync(client, carol, feed["cursor"])["cursor"] == feed["cursor"]
+    assert feed["cursor"] == _sync(client, bob)["cursor"]
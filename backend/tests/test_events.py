@@ -0,0 +1,94 @@
+import asyncio
+import logging
+
+from app.config import settings
+from app.events import LocalBroker
+
+
+def _run(test) -> None:
+    async def main():
+        broker = LocalBroker(buffer_size=100, queue_size=10)
+        broker.start()
+        try:
+            await test(broker)
+        finally:
+            broker.stop()
+
+    asyncio.run(main())
+
+
+async def _settle() -> None:
+    # publishes from the threadpool land on the loop a callback later
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_subscribers_get_their_own_events_from_any_thread():
+    async def test(broker: LocalBroker):
+        stream = broker.subscribe(1)
+        first = asyncio.ensure_future(anext(stream))
+        await _settle()
+
+        await asyncio.to_thread(broker.publish, 2, "quote.created", {"n": 0})
+        await asyncio.to_thread(broker.publish, 1, "quote.created", {"n": 1})
+        event = await asyncio.wait_for(first, 1)
+        assert (event.user_id, event.data) == (1, {"n": 1})
+        await stream.aclose()
+        assert broker.subscriber_count() == 0
+
+    _run(test)
+
+
+def test_resume_replays_what_came_after_the_last_event_id():
+    async def test(broker: LocalBroker):
+        broker.publish_many([(1, "a", {"n": n}) for n in range(3)])
+        broker.publish(2, "a", {"n": 9})
+        await _settle()
+        history = list(broker._history)
+
+        stream = broker.subscribe(1, last_event_id=history[0].id)
+        replayed = [await anext(stream), await anext(stream)]
+        assert [event.data["n"] for event in replayed] == [1, 2]
+        await stream.aclose()
+
+    _run(test)
+
+
+def test_ids_keep_increasing_across_restarts():
+    ids = []
+
+    async def test(broker: LocalBroker):
+        broker.publish_many([(1, "a", {}), (1, "a", {})])
+        await _settle()
+        ids.extend(event.id for event in broker._history)
+
+    _run(test)
+    _run(test)
+    # a resumed Last-Event-ID never names an event from before a restart
+    assert ids == sorted(set(ids)) and len(ids) == 4
+
+
+def test_slow_subscriber_is_told_to_reconnect():
+    async def test(broker: LocalBroker):
+        stream = broker.subscribe(1)
+        first = asyncio.ensure_future(anext(stream))
+        await _settle()
+        broker.publish_many([(1, "a", {"n": n}) for n in range(12)])
+        await _settle()
+
+        # the queue overflowed: the stream ends instead of lagging behind
+        assert isinstance(first.exception(), StopAsyncIteration)
+        assert broker.subscriber_count() == 0
+
+    _run(test)
+
+
+def test_local_broker_warns_when_workers_cannot_share_it(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "WEB_WORKERS", 4)
+
+    async def test(broker: LocalBroker):
+        pass
+
+    with caplog.at_level(logging.WARNING, logger="app.events"):
+        _run(test)
+    assert "4 workers" in caplog.text
@@ -0,0 +1,98 @@
+from conftest import count_queries
+
+from app.config import settings
+from app.tasks import archive_projects
+
+
+def _new_project(client, alice, title: str) -> int:
+    return client.post(
+        "/projects/", json={"title": title, "description": "x"}, headers=alice
+    ).json()["id"]
+
+
+def _queries(client, url: str, headers) -> int:
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def test_expanded_project_quotes_cost_the_same_for_any_page_size(client, register):
+    alice = register("alice", "client")
+    small = _new_project(client, alice, "small")
+    large = _new_project(client, alice, "large")
+    for i in range(6):
+        worker = register(f"worker{i}", "worker")
+        for project_id in (small, large) if i < 3 else (large,):
+            client.post(
+                f"/quotes/projects/{project_id}",
+                json={"amount": 10, "days": 2},
+                headers=worker,
+            )
+
+    url = "/quotes/projects/{}?expand=worker,project"
+    assert _queries(client, url.format(small), alice) == _queries(
+        client, url.format(large), alice
+    )
+
+
+def test_expanded_quotes_of_archived_projects_cost_the_same(
+    client, register, monkeypatch
+):
+    alice = register("alice", "client")
+    bob, carol = register("bob", "worker"), register("carol", "worker")
+    for i in range(6):
+        project_id = _new_project(client, alice, f"p{i}")
+        for worker in (bob, carol) if i < 3 else (carol,):
+            client.post(
+                f"/quotes/projects/{project_id}",
+                json={"amount": 10, "days": 2},
+                headers=worker,
+            )
+        # half of each worker's projects end up in the archive
+        if i % 3 == 0 or i == 4:
+            client.post(f"/projects/{project_id}/reject", headers=alice)
+    monkeypatch.setattr(settings, "ARCHIVE_AFTER_DAYS", 0.0)
+    archive_projects()
+
+    url = "/quotes/me?expand=worker,project"
+    assert _queries(client, url, bob) == _queries(client, url, carol)
+
+
+def test_expanded_deliverables_cost_the_same_for_any_page_size(client, register):
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    projects = []
+    for count in (3, 6):
+        project_id = _new_project(client, alice, f"{count} deliverables")
+        client.patch(f"/projects/{project_id}/assign?worker_id=2", headers=alice)
+        for i in range(count):
+            client.post(
+                f"/deliverables/projects/{project_id}",
+                json={"file_url": f"u{i}"},
+                headers=bob,
+            )
+        projects.append(project_id)
+
+    url = "/deliverables/projects/{}?expand=worker,project"
+    small, large = (_queries(client, url.format(p), alice) for p in projects)
+    assert small == large
+
+
+def test_relations_are_left_out_unless_expanded(client, register):
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    project_id = _new_project(client, alice, "p")
+    client.post(
+        f"/quotes/projects/{project_id}",
+        json={"amount": 10, "days": 2},
+        headers=bob,
+    )
+
+    [quote] = client.get(f"/quotes/projects/{project_id}", headers=alice).json()
+    assert "worker" not in quote and "project" not in quote
+
+    [quote] = client.get(
+        f"/quotes/projects/{project_id}?expand=worker", headers=alice
+    ).json()
+    assert quote["worker"]["username"] == "bob" and "project" not in quote
@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+
+from sqlmodel import Session
+
+from app.config import settings
+from app.crud.export import export_statements, iter_export_rows
+from app.database import engine
+from app.tasks import archive_projects
+
+
+def _setup(client, register, monkeypatch) -> tuple[dict, dict, dict]:
+    """Five projects of alice, the first two finished and archived; bob
+    quotes on all of them, carol only on the last one."""
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    carol = register("carol", "worker")
+    for i in range(5):
+        project_id = client.post(
+            "/projects/", json={"title": f"p{i}", "description": "x"}, headers=alice
+        ).json()["id"]
+        client.post(
+            f"/quotes/projects/{project_id}",
+            json={"amount": 10 + i, "days": 2},
+            headers=bob,
+        )
+        if i < 2:
+            client.post(f"/projects/{project_id}/reject", headers=alice)
+    client.post("/quotes/projects/5", json={"amount": 1, "days": 1}, headers=carol)
+    monkeypatch.setattr(settings, "ARCHIVE_AFTER_DAYS", 0.0)
+    archive_projects()
+    return alice, bob, carol
+
+
+def _ndjson(client, url: str, headers) -> list[dict]:
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_streams_hot_then_archived_rows_the_user_can_see(
+    client, register, monkeypatch
+):
+    alice, bob, carol = _setup(client, register, monkeypatch)
+
+    projects = _ndjson(client, "/export/projects", alice)
+    assert [p["id"] for p in projects] == [3, 4, 5, 1, 2]
+    assert projects[-1]["status"] == "rejected"
+
+    quotes = _ndjson(client, "/export/quotes", bob)
+    assert [q["amount"] for q in quotes] == [12, 13, 14, 10, 11]
+    assert [q["amount"] for q in _ndjson(client, "/export/quotes", carol)] == [1]
+    assert len(_ndjson(client, "/export/quotes", alice)) == 6
+    assert _ndjson(client, "/export/projects", carol) == []
+
+    rejected = _ndjson(client, "/export/quotes?status=rejected", alice)
+    assert [q["project_id"] for q in rejected] == [1, 2]
+
+
+def test_csv_export_starts_with_the_header(client, register, monkeypatch):
+    alice, _, _ = _setup(client, register, monkeypatch)
+
+    response = client.get("/export/quotes?format=csv&status=open", headers=alice)
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="quotes.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["project_id"], row["amount"]) for row in rows] == [
+        ("3", "12.0"),
+        ("4", "13.0"),
+        ("5", "14.0"),
+        ("5", "1.0"),
+    ]
+
+
+def test_rows_come_in_batches_of_the_configured_size(client, register, monkeypatch):
+    _setup(client, register, monkeypatch)
+
+    with Session(engine) as session:
+        batches = list(
+            iter_export_rows(session, export_statements("quotes", 1), batch_size=2)
+        )
+    # hot and archive are fetched separately, each in batches
+    assert [len(batch) for batch in batches] == [2, 2, 2]
+    assert [row["id"] for batch in batches for row in batch] == [3, 4, 5, 6, 1, 2]
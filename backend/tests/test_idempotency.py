@@ -0,0 +1,78 @@
+from app.config import settings
+
+
+def _create(client, headers, key: str, title: str):
+    return client.post(
+        "/projects/",
+        json={"title": title, "description": "x"},
+        headers={**headers, "Idempotency-Key": key},
+    )
+
+
+def test_retry_with_the_same_body_is_replayed(client, register):
+    alice = register("alice", "client")
+    first = _create(client, alice, "k1", "a")
+    retry = _create(client, alice, "k1", "a")
+
+    assert retry.headers.get("idempotent-replayed") == "true"
+    assert retry.json()["id"] == first.json()["id"]
+    assert len(client.get("/projects/me/client", headers=alice).json()) == 1
+
+
+def test_key_reused_with_another_body_is_rejected(client, register):
+    alice = register("alice", "client")
+    assert _create(client, alice, "k1", "a").status_code == 200
+
+    reused = _create(client, alice, "k1", "b")
+    assert reused.status_code == 422
+    assert len(client.get("/projects/me/client", headers=alice).json()) == 1
+
+
+def test_response_too_large_to_store_is_not_run_again(client, register, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_MAX_RESPONSE_BYTES", 10)
+    alice = register("alice", "client")
+    assert _create(client, alice, "k1", "a").status_code == 200
+
+    retry = _create(client, alice, "k1", "a")
+    assert retry.status_code == 409
+    assert "200" in retry.json()["detail"]
+    assert len(client.get("/projects/me/client", headers=alice).json()) == 1
+
+
+def _upload(client, headers, key: str, content: bytes, boundary: str):
+    # the same file sent again comes with a new multipart boundary
+    body = (
+        (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="f.txt"\r\n'
+            "Content-Type: text/plain\r\n\r\n"
+        ).encode()
+        + content
+        + f"\r\n--{boundary}--\r\n".encode()
+    )
+    return client.post(
+        "/deliverables/projects/1/upload",
+        content=body,
+        headers={
+            **headers,
+            "Idempotency-Key": key,
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+        },
+    )
+
+
+def test_uploads_are_fingerprinted_by_their_content(client, register):
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    _create(client, alice, "p", "a")
+    client.patch("/projects/1/assign?worker_id=2", headers=alice)
+
+    first = _upload(client, bob, "up", b"x" * 1000, "first")
+    assert first.status_code == 201
+
+    retry = _upload(client, bob, "up", b"x" * 1000, "second")
+    assert retry.headers.get("idempotent-replayed") == "true"
+    assert retry.json()["id"] == first.json()["id"]
+
+    assert _upload(client, bob, "up", b"y" * 1000, "third").status_code == 422
+    assert len(client.get("/deliverables/projects/1", headers=alice).json()) == 1
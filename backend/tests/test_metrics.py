@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+# one worker process: records samples, then shuts down or is left running
+WORKER = textwrap.dedent("""
+    import sys
+    from app.metrics import DB_POOL_CHECKED_OUT, UPLOAD_BYTES, mark_process_dead
+
+    UPLOAD_BYTES.inc(int(sys.argv[1]))
+    DB_POOL_CHECKED_OUT.set(int(sys.argv[2]))
+    if sys.argv[3] == "exit":
+        mark_process_dead()
+    """)
+SCRAPE = textwrap.dedent("""
+    from app.metrics import metrics_endpoint
+
+    print(metrics_endpoint(None).body.decode())
+    """)
+
+
+def _run(code: str, *args: str, env: dict) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout
+
+
+def _sample(body: str, name: str) -> float:
+    [line] = [line for line in body.splitlines() if line.startswith(name + " ")]
+    return float(line.split()[1])
+
+
+def test_metrics_add_up_across_worker_processes(tmp_path):
+    env = {
+        **os.environ,
+        "PROMETHEUS_MULTIPROC_DIR": str(tmp_path),
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'metrics.db'}",
+    }
+    _run(WORKER, "100", "2", "stay", env=env)
+    _run(WORKER, "50", "3", "stay", env=env)
+    _run(WORKER, "25", "4", "exit", env=env)
+
+    body = _run(SCRAPE, env=env)
+    # counters keep what exited workers counted
+    assert _sample(body, "upload_bytes_total") == 175
+    # live gauges leave out the worker that shut down
+    assert _sample(body, "db_pool_checked_out_connections") == 5
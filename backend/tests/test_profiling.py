@@ -0,0 +1,78 @@
+import os
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.profiling import BREAKDOWN, ProfilingMiddleware, _category, profile_endpoint
+
+
+def _busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _profiled_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/work")
+    def work():
+        _busy(0.1)
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware)
+    app.add_route("/debug/profiles/{name}", profile_endpoint)
+    return app
+
+
+def _server_timing(header: str) -> dict[str, float]:
+    timings = {}
+    for metric in header.split(", "):
+        name, duration = metric.split(";dur=")
+        timings[name] = float(duration)
+    return timings
+
+
+def test_profiled_request_reports_server_timing(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", "t0ken")
+    monkeypatch.setattr(settings, "PROFILING_OUTPUT_DIR", str(tmp_path))
+    client = TestClient(_profiled_app())
+
+    response = client.get("/work", headers={"X-Profile-Token": "t0ken"})
+    timings = _server_timing(response.headers["server-timing"])
+    assert list(timings) == [*BREAKDOWN, "wall"]
+    assert timings["wall"] >= 100
+    # the route's own code, sampled in the threadpool
+    assert timings["other"] >= 50
+    assert sum(timings[key] for key in BREAKDOWN) <= timings["wall"] * 1.5
+
+    name = response.headers["x-profile"]
+    assert os.path.exists(tmp_path / "requests" / name)
+    stored = client.get(f"/debug/profiles/{name}", headers={"X-Profile-Token": "t0ken"})
+    assert stored.json()["breakdown_ms"]["wall"] >= 100
+
+
+def test_requests_without_the_token_are_not_profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", "t0ken")
+    monkeypatch.setattr(settings, "PROFILING_OUTPUT_DIR", str(tmp_path))
+    client = TestClient(_profiled_app())
+
+    for headers in ({}, {"X-Profile-Token": "wrong"}):
+        response = client.get("/work", headers=headers)
+        assert "server-timing" not in response.headers
+        assert "x-profile" not in response.headers
+    assert client.get("/debug/profiles/x").status_code == 403
+
+
+def test_stacks_are_categorized_by_their_outermost_match():
+    deps = ("get_current_user", os.path.join("/srv", "app", "deps.py"), 1)
+    crud = ("get_user", os.path.join("/srv", "app", "crud", "user.py"), 1)
+    route = ("create_project_route", "/srv/app/routers/project.py", 1)
+
+    assert _category((route, crud)) == "crud"
+    # the user lookup inside authentication counts as auth
+    assert _category((deps, crud)) == "auth"
+    assert _category((route, ("jsonable_encoder", "/x/encoders.py", 1))) == "serialize"
+    assert _category((route,)) == "other"
@@ -0,0 +1,85 @@
+import pytest
+
+from app.config import settings
+from app.querylog import QUERY_BUDGETS, QueryBudgetExceeded
+from conftest import count_queries
+from app.tasks import archive_projects
+
+
+@pytest.fixture
+def seeded(client, register, monkeypatch):
+    """Two projects with quotes and a deliverable; the first is archived."""
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    carol = register("carol", "worker")
+    for title in ("first", "second"):
+        client.post(
+            "/projects/", json={"title": title, "description": "x"}, headers=alice
+        )
+    for project_id in (1, 2):
+        for worker in (bob, carol):
+            client.post(
+                f"/quotes/projects/{project_id}",
+                json={"amount": 10, "days": 2},
+                headers=worker,
+            )
+    client.patch("/projects/1/assign?worker_id=2", headers=alice)
+    client.post("/deliverables/projects/1", json={"file_url": "u"}, headers=bob)
+    client.post("/projects/1/complete", headers=alice)
+
+    monkeypatch.setattr(settings, "ARCHIVE_AFTER_DAYS", 0.0)
+    archive_projects()
+    return alice, bob
+
+
+BUDGETED_GETS = [
+    # (endpoint, url, as the worker)
+    ("list_deliverables_route", "/deliverables/projects/{p}", False),
+    ("list_project_quotes_route", "/quotes/projects/{p}", False),
+    ("list_top_project_quotes_route", "/quotes/projects/{p}/top", False),
+    ("list_open_projects_route", "/projects/open", True),
+    ("list_client_projects_route", "/projects/me/client", False),
+    ("list_worker_projects_route", "/projects/me/worker", True),
+    ("list_my_quotes_route", "/quotes/me", True),
+    ("get_worker_profile_route", "/workers/2/profile", False),
+    ("list_quoter_profiles_route", "/workers/profiles/projects/{p}", False),
+]
+
+
+def test_every_budget_is_exercised():
+    assert {endpoint for endpoint, _, _ in BUDGETED_GETS} == set(QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize("expand", ["", "worker,project"])
+@pytest.mark.parametrize("project_id", [1, 2], ids=["archived", "hot"])
+@pytest.mark.parametrize("endpoint,url,as_worker", BUDGETED_GETS)
+def test_routes_stay_within_budget(
+    client, seeded, endpoint, url, as_worker, project_id, expand
+):
+    alice, bob = seeded
+    separator = "&" if "?" in url else "?"
+    response = client.get(
+        url.format(p=project_id) + f"{separator}expand={expand}",
+        headers=bob if as_worker else alice,
+    )
+    assert response.status_code == 200, response.text
+
+
+@pytest.mark.parametrize("endpoint,url,as_worker", BUDGETED_GETS)
+def test_plain_hot_path_takes_three_queries_at_most(
+    client, seeded, endpoint, url, as_worker
+):
+    # expand and archive reads only add to these, see allow_queries
+    assert QUERY_BUDGETS[endpoint] <= 3
+    alice, bob = seeded
+    with count_queries() as statements:
+        response = client.get(url.format(p=2), headers=bob if as_worker else alice)
+    assert response.status_code == 200, response.text
+    assert len(statements) <= QUERY_BUDGETS[endpoint]
+
+
+def test_route_over_budget_fails(client, seeded, monkeypatch):
+    alice, _ = seeded
+    monkeypatch.setitem(QUERY_BUDGETS, "list_client_projects_route", 1)
+    with pytest.raises(QueryBudgetExceeded, match="list_client_projects_route"):
+        client.get("/projects/me/client", headers=alice)
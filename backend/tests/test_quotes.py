@@ -0,0 +1,71 @@
+from sqlmodel import Session
+
+from app.crud.quote import get_quote_stats, rebuild_quote_stats
+from app.database import engine
+
+# (amount, days) per worker
+QUOTES = [(30, 5), (10, 7), (20, 3), (10, 4), (50, 3)]
+
+
+def _quoted_project(client, register) -> tuple[dict, int]:
+    alice = register("alice", "client")
+    project_id = client.post(
+        "/projects/", json={"title": "p", "description": "x"}, headers=alice
+    ).json()["id"]
+    # the first two one by one, the rest in one bulk request each
+    for i, (amount, days) in enumerate(QUOTES):
+        worker = register(f"worker{i}", "worker")
+        item = {"amount": amount, "days": days}
+        if i < 2:
+            client.post(f"/quotes/projects/{project_id}", json=item, headers=worker)
+        else:
+            client.post(
+                "/quotes/bulk",
+                json=[{"project_id": project_id, **item}],
+                headers=worker,
+            )
+    return alice, project_id
+
+
+def _stats(project_id: int) -> tuple:
+    with Session(engine) as session:
+        stats = get_quote_stats(session, project_id)
+        return (stats.quote_count, stats.min_amount, stats.avg_amount, stats.min_days)
+
+
+def test_quote_stats_match_a_full_recount(client, register):
+    alice, project_id = _quoted_project(client, register)
+    assert _stats(project_id) == (5, 10, 24, 3)
+
+    [project] = client.get("/projects/me/client", headers=alice).json()
+    assert project["quote_stats"] == {
+        "quote_count": 5,
+        "min_amount": 10,
+        "avg_amount": 24,
+        "min_days": 3,
+    }
+
+    with Session(engine) as session:
+        rebuild_quote_stats(session)
+    assert _stats(project_id) == (5, 10, 24, 3)
+
+
+def test_top_quotes_by_amount_and_by_days(client, register):
+    alice, project_id = _quoted_project(client, register)
+
+    def top(by: str, k: int) -> list[tuple[int, int]]:
+        quotes = client.get(
+            f"/quotes/projects/{project_id}/top",
+            params={"by": by, "k": k},
+            headers=alice,
+        ).json()
+        return [(q["amount"], q["days"]) for q in quotes]
+
+    # ties broken by the other column
+    assert top("amount", 3) == [(10, 4), (10, 7), (20, 3)]
+    assert top("days", 2) == [(20, 3), (50, 3)]
+    assert top("amount", 100) == sorted(QUOTES)
+
+    worker = register("other", "worker")
+    response = client.get(f"/quotes/projects/{project_id}/top", headers=worker)
+    assert response.status_code == 403
@@ -0,0 +1,57 @@
+import random
+
+from app.recommend import ProjectIndex
+
+
+def text(repeats: int, project_id: int) -> str:
+    # "python" gets heavier with every repeat; the other term is unique
+    return " ".join(["python"] * repeats + [f"filler{project_id}"])
+
+
+def champions(index: ProjectIndex) -> set[int]:
+    return set(index._champions["python"])
+
+
+def test_champion_lists_follow_adds_and_removes():
+    index = ProjectIndex(champion_size=3)
+    for project_id in range(1, 7):
+        index.add(project_id, text(project_id, project_id))
+    assert champions(index) == {4, 5, 6}
+
+    index.add(7, text(10, 7))
+    index.add(8, text(1, 8))
+    assert champions(index) == {5, 6, 7}
+
+    # losing a champion leaves the list short until the background refill
+    index.remove(7)
+    assert champions(index) == {5, 6}
+    assert [
+        project_id for project_id, _ in index.search({"python": 1.0}, 3, set())
+    ] == [6, 5]
+    assert index.refresh_champions() == 1
+    assert champions(index) == {4, 5, 6}
+
+    for project_id in range(1, 6):
+        index.remove(project_id)
+    assert "python" not in index._champions
+
+
+def test_refreshed_champions_are_the_heaviest_postings():
+    rng = random.Random(7)
+    index = ProjectIndex(champion_size=5)
+    for _ in range(500):
+        project_id = rng.randrange(40)
+        if rng.random() < 0.3:
+            index.remove(project_id)
+        else:
+            index.add(project_id, text(rng.randrange(1, 30), project_id))
+    index.refresh_champions()
+
+    postings = index._postings["python"]
+    floor = min(index._champions["python"].values())
+    assert len(index._champions["python"]) == 5
+    assert all(
+        weight <= floor
+        for project_id, weight in postings.items()
+        if project_id not in index._champions["python"]
+    )
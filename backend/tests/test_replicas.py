@@ -0,0 +1,95 @@
+import time
+
+import pytest
+from sqlmodel import select
+from starlette.requests import Request
+
+from app import replicas
+from app.config import settings
+from app.database import engine
+from app.replicas import (
+    CLAIM_HEADER,
+    choose_engine,
+    mark_write,
+    read_only,
+    recent_writers,
+    sign_claim,
+)
+from app.security import create_access_token
+from conftest import count_queries
+
+REPLICA = object()
+
+
+@read_only
+def endpoint():
+    pass
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr(replicas, "_marked", {})
+    monkeypatch.setattr(replicas, "_unmarked", {})
+
+
+def _read_as(username: str, claim: str | None = None):
+    token = create_access_token({"sub": username})
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    if claim is not None:
+        headers.append((CLAIM_HEADER.lower().encode(), claim.encode()))
+    scope = {"type": "http", "headers": headers, "endpoint": endpoint}
+    return choose_engine(Request(scope), engine, [REPLICA])
+
+
+def test_reads_stick_to_the_primary_after_a_write(client, monkeypatch):
+    assert _read_as("alice") is REPLICA
+    mark_write(engine, "alice")
+    assert _read_as("alice") is engine
+    assert _read_as("bob") is REPLICA
+
+    # another worker process only has the shared table
+    monkeypatch.setattr(replicas, "_marked", {})
+    monkeypatch.setattr(replicas, "_unmarked", {})
+    assert _read_as("alice") is engine
+
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", -1.0)
+    mark_write(engine, "alice")
+    assert _read_as("alice") is REPLICA
+
+
+def test_writes_mark_the_user_without_cookies(client, register, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", ["sqlite://"])
+    alice = register("alice", "client")
+    response = client.post(
+        "/projects/", json={"title": "t", "description": "x"}, headers=alice
+    )
+    assert "set-cookie" not in response.headers
+    with engine.connect() as conn:
+        assert conn.scalar(select(recent_writers.c.subject)) == "alice"
+
+
+def test_new_accounts_are_marked(client, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", ["sqlite://"])
+    response = client.post(
+        "/auth/register",
+        json={"username": "alice", "password": "pw", "role": "client"},
+    )
+    assert response.headers[CLAIM_HEADER]
+    with engine.connect() as conn:
+        assert conn.scalar(select(recent_writers.c.subject)) == "alice"
+
+
+def test_claims_and_negative_cache_save_the_lookup(client, monkeypatch):
+    claim = sign_claim("alice", time.time() + 5)
+    with count_queries() as statements:
+        assert _read_as("alice", claim) is engine
+        # not alice's claim
+        assert _read_as("bob", claim) is REPLICA
+        assert _read_as("bob") is REPLICA
+    # background jobs may run queries meanwhile
+    assert sum("recent_writers" in statement for statement in statements) == 1
+
+    assert _read_as("carol", sign_claim("carol", time.time() - 1)) is REPLICA
+    # the cached "no" is dropped once this process marks a write
+    mark_write(engine, "carol")
+    assert _read_as("carol") is engine
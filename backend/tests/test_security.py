@@ -0,0 +1,86 @@
+import re
+
+import pytest
+from sqlmodel import Session
+
+from app.cli import main
+from app.config import settings
+from app.crud.user import get_user_by_username
+from app.database import engine
+from app.security import password_hasher
+
+
+@pytest.fixture
+def stronger_hashes(monkeypatch):
+    """Settings raised after the users' hashes were made."""
+
+    def raise_cost() -> None:
+        monkeypatch.setattr(settings, "PASSWORD_HASH_TIME_COST", 2)
+        password_hasher.cache_clear()
+
+    yield raise_cost
+    password_hasher.cache_clear()
+
+
+def _stored_hash(username: str) -> str:
+    with Session(engine) as session:
+        return get_user_by_username(session, username).password
+
+
+def _login(client, password: str):
+    return client.post(
+        "/auth/login/json", json={"username": "alice", "password": password}
+    )
+
+
+def test_login_rehashes_only_with_the_right_password(client, register, stronger_hashes):
+    register("alice", "client")
+    old = _stored_hash("alice")
+    assert "t=1" in old
+    stronger_hashes()
+
+    assert _login(client, "wrong").status_code == 401
+    assert _stored_hash("alice") == old
+
+    assert _login(client, "pw").status_code == 200
+    new = _stored_hash("alice")
+    assert new != old and "t=2" in new
+    # and the new hash is the one checked from now on
+    assert _login(client, "pw").status_code == 200
+    assert _stored_hash("alice") == new
+
+
+def test_calibrate_hasher_picks_parameters_within_the_budget(capsys):
+    main(
+        [
+            "calibrate-hasher",
+            *("--target-ms", "50", "--concurrency", "1", "--rounds", "1"),
+            *("--max-memory-mib", "8", "--min-memory-mib", "1"),
+            *("--parallelism", "1", "2"),
+        ]
+    )
+    chosen = dict(
+        re.findall(r"^(PASSWORD_HASH_\w+)=(\d+)$", capsys.readouterr().out, re.M)
+    )
+    assert set(chosen) == {
+        "PASSWORD_HASH_TIME_COST",
+        "PASSWORD_HASH_MEMORY_KIB",
+        "PASSWORD_HASH_PARALLELISM",
+    }
+    assert 1024 <= int(chosen["PASSWORD_HASH_MEMORY_KIB"]) <= 8 * 1024
+    assert int(chosen["PASSWORD_HASH_TIME_COST"]) >= 1
+    assert chosen["PASSWORD_HASH_PARALLELISM"] in ("1", "2")
+
+
+def test_calibrate_hasher_fails_when_nothing_fits(capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(
+            [
+                "calibrate-hasher",
+                *("--target-ms", "0.001", "--concurrency", "1", "--rounds", "1"),
+                *("--max-memory-mib", "2", "--min-memory-mib", "1"),
+                *("--parallelism", "1"),
+            ]
+        )
+    assert exc.value.code == 1
+    assert "no parameters fit" in capsys.readouterr().out
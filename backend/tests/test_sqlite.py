@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import Column, Integer, MetaData, Table, select, update
+
+from app.sqlite import create_sqlite_engine
+
+metadata = MetaData()
+counter = Table(
+    "counter",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("value", Integer, nullable=False),
+)
+
+
+def test_concurrent_writers_never_see_database_is_locked(tmp_path):
+    url = f"sqlite:///{tmp_path / 'writers.db'}"
+    # two engines stand in for two worker processes: each has its own
+    # writer lock, so between them only busy_timeout keeps writes apart
+    engines = [create_sqlite_engine(url), create_sqlite_engine(url)]
+    metadata.create_all(engines[0])
+    with engines[0].begin() as conn:
+        conn.execute(counter.insert().values(id=1, value=0))
+
+    def increment(i: int) -> None:
+        with engines[i % 2].begin() as conn:
+            # read first, then write: a deferred transaction that upgrades
+            # its read lock is what fails with "database is locked"
+            conn.execute(select(counter.c.value)).scalar()
+            conn.execute(update(counter).values(value=counter.c.value + 1))
+
+    with ThreadPoolExecutor(16) as pool:
+        list(pool.map(increment, range(400)))
+
+    with engines[0].connect() as conn:
+        assert conn.execute(select(counter.c.value)).scalar() == 400
+    for engine in engines:
+        engine.dispose()
@@ -0,0 +1,35 @@
+import asyncio
+
+from app.config import settings
+from app.tasks import JobsLock, run_periodically, stop_all
+
+
+def test_one_holder_of_the_jobs_lock_at_a_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOBS_LOCK_FILE", str(tmp_path / "jobs.lock"))
+    first, second = JobsLock(), JobsLock()
+
+    assert first.acquire() and first.acquire()
+    assert not second.acquire()
+
+    # e.g. the worker holding it exited: the next one takes over
+    first.release()
+    assert second.acquire()
+    assert not first.acquire()
+    second.release()
+
+
+def test_exclusive_jobs_skip_while_another_process_runs_them(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOBS_LOCK_FILE", str(tmp_path / "jobs.lock"))
+    other = JobsLock()
+    assert other.acquire()
+    runs: list[str] = []
+
+    async def main():
+        run_periodically("shared", 0.01, lambda: runs.append("shared"), exclusive=True)
+        run_periodically("local", 0.01, lambda: runs.append("local"))
+        await asyncio.sleep(0.1)
+        await stop_all()
+
+    asyncio.run(main())
+    other.release()
+    assert "local" in runs and "shared" not in runs
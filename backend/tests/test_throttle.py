@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import throttle
+from app.config import settings
+from app.throttle import DatabaseStore, LoginThrottle, LoginThrottled, MemoryStore
+
+
+def _enable(monkeypatch) -> None:
+    # after registering: register() logs in, which takes a token
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_ENABLED", True)
+    monkeypatch.setattr(throttle.login_throttle, "store", MemoryStore(100))
+
+
+def _login(client, username: str, password: str = "wrong"):
+    return client.post(
+        "/auth/login/json", json={"username": username, "password": password}
+    )
+
+
+def _attempts(client, username: str) -> list[tuple[int, str]]:
+    results = []
+    for _ in range(settings.LOGIN_USER_BURST + 1):
+        response = _login(client, username)
+        results.append((response.status_code, response.json()["detail"]))
+    return results
+
+
+def test_attempts_past_the_burst_get_429(client, register, monkeypatch):
+    register("alice", "client")
+    _enable(monkeypatch)
+    for _ in range(settings.LOGIN_USER_BURST):
+        assert _login(client, "alice").status_code == 401
+
+    response = _login(client, "alice", "pw")
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) > 0
+
+
+def test_unknown_usernames_are_throttled_like_known_ones(client, register, monkeypatch):
+    register("alice", "client")
+    _enable(monkeypatch)
+    assert _attempts(client, "alice") == _attempts(client, "nobody")
+
+
+def test_lockout_expires(monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_ENABLED", True)
+    monkeypatch.setattr(settings, "LOGIN_USER_MAX_FAILURES", 3)
+    now = [1000.0]
+    monkeypatch.setattr(throttle.time, "time", lambda: now[0])
+    gate = LoginThrottle(MemoryStore(100))
+
+    for _ in range(3):
+        gate.check("alice", "10.0.0.1")
+        gate.failed("alice", "10.0.0.1")
+    with pytest.raises(LoginThrottled) as exc:
+        gate.check("alice", "10.0.0.1")
+    assert exc.value.reason == "user_locked"
+    # another username from the same address is not locked out
+    gate.check("bob", "10.0.0.1")
+
+    now[0] += settings.LOGIN_LOCKOUT_SECONDS - 1
+    with pytest.raises(LoginThrottled):
+        gate.check("alice", "10.0.0.1")
+    now[0] += 2
+    gate.check("alice", "10.0.0.1")
+
+
+def test_database_store_under_concurrent_logins(client, monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_ENABLED", True)
+    gate = LoginThrottle(DatabaseStore())
+
+    def attempt(i: int) -> str:
+        try:
+            gate.check("alice", f"10.0.0.{i}")
+        except LoginThrottled as exc:
+            return exc.reason
+        return "ok"
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(attempt, range(4 * settings.LOGIN_USER_BURST)))
+    # no lost updates: exactly one burst got through, the rest were refused
+    assert results.count("ok") == settings.LOGIN_USER_BURST
+    assert set(results) == {"ok", "user_rate"}
@@ -0,0 +1,72 @@
+import os
+import time
+
+from sqlmodel import Session
+
+from app.cli import main
+from app.crud.upload import get_upload_usage
+from app.database import engine
+from app.uploads import collect_garbage, upload_dir
+
+
+def _orphan(project_id: int, name: str, age_seconds: float = 0) -> str:
+    """A file left behind by an upload that never got its deliverable."""
+    os.makedirs(upload_dir(project_id), exist_ok=True)
+    path = os.path.join(upload_dir(project_id), name)
+    with open(path, "wb") as f:
+        f.write(b"x" * 100)
+    then = time.time() - age_seconds
+    os.utime(path, (then, then))
+    return path
+
+
+def _uploaded(client, register) -> str:
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    client.post("/projects/", json={"title": "p", "description": "x"}, headers=alice)
+    client.patch("/projects/1/assign?worker_id=2", headers=alice)
+    response = client.post(
+        "/deliverables/projects/1/upload",
+        files={"file": ("work.txt", b"y" * 1000)},
+        headers=bob,
+    )
+    assert response.status_code == 201, response.text
+    path = response.json()["file_url"]
+    # as old as any orphan: only the reference keeps it
+    os.utime(path, (0, 0))
+    return path
+
+
+def _usage() -> tuple[int, int]:
+    with Session(engine) as session:
+        return get_upload_usage(session, 1, 2)
+
+
+def test_gc_removes_only_old_orphans(client, register):
+    referenced = _uploaded(client, register)
+    old = [_orphan(1, f"old{i}", age_seconds=7200) for i in range(3)]
+    fresh = _orphan(1, "fresh")
+    usage = _usage()
+
+    # a batch smaller than the directory: every batch is checked
+    report = collect_garbage(grace_seconds=3600, batch_size=2)
+    assert (report.scanned, report.removed, report.removed_bytes) == (5, 3, 300)
+    assert not any(os.path.exists(path) for path in old)
+    assert os.path.exists(referenced) and os.path.exists(fresh)
+    assert _usage() == usage == (1000, 1000)
+
+    assert client.get("/deliverables/1/download").content == b"y" * 1000
+
+
+def test_gc_uploads_command(client, register, capsys):
+    referenced = _uploaded(client, register)
+    orphan = _orphan(1, "orphan", age_seconds=7200)
+
+    main(["gc-uploads", "--grace-seconds", "3600", "--dry-run"])
+    assert "would remove 1 (100 bytes)" in capsys.readouterr().out
+    assert os.path.exists(orphan)
+
+    main(["gc-uploads", "--grace-seconds", "3600"])
+    assert "removed 1 (100 bytes)" in capsys.readouterr().out
+    assert not os.path.exists(orphan) and os.path.exists(referenced)
+    assert _usage() == (1000, 1000)
@@ -0,0 +1,66 @@
+from sqlalchemy import delete
+from sqlmodel import Session
+
+from app.crud.user import get_user_by_username
+from app.database import engine, init_db, schema_version
+
+
+def _user_id(username: str) -> int:
+    with Session(engine) as session:
+        return get_user_by_username(session, username).id
+
+
+def _completed_project(client, alice, bob, worker_id: int, days=None) -> None:
+    project_id = client.post(
+        "/projects/", json={"title": "p", "description": "x"}, headers=alice
+    ).json()["id"]
+    if days is not None:
+        client.post(
+            f"/quotes/projects/{project_id}",
+            json={"amount": 10, "days": days},
+            headers=bob,
+        )
+    client.patch(
+        f"/projects/{project_id}/assign",
+        params={"worker_id": worker_id},
+        headers=alice,
+    )
+    client.post(f"/projects/{project_id}/complete", headers=alice)
+
+
+def _profile(client, headers, worker_id: int) -> dict:
+    return client.get(f"/workers/{worker_id}/profile", headers=headers).json()
+
+
+def test_quoted_days_average_only_counts_quoted_completions(client, register):
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    worker_id = _user_id("bob")
+
+    _completed_project(client, alice, bob, worker_id, days=4)
+    # assigned without a quote: timed, but nothing was quoted
+    _completed_project(client, alice, bob, worker_id)
+
+    profile = _profile(client, alice, worker_id)
+    assert profile["completed_count"] == 2
+    assert profile["avg_completion_quoted_days"] == 4
+
+
+def test_init_db_adds_and_backfills_quoted_timed_count(client, register):
+    alice = register("alice", "client")
+    bob = register("bob", "worker")
+    worker_id = _user_id("bob")
+    _completed_project(client, alice, bob, worker_id, days=4)
+    _completed_project(client, alice, bob, worker_id)
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "ALTER TABLE worker_profiles DROP COLUMN quoted_timed_count"
+        )
+        conn.execute(delete(schema_version))
+    # pooled connections may still cache the old schema, and SQLite checks
+    # ADD COLUMN against that cache before noticing it changed
+    engine.dispose()
+    init_db()
+
+    assert _profile(client, alice, worker_id)["avg_completion_quoted_days"] == 4